@@ -1,17 +1,56 @@
 import asyncio
-from time import sleep
-from typing import Optional
+import sys
+import time
+from typing import Dict, Iterable, List, Optional, Tuple
 from playwright.async_api import async_playwright, Page, Browser
 from credentials import USERNAME, PASSWORD, MOGA_STG_URL
+from records import LeadRecord, LEAD_DROPDOWNS, LEAD_SEARCH_DROPDOWNS, iter_records, read_catalog, validate_file
+from forms import bulk_fill
+from endpoints import AUTH_PATH, LEAD_CREATE_PATH, expect_step_response
+from page_objects import (
+    ANTD, LEAD, LEAD_FORM, LEAD_FORM_SELECTS, LEAD_TEXT_FIELDS, LOGIN, PERSONAL_SETTING, SHELL,
+    DropdownIndex, Selector, verify_once,
+)
+from browser_daemon import connect
+from checkpoint import StepRetrier
+from diagnostics import DiagnosticsRecorder
+from journal import ResultJournal
+from memory import MemoryGovernor, MemoryLimits
+from routing import ResourceRouter
+from tracing import TRACER, TRACE_FILE, traced
+from waits import DRAWER_SELECTOR, WaitEngine
+from widgets import search_select, select_option, set_date
 
 
 class MOGAWebAutomation:
     """Class để tự động hóa các thao tác trên website MOGA CRM"""
     
-    def __init__(self, headless: bool = False):
+    def __init__(
+        self,
+        headless: bool = False,
+        router: Optional[ResourceRouter] = None,
+        cdp_endpoint: Optional[str] = None,
+        diagnostics: bool = False,
+        memory_limits: Optional[MemoryLimits] = None,
+        journal: Optional[ResultJournal] = None,
+    ):
         self.headless = headless
+        self.router = router
+        # Client mode: attach vào browser daemon thay vì launch Chrome mới
+        self.cdp_endpoint = cdp_endpoint
+        # Opt-in: ring buffer action/console/network/snapshot, chỉ ghi ra đĩa khi step lỗi
+        self.enable_diagnostics = diagnostics
+        self.diagnostics: Optional[DiagnosticsRecorder] = None
+        # Recycle page/context trong bulk run khi đủ số record hoặc vượt ngưỡng bộ nhớ
+        self.memory = MemoryGovernor(self, memory_limits) if memory_limits else None
+        # Ghi record đã tạo để chạy lại bulk run không tạo trùng
+        self.journal = journal
         self.browser: Optional[Browser] = None
         self.page: Optional[Page] = None
+        self.waits: Optional[WaitEngine] = None
+        self.dropdowns: Optional[DropdownIndex] = None
+        # Các step đưa page tới màn hình đang làm việc; MemoryGovernor chạy lại sau khi recycle page
+        self.section_steps: List[str] = []
         
     async def __aenter__(self):
         """Context manager entry"""
@@ -22,28 +61,55 @@ class MOGAWebAutomation:
         """Context manager exit"""
         await self.close_browser()
     
+    @traced()
     async def start_browser(self):
-        """Khởi tạo browser và page"""
+        """Khởi tạo browser và page (hoặc attach vào browser daemon nếu có cdp_endpoint)"""
         self.playwright = await async_playwright().start()
-        self.browser = await self.playwright.chromium.launch(
-            headless=self.headless,
-            channel="chrome"
-        )
-        self.page = await self.browser.new_page()
+        if self.cdp_endpoint:
+            self.browser = await connect(self.playwright, self.cdp_endpoint)
+        else:
+            self.browser = await self.playwright.chromium.launch(
+                headless=self.headless,
+                channel="chrome"
+            )
+        # Context riêng (không dùng browser.new_page) để MemoryGovernor mở được page mới trong cùng context
+        context = await self.browser.new_context()
+        page = await context.new_page()
+        if self.router:
+            await self.router.install(page)
+        self.attach_page(page)
         
+    def attach_page(self, page: Page):
+        """Gắn automation vào một page có sẵn (vd: page của BrowserContext riêng)"""
+        self.page = page
+        self.waits = WaitEngine(page)
+        self.dropdowns = None
+        self.diagnostics = DiagnosticsRecorder(page) if self.enable_diagnostics else None
+        
+    @traced()
     async def close_browser(self):
-        """Đóng browser"""
+        """Đóng browser (client mode chỉ đóng context của mình và ngắt kết nối, daemon vẫn chạy)"""
+        if self.router:
+            print(self.router.stats.report())
+        if self.diagnostics:
+            print(self.diagnostics.report())
+        if self.memory:
+            print(self.memory.report())
+        if self.journal:
+            self.journal.flush()
         if self.browser:
             await self.browser.close()
         if hasattr(self, 'playwright'):
             await self.playwright.stop()
     
+    @traced()
     async def navigate_to_url(self, url: str):
         """Điều hướng đến URL"""
         if self.page is None:
             raise RuntimeError("Page not initialized")
         await self.page.goto(url)
         
+    @traced()
     async def wait_and_verify_element(self, selector: str, timeout: int = 5000) -> bool:
         """Chờ và kiểm tra element có hiển thị không"""
         if self.page is None:
@@ -55,200 +121,300 @@ class MOGAWebAutomation:
             print(f"Error waiting for element {selector}: {e}")
             return False
     
-    async def login_success(self):
+    @traced()
+    async def login_success(self, username: str = USERNAME, password: str = PASSWORD):
         """Đăng nhập vào hệ thống"""
         if self.page is None:
             raise RuntimeError("Page not initialized")
         try:
+            await verify_once(self.page, LOGIN)
+            
             # Fill login form
-            await self.page.get_by_role(role="textbox", name="email").fill(USERNAME)
-            await self.page.get_by_role(role="textbox", name="password").fill(PASSWORD)
-            await self.page.get_by_role(role="button", name="sign in").click()
+            await LOGIN.locator(self.page, "email").fill(username)
+            await LOGIN.locator(self.page, "password").fill(password)
             
-            # Wait for toast notification
-            toast_selector = "div.Toastify__toast-container--bottom-left div.Toastify__toast"
-            toast_visible = await self.wait_and_verify_element(toast_selector)
-            print(f"Toast hiển thị: {toast_visible}")
+            # Xong ngay khi API đăng nhập trả về thành công
+            response, _ = await expect_step_response(
+                self.page,
+                AUTH_PATH,
+                lambda: LOGIN.locator(self.page, "sign_in").click(),
+            )
+            print(f"Đăng nhập thành công: {response.status}")
             
         except Exception as e:
             print(f"Lỗi đăng nhập: {e}")
             raise
     
+    @traced()
     async def access_lead_section(self):
         """Truy cập vào phần Lead"""
         if self.page is None:
             raise RuntimeError("Page not initialized")
         try:
-            side_menu_visible = await self.page.locator("aside").is_visible()
+            await verify_once(self.page, SHELL)
+            side_menu_visible = await SHELL.locator(self.page, "side_menu").is_visible()
             print(f"Side menu hiển thị: {side_menu_visible}")
-            await self.page.get_by_role(role="menuitem", name="Lead").click()
+            await SHELL.locator(self.page, "lead_menu").click()
+            self.section_steps = ["access_lead_section"]
         except Exception as e:
             print(f"Lỗi truy cập Lead: {e}")
             raise
     
+    @traced()
     async def change_list_view(self):
         """Thay đổi view sang dạng list"""
         if self.page is None:
             raise RuntimeError("Page not initialized")
         try:
-            change_view_selector = "svg[data-icon='bars']"
-            await self.page.locator(change_view_selector).wait_for()
-            is_button_visible = await self.page.locator(change_view_selector).is_visible()
+            await self.waits.element_ready(LEAD.selectors["change_view"])
+            await verify_once(self.page, LEAD)
+            change_view = LEAD.locator(self.page, "change_view")
+            is_button_visible = await change_view.is_visible()
             print(f"Change view button hiển thị: {is_button_visible}")
-            await self.page.locator(change_view_selector).click()
+            await change_view.click()
+            if "change_list_view" not in self.section_steps:
+                self.section_steps.append("change_list_view")
         except Exception as e:
             print(f"Lỗi thay đổi view: {e}")
             raise
     
+    @traced()
     async def add_new_lead(self):
         """Mở form thêm lead mới"""
         if self.page is None:
             raise RuntimeError("Page not initialized")
         try:
-            await self.page.get_by_role(role="button", name="Add lead").click()
-            drawer_selector = "div[class='ant-drawer-content-wrapper']"
-            is_drawer_visible = await self.wait_and_verify_element(drawer_selector)
-            print(f"Drawer add lead hiển thị: {is_drawer_visible}")
+            await LEAD.locator(self.page, "add_lead").click()
+            await self.waits.drawer_mounted()
+            print("Drawer add lead hiển thị: True")
+            await verify_once(self.page, LEAD_FORM)
+            # Một lần duyệt DOM cho mọi dropdown của drawer
+            self.dropdowns = await DropdownIndex.build(self.page, expected=LEAD_FORM_SELECTS)
         except Exception as e:
             print(f"Lỗi mở form thêm lead: {e}")
             raise
     
-    async def select_dropdown_option(self, placeholder_text: str, option_title: str, wait_time: int = 500):
-        """Helper method để chọn option trong dropdown"""
+    @traced()
+    async def fill_form(self, fields: Dict[Selector, str], root: Optional[str] = DRAWER_SELECTOR) -> int:
+        """Điền nhiều ô text trong một round trip (mặc định trong drawer đang mở)"""
         if self.page is None:
             raise RuntimeError("Page not initialized")
         try:
-            # Click dropdown
-            dropdown_selector = f"div.ant-select:has(span.ant-select-selection-placeholder:text-is('{placeholder_text}'))"
-            await self.page.locator(dropdown_selector).click()
-            
-            # Wait for options to appear - sử dụng timeout như file gốc
-            await self.page.wait_for_timeout(wait_time)
-            
-            # Select option
-            option_selector = f'div.ant-select-item-option[title="{option_title}"]'
-            await self.page.locator(option_selector).click()
-            
+            return await bulk_fill(self.page, fields, root)
+        except Exception as e:
+            print(f"Lỗi điền form: {e}")
+            raise
+    
+    def _select_locator(self, placeholder_text: str):
+        """Select theo placeholder: ưu tiên bản đồ của drawer, fallback về selector :has()"""
+        locator = self.dropdowns.locator(placeholder_text) if self.dropdowns else None
+        return locator or ANTD.locator(self.page, "select_by_placeholder", placeholder=placeholder_text)
+    
+    @traced(arg_detail=True)
+    async def select_dropdown_option(self, placeholder_text: str, option_title: str, timeout: int = 5000):
+        """Helper method để chọn option trong dropdown (danh sách ảo được cuộn tới option)"""
+        if self.page is None:
+            raise RuntimeError("Page not initialized")
+        try:
+            await select_option(self.page, self._select_locator(placeholder_text), option_title, timeout)
         except Exception as e:
             print(f"Lỗi chọn dropdown {placeholder_text}: {e}")
             raise
     
-    async def select_dropdown_with_search(self, placeholder_text: str, search_text: str, wait_time: int = 500):
-        """Helper method để chọn dropdown với tìm kiếm"""
+    @traced(arg_detail=True)
+    async def select_dropdown_with_search(self, placeholder_text: str, search_text: str, timeout: int = 5000):
+        """Helper method để chọn dropdown với tìm kiếm (điền chuỗi tìm kiếm một lần)"""
         if self.page is None:
             raise RuntimeError("Page not initialized")
         try:
-            # Click dropdown
-            dropdown_selector = f"div.ant-select:has(span.ant-select-selection-placeholder:text-is('{placeholder_text}'))"
-            await self.page.locator(dropdown_selector).click()
-            
-            # Type search text
-            await self.page.wait_for_timeout(wait_time)
-            await self.page.keyboard.type(search_text)
-            await self.page.wait_for_timeout(wait_time)
-            
-            # Select option
-            option_selector = f"div.ant-select-item-option:has-text('{search_text}')"
-            await self.page.locator(option_selector).click()
-            
+            await search_select(self.page, self._select_locator(placeholder_text), search_text, timeout=timeout)
         except Exception as e:
             print(f"Lỗi chọn dropdown với search {placeholder_text}: {e}")
             raise
     
-    async def fill_lead_information(self):
-        """Điền thông tin lead"""
+    @traced()
+    async def fill_lead_fields(self, record: LeadRecord):
+        """Điền tất cả ô text của lead trong một lần"""
         if self.page is None:
             raise RuntimeError("Page not initialized")
         try:
-            # Basic information
-            await self.page.get_by_role(role="textbox", name="Account name").fill("Account")
-            await self.page.locator("input[name='name']").fill("Contact")
-            await self.page.locator("input[autocomplete='tel']").fill("+8412345678")
-            await self.page.get_by_role(role="textbox", name="Email").fill("account@gmail.com")
-            await self.page.get_by_role(role="textbox", name="Job title").fill("Title 1")
-            
-            # Dropdown selections
-            await self.select_dropdown_option("Gender", "Male")
-            await self.select_dropdown_option("Industry", "Event")
-            await self.select_dropdown_option("Source", "Source 1")
-            await self.select_dropdown_option("Status", "Hot lead")
-            await self.select_dropdown_option("Lead Segmentation", "Cheap")
-            await self.select_dropdown_option("Lead label", "acc01")
-            await self.select_dropdown_option("Pick list", "Option 1")
-            
-            # Country and City with search
-            await self.select_dropdown_with_search("Country", "Vietnam")
-            await self.select_dropdown_with_search("City", "Bến Tre")
-            
-            # Other fields
-            await self.page.locator("input[name='tax_identification_number']").fill("TAX1.1")
-            await self.page.locator("input[name='address']").fill("Sala sarina, A0011")
-            await self.page.get_by_role(role="textbox", name="Text").fill("ABC")
-            await self.page.get_by_role(role="textbox", name="Link").fill("https://oplacrm.com")
-            await self.page.locator("input[placeholder='Number']").fill("123")
-            
-            # Date picker
-            await self.page.locator("div.ant-picker").click()
-            await self.page.wait_for_selector("div.ant-picker-dropdown", state="visible")
-            await self.page.locator("td.ant-picker-cell:has-text('15')").click()
-            
-            # Save
-            await self.page.get_by_role(role="button", name="Save").click()
-            sleep(2)
-            
+            await self.fill_form(LEAD_FORM.form_values(record, LEAD_TEXT_FIELDS))
         except Exception as e:
-            print(f"Lỗi điền thông tin lead: {e}")
+            print(f"Lỗi điền ô text lead: {e}")
             raise
     
+    @traced(arg_attr="value")
+    async def pick_lead_date(self, value: str):
+        """Nhập ngày (YYYY-MM-DD) vào date picker của form lead"""
+        if self.page is None:
+            raise RuntimeError("Page not initialized")
+        try:
+            await set_date(self.page, LEAD_FORM.locator(self.page, "date_picker"), value)
+        except Exception as e:
+            print(f"Lỗi chọn ngày lead: {e}")
+            raise
+    
+    @traced()
+    async def save_lead(self) -> Optional[str]:
+        """Lưu lead; xong khi API tạo lead trả về ID"""
+        if self.page is None:
+            raise RuntimeError("Page not initialized")
+        try:
+            _, lead_id = await expect_step_response(
+                self.page,
+                LEAD_CREATE_PATH,
+                lambda: ANTD.locator(self.page, "save").click(),
+                require_id=True,
+            )
+            self.dropdowns = None
+            print(f"Đã tạo lead: {lead_id}")
+            return lead_id
+        except Exception as e:
+            print(f"Lỗi lưu lead: {e}")
+            raise
+    
+    def lead_sub_steps(self, record: LeadRecord) -> List[Tuple[str, tuple]]:
+        """Các bước con của việc điền form lead, mỗi bước retry được độc lập"""
+        steps: List[Tuple[str, tuple]] = [("fill_lead_fields", (record,))]
+        for field_name, placeholder in LEAD_DROPDOWNS.items():
+            if getattr(record, field_name):
+                steps.append(("select_dropdown_option", (placeholder, getattr(record, field_name))))
+        # Country and City with search
+        for field_name, placeholder in LEAD_SEARCH_DROPDOWNS.items():
+            if getattr(record, field_name):
+                steps.append(("select_dropdown_with_search", (placeholder, getattr(record, field_name))))
+        if record.date:
+            steps.append(("pick_lead_date", (record.date,)))
+        return steps
+    
+    @traced()
+    async def fill_lead_information(self, record: Optional[LeadRecord] = None):
+        """Điền thông tin lead (chưa lưu, gọi save_lead sau đó như fill_opti_information / save_opportunity)"""
+        record = record or LeadRecord()
+        for step, args in self.lead_sub_steps(record):
+            await getattr(self, step)(*args)
+    
+    @traced()
+    async def create_leads(self, records: Iterable[LeadRecord], total: Optional[int] = None, max_retries: int = 2) -> int:
+        """Tạo lead lần lượt từ một iterable (đọc dần, vd: file hoặc generator); cần đang ở màn hình Lead.
+        Step lỗi được retry từ checkpoint; record đã có trong journal được bỏ qua"""
+        retrier = StepRetrier(self, max_retries=max_retries)
+        count = skipped = 0
+        for index, record in enumerate(records, 1):
+            # Record đã có trong journal (lần chạy trước) được bỏ qua, không đụng tới browser
+            if self.journal and self.journal.is_done("lead", record.key):
+                skipped += 1
+                continue
+            started = time.perf_counter()
+            try:
+                await retrier.run("add_new_lead")
+                for step, args in self.lead_sub_steps(record):
+                    await retrier.run(step, *args)
+                lead_id = await retrier.run("save_lead")
+            except Exception as e:
+                if self.journal:
+                    self.journal.record("lead", record.key, None, "failed", (time.perf_counter() - started) * 1000, repr(e))
+                raise
+            if self.journal:
+                self.journal.record("lead", record.key, lead_id, "ok", (time.perf_counter() - started) * 1000)
+            count += 1
+            if self.memory:
+                await self.memory.after_record()
+            print(f"Đã tạo lead {index}/{total or '?'}: {record.key}")
+        if skipped:
+            print(f"Bỏ qua {skipped} lead đã có trong journal")
+        return count
+    
+    @traced()
+    async def create_leads_from_file(self, path: str, max_retries: int = 2, catalog: Optional[Dict] = None) -> int:
+        """Tạo lead hàng loạt từ file CSV/JSONL (kiểm tra cả file, kể cả giá trị dropdown, trước khi chạy)"""
+        catalog = catalog if catalog is not None else read_catalog()
+        if catalog is None:
+            print("Chưa có dropdown_catalog.json (synthetic.py harvest): không kiểm tra trước giá trị dropdown")
+        total = validate_file(path, "lead", catalog=catalog)
+        print(f"File {path} hợp lệ: {total} lead")
+        return await self.create_leads(iter_records(path, "lead"), total, max_retries)
+    
+    @traced()
     async def update_personal_settings(self):
         """Cập nhật cài đặt cá nhân"""
         if self.page is None:
             raise RuntimeError("Page not initialized")
         try:
-            sleep(5)
+            # Chờ các request trước đó (vd: lưu lead) hoàn tất
+            await self.waits.network_idle()
             
             # Open dropdown menu
-            await self.page.locator("div[class^='ant-dropdown-trigger']").click()
-            await self.page.wait_for_selector("div[class$='ant-dropdown-placement-bottomRight']")
-            await self.page.get_by_role(role='button', name='Personal Setting').click()
+            await SHELL.locator(self.page, "user_menu").click()
+            await self.waits.element_ready(PERSONAL_SETTING.selectors["menu_popup"])
+            await PERSONAL_SETTING.locator(self.page, "open").click()
             
-            sleep(1)
+            await self.waits.element_ready(PERSONAL_SETTING.selectors["first_name"])
+            await verify_once(self.page, PERSONAL_SETTING)
             
             # Fill personal information
-            await self.page.locator("input[name='firstName']").fill('Yên')
-            await self.page.locator("input[name='lastName']").fill('Lý')
-            await self.page.locator("input[autocomplete='tel']").click()
-            await self.page.locator("input[autocomplete='tel']").fill('707986543')
+            await PERSONAL_SETTING.locator(self.page, "first_name").fill('Yên')
+            await PERSONAL_SETTING.locator(self.page, "last_name").fill('Lý')
+            phone = PERSONAL_SETTING.locator(self.page, "phone")
+            await phone.click()
+            await phone.fill('707986543')
             
             # Save
-            await self.page.get_by_role(role="button", name='Save').click()
+            await PERSONAL_SETTING.locator(self.page, "save").click()
+            await self.waits.network_idle()
             
         except Exception as e:
             print(f"Lỗi cập nhật cài đặt cá nhân: {e}")
             raise
     
-    async def run_full_workflow(self):
-        """Chạy toàn bộ workflow"""
+    @traced()
+    async def run_full_workflow(self, url: str = MOGA_STG_URL, max_retries: int = 2):
+        """Chạy toàn bộ workflow; step lỗi được retry từ checkpoint gần nhất thay vì chạy lại từ đầu"""
+        retrier = StepRetrier(self, max_retries=max_retries)
+        try:
+            await retrier.run("navigate_to_url", url)
+            await retrier.run("login_success")
+            await retrier.run("access_lead_section")
+            await retrier.run("change_list_view")
+            await retrier.run("add_new_lead")
+            for step, args in self.lead_sub_steps(LeadRecord()):
+                await retrier.run(step, *args)
+            await retrier.run("save_lead")
+            await retrier.run("update_personal_settings")
+            print(f"Workflow hoàn thành thành công! ({retrier.retries} lần retry)")
+            
+        except Exception as e:
+            print(f"Lỗi trong workflow: {e}")
+            raise
+
+    @traced()
+    async def run_bulk_workflow(self, path: str):
+        """Đăng nhập rồi tạo lead hàng loạt từ file"""
         try:
             await self.navigate_to_url(MOGA_STG_URL)
             await self.login_success()
             await self.access_lead_section()
             await self.change_list_view()
-            await self.add_new_lead()
-            await self.fill_lead_information()
-            await self.update_personal_settings()
-            sleep(2)
-            print("Workflow hoàn thành thành công!")
+            total = await self.create_leads_from_file(path)
+            print(f"Đã tạo {total} lead từ {path}")
             
         except Exception as e:
-            print(f"Lỗi trong workflow: {e}")
+            print(f"Lỗi trong bulk workflow: {e}")
             raise
 
 
 async def main():
     """Hàm main để chạy automation"""
-    async with MOGAWebAutomation(headless=False) as automation:
-        await automation.run_full_workflow()
+    with ResultJournal() as journal:
+        async with MOGAWebAutomation(
+            headless=False, router=ResourceRouter(), memory_limits=MemoryLimits(), journal=journal
+        ) as automation:
+            if len(sys.argv) > 1:
+                await automation.run_bulk_workflow(sys.argv[1])
+            else:
+                await automation.run_full_workflow()
+    TRACER.export_jsonl(TRACE_FILE)
+    print(f"Span đã ghi vào {TRACE_FILE} (run {TRACER.run_id})")
 
 
 if __name__ == "__main__":
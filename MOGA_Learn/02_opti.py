@@ -1,17 +1,56 @@
 import asyncio
-from time import sleep
-from typing import Optional
+import sys
+import time
+from typing import Dict, Iterable, List, Optional, Tuple
 from playwright.async_api import async_playwright, Page, Browser
 from credentials import USERNAME, PASSWORD, MOGA_STG_URL
+from records import OpportunityRecord, iter_records, validate_file
+from forms import bulk_fill
+from endpoints import AUTH_PATH, OPPORTUNITY_CREATE_PATH, expect_step_response
+from page_objects import (
+    ANTD, LOGIN, OPPORTUNITY, OPPORTUNITY_FORM, OPPORTUNITY_FORM_SELECTS, OPPORTUNITY_TEXT_FIELDS, SHELL,
+    DropdownIndex, Selector, verify_once,
+)
+from browser_daemon import connect
+from checkpoint import StepRetrier
+from diagnostics import DiagnosticsRecorder
+from journal import ResultJournal
+from memory import MemoryGovernor, MemoryLimits
+from routing import ResourceRouter
+from tracing import TRACER, TRACE_FILE, traced
+from waits import DRAWER_SELECTOR, WaitEngine
+from widgets import search_select, select_option, set_date
 
 
 class MOGAWebAutomation:
     """Class để tự động hóa các thao tác trên website MOGA CRM"""
     
-    def __init__(self, headless: bool = False):
+    def __init__(
+        self,
+        headless: bool = False,
+        router: Optional[ResourceRouter] = None,
+        cdp_endpoint: Optional[str] = None,
+        diagnostics: bool = False,
+        memory_limits: Optional[MemoryLimits] = None,
+        journal: Optional[ResultJournal] = None,
+    ):
         self.headless = headless
+        self.router = router
+        # Client mode: attach vào browser daemon thay vì launch Chrome mới
+        self.cdp_endpoint = cdp_endpoint
+        # Opt-in: ring buffer action/console/network/snapshot, chỉ ghi ra đĩa khi step lỗi
+        self.enable_diagnostics = diagnostics
+        self.diagnostics: Optional[DiagnosticsRecorder] = None
+        # Recycle page/context trong bulk run khi đủ số record hoặc vượt ngưỡng bộ nhớ
+        self.memory = MemoryGovernor(self, memory_limits) if memory_limits else None
+        # Ghi record đã tạo để chạy lại bulk run không tạo trùng
+        self.journal = journal
         self.browser: Optional[Browser] = None
         self.page: Optional[Page] = None
+        self.waits: Optional[WaitEngine] = None
+        self.dropdowns: Optional[DropdownIndex] = None
+        # Các step đưa page tới màn hình đang làm việc; MemoryGovernor chạy lại sau khi recycle page
+        self.section_steps: List[str] = []
         
     async def __aenter__(self):
         """Context manager entry"""
@@ -22,29 +61,56 @@ class MOGAWebAutomation:
         """Context manager exit"""
         await self.close_browser()
     
+    @traced()
     async def start_browser(self):
-        """Khởi tạo browser và page"""
+        """Khởi tạo browser và page (hoặc attach vào browser daemon nếu có cdp_endpoint)"""
         self.playwright = await async_playwright().start()
-        self.browser = await self.playwright.chromium.launch(
-            headless=self.headless,
-            channel="chrome"
-        )
+        if self.cdp_endpoint:
+            self.browser = await connect(self.playwright, self.cdp_endpoint)
+        else:
+            self.browser = await self.playwright.chromium.launch(
+                headless=self.headless,
+                channel="chrome"
+            )
         # Đảm bảo viewport đủ lớn khi khởi tạo page
-        self.page = await self.browser.new_page(viewport={"width": 1600, "height": 1200})
+        # Context riêng (không dùng browser.new_page) để MemoryGovernor mở được page mới trong cùng context
+        context = await self.browser.new_context(viewport={"width": 1600, "height": 1200})
+        page = await context.new_page()
+        if self.router:
+            await self.router.install(page)
+        self.attach_page(page)
         
+    def attach_page(self, page: Page):
+        """Gắn automation vào một page có sẵn (vd: page của BrowserContext riêng)"""
+        self.page = page
+        self.waits = WaitEngine(page)
+        self.dropdowns = None
+        self.diagnostics = DiagnosticsRecorder(page) if self.enable_diagnostics else None
+        
+    @traced()
     async def close_browser(self):
-        """Đóng browser"""
+        """Đóng browser (client mode chỉ đóng context của mình và ngắt kết nối, daemon vẫn chạy)"""
+        if self.router:
+            print(self.router.stats.report())
+        if self.diagnostics:
+            print(self.diagnostics.report())
+        if self.memory:
+            print(self.memory.report())
+        if self.journal:
+            self.journal.flush()
         if self.browser:
             await self.browser.close()
         if hasattr(self, 'playwright'):
             await self.playwright.stop()
     
+    @traced()
     async def navigate_to_url(self, url: str):
         """Điều hướng đến URL"""
         if self.page is None:
             raise RuntimeError("Page not initialized")
         await self.page.goto(url)
         
+    @traced()
     async def wait_and_verify_element(self, selector: str, timeout: int = 5000) -> bool:
         """Chờ và kiểm tra element có hiển thị không"""
         if self.page is None:
@@ -56,136 +122,272 @@ class MOGAWebAutomation:
             print(f"Error waiting for element {selector}: {e}")
             return False
     
-    async def login_success(self):
+    @traced()
+    async def login_success(self, username: str = USERNAME, password: str = PASSWORD):
         """Đăng nhập vào hệ thống"""
         if self.page is None:
             raise RuntimeError("Page not initialized")
         try:
+            await verify_once(self.page, LOGIN)
+            
             # Fill login form
-            await self.page.get_by_role(role="textbox", name="email").fill(USERNAME)
-            await self.page.get_by_role(role="textbox", name="password").fill(PASSWORD)
-            await self.page.get_by_role(role="button", name="sign in").click()
+            await LOGIN.locator(self.page, "email").fill(username)
+            await LOGIN.locator(self.page, "password").fill(password)
             
-            # Wait for toast notification
-            toast_selector = "div.Toastify__toast-container--bottom-left div.Toastify__toast"
-            toast_visible = await self.wait_and_verify_element(toast_selector)
-            print(f"Toast hiển thị: {toast_visible}")
+            # Xong ngay khi API đăng nhập trả về thành công
+            response, _ = await expect_step_response(
+                self.page,
+                AUTH_PATH,
+                lambda: LOGIN.locator(self.page, "sign_in").click(),
+            )
+            print(f"Đăng nhập thành công: {response.status}")
             
         except Exception as e:
             print(f"Lỗi đăng nhập: {e}")
             raise
 
+    @traced()
     async def access_opti_section(self):
         """Truy cập vào phần OPTI"""
         if self.page is None:
             raise RuntimeError("Page not initialized")
         try:
-            side_menu_visible = await self.page.locator("aside").is_visible()
+            await verify_once(self.page, SHELL)
+            side_menu_visible = await SHELL.locator(self.page, "side_menu").is_visible()
             print(f"Side menu hiển thị: {side_menu_visible}")
-            await self.page.get_by_role(role="menuitem", name="Opportunity").click()
+            await SHELL.locator(self.page, "opportunity_menu").click()
+            self.section_steps = ["access_opti_section"]
         except Exception as e:
             print(f"Lỗi truy cập OPTI: {e}")
             raise
 
+    @traced()
     async def add_new_opti(self):
         """Thêm mới opportunity"""
         if self.page is None:
             raise RuntimeError("Page not initialized")
         try:
-            await self.page.get_by_role(role="button", name="Add opportunity").click()
-            drawer_selector = "div[class='ant-drawer-content-wrapper']"
-            is_drawer_visible = await self.wait_and_verify_element(drawer_selector)
-            print(f"Drawer add opportunity hiển thị: {is_drawer_visible}")
+            await verify_once(self.page, OPPORTUNITY)
+            await OPPORTUNITY.locator(self.page, "add_opportunity").click()
+            await self.waits.drawer_mounted()
+            print("Drawer add opportunity hiển thị: True")
+            await verify_once(self.page, OPPORTUNITY_FORM)
+            # Một lần duyệt DOM cho mọi dropdown của drawer
+            self.dropdowns = await DropdownIndex.build(self.page, expected=OPPORTUNITY_FORM_SELECTS)
         except Exception as e:
             print(f"Lỗi thêm opportunity: {e}")
             raise
         
-    async def select_dropdown_option(self, placeholder_text: str, option_title: str, wait_time: int = 500):
-        """Helper method để chọn option trong dropdown"""
+    @traced()
+    async def fill_form(self, fields: Dict[Selector, str], root: Optional[str] = DRAWER_SELECTOR) -> int:
+        """Điền nhiều ô text trong một round trip (mặc định trong drawer đang mở)"""
         if self.page is None:
             raise RuntimeError("Page not initialized")
         try:
-            # Click dropdown
-            dropdown_selector = f"div.ant-select:has(span.ant-select-selection-placeholder:text-is('{placeholder_text}'))"
-            await self.page.locator(dropdown_selector).click()
-            
-            # Wait for options to appear - sử dụng timeout như file gốc
-            await self.page.wait_for_timeout(wait_time)
-            
-            # Select option
-            option_selector = f'div.ant-select-item-option[title="{option_title}"]'
-            await self.page.locator(option_selector).click()
-            
+            return await bulk_fill(self.page, fields, root)
+        except Exception as e:
+            print(f"Lỗi điền form: {e}")
+            raise
+        
+    def _select_locator(self, placeholder_text: str):
+        """Select theo placeholder: ưu tiên bản đồ của drawer, fallback về selector :has()"""
+        locator = self.dropdowns.locator(placeholder_text) if self.dropdowns else None
+        return locator or ANTD.locator(self.page, "select_by_placeholder", placeholder=placeholder_text)
+        
+    @traced(arg_detail=True)
+    async def select_dropdown_option(self, placeholder_text: str, option_title: str, timeout: int = 5000):
+        """Helper method để chọn option trong dropdown (danh sách ảo được cuộn tới option)"""
+        if self.page is None:
+            raise RuntimeError("Page not initialized")
+        try:
+            await select_option(self.page, self._select_locator(placeholder_text), option_title, timeout)
         except Exception as e:
             print(f"Lỗi chọn dropdown {placeholder_text}: {e}")
             raise
 
-    async def select_dropdown_with_search(self, placeholder_text: str, search_text: str, wait_time: int = 500):
-        """Helper method để chọn dropdown với tìm kiếm"""
+    @traced(arg_detail=True)
+    async def select_dropdown_with_search(self, placeholder_text: str, search_text: str, timeout: int = 5000):
+        """Helper method để chọn dropdown với tìm kiếm (điền chuỗi tìm kiếm một lần)"""
         if self.page is None:
             raise RuntimeError("Page not initialized")
         try:
-            # Click dropdown
-            dropdown_selector = f"div.ant-select:has(span.ant-select-selection-placeholder:text-is('{placeholder_text}'))"
-            await self.page.locator(dropdown_selector).click()
-            
-            # Type search text
-            await self.page.wait_for_timeout(wait_time)
-            await self.page.keyboard.type(search_text)
-            await self.page.wait_for_timeout(wait_time)
-            
-            # Select option
-            option_selector = f"div.ant-select-item-option:has-text('{search_text}')"
-            await self.page.locator(option_selector).click()
-            
+            await search_select(self.page, self._select_locator(placeholder_text), search_text, timeout=timeout)
         except Exception as e:
             print(f"Lỗi chọn dropdown với search {placeholder_text}: {e}")
             raise
 
-    async def fill_opti_information(self):
-        """Điền thông tin opportunity"""
+    @traced()
+    async def fill_opti_basic(self, record: OpportunityRecord):
+        """Điền các ô text của opportunity"""
+        if self.page is None:
+            raise RuntimeError("Page not initialized")
+        try:
+            await self.fill_form(OPPORTUNITY_FORM.form_values(record, OPPORTUNITY_TEXT_FIELDS))
+        except Exception as e:
+            print(f"Lỗi điền thông tin cơ bản opportunity: {e}")
+            raise
+
+    @traced()
+    async def pick_company(self):
+        """Chọn company đầu tiên trong drawer Company"""
+        if self.page is None:
+            raise RuntimeError("Page not initialized")
+        try:
+            await OPPORTUNITY_FORM.locator(self.page, "company").click()
+            await self.waits.drawer_mounted()
+            await OPPORTUNITY_FORM.locator(self.page, "company_item").first.click()
+        except Exception as e:
+            print(f"Lỗi chọn company: {e}")
+            raise
+
+    @traced()
+    async def pick_contact(self):
+        """Chọn contact đầu tiên trong drawer Contact name rồi lưu drawer đó"""
         if self.page is None:
             raise RuntimeError("Page not initialized")
-        try:            
-            # Basic information
-            await self.page.get_by_role(role="textbox", name="External ID").fill("Opla-001")
-            await self.page.get_by_role(role="textbox", name='name').fill("Opportunity 1")
-            await self.page.get_by_placeholder("Company").click()
-            await self.page.wait_for_selector("div[class='ant-drawer-content-wrapper']")
-            await self.page.locator("ul.ant-list-items > div.flex.cursor-pointer").first.click()
-            await self.page.locator("div.ant-select:has(span.ant-select-selection-placeholder:text('Contact name'))").click()
-            await self.page.wait_for_selector("div[class='ant-drawer-content-wrapper']")
-            await self.page.locator("ul.ant-list-items input[type='checkbox']").first.click()
-            await self.page.get_by_role(role="button", name="Save").click()
-            await self.page.locator("div.ant-picker:has(input[name='date_opened'])").click()
-            await self.page.locator("div.ant-picker-dropdown td.ant-picker-cell.ant-picker-cell-in-view:has-text('1')").nth(0).click()
-            await self.page.locator("div.ant-picker:has(input[name='date_closed'])").click()
-            await self.page.locator("div.ant-picker-dropdown td.ant-picker-cell.ant-picker-cell-in-view:has-text('15')").nth(0).click()
+        try:
+            contact = self.dropdowns.locator("Contact name") if self.dropdowns else None
+            await (contact or OPPORTUNITY_FORM.locator(self.page, "contact")).click()
+            await self.waits.drawer_mounted()
+            await OPPORTUNITY_FORM.locator(self.page, "contact_checkbox").first.click()
+            await ANTD.locator(self.page, "save").click()
+        except Exception as e:
+            print(f"Lỗi chọn contact: {e}")
+            raise
 
+    @traced(arg_detail=True)
+    async def pick_opti_date(self, field_name: str, value: str):
+        """Nhập ngày (YYYY-MM-DD) vào date picker `field_name` (date_opened / date_closed)"""
+        if self.page is None:
+            raise RuntimeError("Page not initialized")
+        try:
+            await set_date(self.page, OPPORTUNITY_FORM.locator(self.page, "date_picker", field=field_name), value)
         except Exception as e:
-            print(f"Lỗi điền thông tin opportunity: {e}")
+            print(f"Lỗi chọn ngày {field_name}: {e}")
             raise
 
-    async def run_full_workflow(self):
-        """Chạy toàn bộ workflow"""
+    def opti_sub_steps(self, record: OpportunityRecord) -> List[Tuple[str, tuple]]:
+        """Các bước con của việc điền form opportunity, mỗi bước retry được độc lập"""
+        steps: List[Tuple[str, tuple]] = [("fill_opti_basic", (record,)), ("pick_company", ()), ("pick_contact", ())]
+        for field_name in ("date_opened", "date_closed"):
+            if getattr(record, field_name):
+                steps.append(("pick_opti_date", (field_name, getattr(record, field_name))))
+        return steps
+
+    @traced()
+    async def fill_opti_information(self, record: Optional[OpportunityRecord] = None):
+        """Điền thông tin opportunity (mặc định dùng dữ liệu mẫu của OpportunityRecord)"""
+        record = record or OpportunityRecord()
+        for step, args in self.opti_sub_steps(record):
+            await getattr(self, step)(*args)
+
+    @traced()
+    async def save_opportunity(self) -> Optional[str]:
+        """Lưu opportunity; xong khi API tạo opportunity trả về ID"""
+        if self.page is None:
+            raise RuntimeError("Page not initialized")
+        try:
+            _, opti_id = await expect_step_response(
+                self.page,
+                OPPORTUNITY_CREATE_PATH,
+                lambda: ANTD.locator(self.page, "save").click(),
+                require_id=True,
+            )
+            self.dropdowns = None
+            print(f"Đã tạo opportunity: {opti_id}")
+            return opti_id
+        except Exception as e:
+            print(f"Lỗi lưu opportunity: {e}")
+            raise
+
+    @traced()
+    async def create_opportunities(
+        self,
+        records: Iterable[OpportunityRecord],
+        total: Optional[int] = None,
+        max_retries: int = 2,
+    ) -> int:
+        """Tạo opportunity lần lượt từ một iterable (đọc dần, vd: file hoặc generator); cần đang ở màn hình Opportunity.
+        Step lỗi được retry từ checkpoint; record đã có trong journal được bỏ qua"""
+        retrier = StepRetrier(self, max_retries=max_retries)
+        count = skipped = 0
+        for index, record in enumerate(records, 1):
+            # Record đã có trong journal (lần chạy trước) được bỏ qua, không đụng tới browser
+            if self.journal and self.journal.is_done("opportunity", record.key):
+                skipped += 1
+                continue
+            started = time.perf_counter()
+            try:
+                await retrier.run("add_new_opti")
+                for step, args in self.opti_sub_steps(record):
+                    await retrier.run(step, *args)
+                opti_id = await retrier.run("save_opportunity")
+            except Exception as e:
+                if self.journal:
+                    self.journal.record("opportunity", record.key, None, "failed", (time.perf_counter() - started) * 1000, repr(e))
+                raise
+            if self.journal:
+                self.journal.record("opportunity", record.key, opti_id, "ok", (time.perf_counter() - started) * 1000)
+            count += 1
+            if self.memory:
+                await self.memory.after_record()
+            print(f"Đã tạo opportunity {index}/{total or '?'}: {record.key}")
+        if skipped:
+            print(f"Bỏ qua {skipped} opportunity đã có trong journal")
+        return count
+
+    @traced()
+    async def create_opportunities_from_file(self, path: str, max_retries: int = 2) -> int:
+        """Tạo opportunity hàng loạt từ file CSV/JSONL (kiểm tra cả file trước khi chạy)"""
+        total = validate_file(path, "opportunity")
+        print(f"File {path} hợp lệ: {total} opportunity")
+        return await self.create_opportunities(iter_records(path, "opportunity"), total, max_retries)
+
+    @traced()
+    async def run_full_workflow(self, url: str = MOGA_STG_URL, max_retries: int = 2):
+        """Chạy toàn bộ workflow; step lỗi được retry từ checkpoint gần nhất thay vì chạy lại từ đầu"""
+        retrier = StepRetrier(self, max_retries=max_retries)
+        try:
+            await retrier.run("navigate_to_url", url)
+            await retrier.run("login_success")
+            await retrier.run("access_opti_section")
+            await retrier.run("add_new_opti")
+            for step, args in self.opti_sub_steps(OpportunityRecord()):
+                await retrier.run(step, *args)
+            await retrier.run("save_opportunity")
+            print(f"Workflow hoàn thành thành công! ({retrier.retries} lần retry)")
+            
+        except Exception as e:
+            print(f"Lỗi trong workflow: {e}")
+            raise
+
+    @traced()
+    async def run_bulk_workflow(self, path: str):
+        """Đăng nhập rồi tạo opportunity hàng loạt từ file"""
         try:
             await self.navigate_to_url(MOGA_STG_URL)
             await self.login_success()
             await self.access_opti_section()
-            await self.add_new_opti()
-            await self.fill_opti_information()
-            sleep(2)
-            print("Workflow hoàn thành thành công!")
+            total = await self.create_opportunities_from_file(path)
+            print(f"Đã tạo {total} opportunity từ {path}")
             
         except Exception as e:
-            print(f"Lỗi trong workflow: {e}")
+            print(f"Lỗi trong bulk workflow: {e}")
             raise
 
 
 async def main():
     """Hàm main để chạy automation"""
-    async with MOGAWebAutomation(headless=False) as automation:
-        await automation.run_full_workflow()
+    with ResultJournal() as journal:
+        async with MOGAWebAutomation(
+            headless=False, router=ResourceRouter(), memory_limits=MemoryLimits(), journal=journal
+        ) as automation:
+            if len(sys.argv) > 1:
+                await automation.run_bulk_workflow(sys.argv[1])
+            else:
+                await automation.run_full_workflow()
+    TRACER.export_jsonl(TRACE_FILE)
+    print(f"Span đã ghi vào {TRACE_FILE} (run {TRACER.run_id})")
 
 
 if __name__ == "__main__":
@@ -0,0 +1,140 @@
+import argparse
+import asyncio
+import importlib
+import json
+import sys
+import time
+from pathlib import Path
+from typing import Dict, List
+from moga_standin import StandinServer
+from tracing import TRACER, percentile
+
+lead_module = importlib.import_module("01_login_success_test_optimized")
+opti_module = importlib.import_module("02_opti")
+
+WORKFLOWS = {
+    "lead": lead_module.MOGAWebAutomation,
+    "opportunity": opti_module.MOGAWebAutomation,
+}
+BASELINE_FILE = Path(__file__).parent / "benchmark_baseline.json"
+WORKFLOW_METRIC = "workflow"
+
+
+async def run_once(kind: str, url: str) -> Dict[str, float]:
+    """Chạy một workflow, trả về thời gian (ms) của cả workflow và từng step cấp một"""
+    TRACER.clear()
+    async with WORKFLOWS[kind](headless=True) as automation:
+        await automation.run_full_workflow(url)
+    root = next(span for span in TRACER.spans if span.name == "run_full_workflow")
+    timings = {WORKFLOW_METRIC: root.duration_ms}
+    for span in TRACER.spans:
+        if span.parent_id == root.span_id:
+            timings[span.name] = timings.get(span.name, 0.0) + span.duration_ms
+    return timings
+
+
+def summarize(samples: List[Dict[str, float]]) -> Dict[str, Dict[str, float]]:
+    """Gom các lần chạy thành p50/p95 theo metric"""
+    values: Dict[str, List[float]] = {}
+    for sample in samples:
+        for name, ms in sample.items():
+            values.setdefault(name, []).append(ms)
+    summary = {}
+    for name, ms in values.items():
+        ms.sort()
+        summary[name] = {"p50": percentile(ms, 50), "p95": percentile(ms, 95), "runs": len(ms)}
+    return summary
+
+
+def compare(
+    results: Dict[str, Dict[str, Dict[str, float]]],
+    baseline: Dict[str, Dict[str, Dict[str, float]]],
+    tolerance: float,
+    min_delta_ms: float,
+) -> List[str]:
+    """So sánh p50 với baseline; trả về danh sách regression"""
+    regressions = []
+    for kind, metrics in results.items():
+        for name, current in metrics.items():
+            base = baseline.get(kind, {}).get(name)
+            if not base:
+                continue
+            delta = current["p50"] - base["p50"]
+            if delta > min_delta_ms and current["p50"] > base["p50"] * (1 + tolerance):
+                regressions.append(
+                    f"{kind}/{name}: p50 {current['p50']:.0f} ms vs baseline {base['p50']:.0f} ms (+{delta:.0f} ms)"
+                )
+    return regressions
+
+
+def print_results(results: Dict[str, Dict[str, Dict[str, float]]], baseline: Dict):
+    print(f"{'workflow/step':<45} {'p50 ms':>10} {'p95 ms':>10} {'baseline':>10}")
+    for kind, metrics in results.items():
+        for name, current in sorted(metrics.items(), key=lambda item: item[0] != WORKFLOW_METRIC):
+            base = baseline.get(kind, {}).get(name, {}).get("p50")
+            base_text = f"{base:>10.0f}" if base is not None else f"{'-':>10}"
+            print(f"{kind + '/' + name:<45} {current['p50']:>10.0f} {current['p95']:>10.0f} {base_text}")
+
+
+async def run_benchmark(kinds: List[str], runs: int, warmup: int, delay: float) -> Dict[str, Dict[str, Dict[str, float]]]:
+    """Chạy benchmark trên stand-in local, bỏ qua các lần warmup"""
+    server = StandinServer(delay=delay)
+    server.start_in_background()
+    try:
+        results = {}
+        for kind in kinds:
+            samples = []
+            for index in range(warmup + runs):
+                started = time.perf_counter()
+                sample = await run_once(kind, server.url)
+                if index >= warmup:
+                    samples.append(sample)
+                print(f"{kind} run {index + 1}/{warmup + runs}: {(time.perf_counter() - started) * 1000:.0f} ms")
+            results[kind] = summarize(samples)
+        return results
+    finally:
+        server.shutdown()
+        server.server_close()
+
+
+def main():
+    """Benchmark các workflow trên MOGA stand-in và so sánh với baseline"""
+    parser = argparse.ArgumentParser(description="Benchmark workflow trên MOGA CRM stand-in")
+    parser.add_argument("--workflow", choices=sorted(WORKFLOWS), action="append")
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--warmup", type=int, default=1)
+    parser.add_argument("--delay", type=float, default=0.05, help="Độ trễ API của stand-in (giây)")
+    parser.add_argument("--baseline", type=Path, default=BASELINE_FILE)
+    parser.add_argument("--update-baseline", action="store_true")
+    parser.add_argument("--tolerance", type=float, default=0.2, help="Cho phép chậm hơn baseline bao nhiêu (tỉ lệ)")
+    parser.add_argument("--min-delta-ms", type=float, default=50.0, help="Bỏ qua chênh lệch nhỏ hơn ngưỡng này")
+    args = parser.parse_args()
+
+    kinds = args.workflow or sorted(WORKFLOWS)
+    results = asyncio.run(run_benchmark(kinds, args.runs, args.warmup, args.delay))
+    baseline = json.loads(args.baseline.read_text(encoding="utf-8")) if args.baseline.exists() else {}
+    print_results(results, baseline)
+
+    if args.update_baseline:
+        args.baseline.write_text(json.dumps({**baseline, **results}, indent=2), encoding="utf-8")
+        print(f"Đã cập nhật baseline: {args.baseline}")
+        return
+    if not baseline:
+        # Không có baseline thì gate không so được gì: coi là lỗi để CI không pass nhầm
+        print(f"Chưa có baseline ({args.baseline}); chạy lại với --update-baseline để tạo")
+        sys.exit(2)
+    missing = sorted(set(results) - set(baseline))
+    if missing:
+        print(f"Baseline {args.baseline} chưa có workflow: {', '.join(missing)}; chạy lại với --update-baseline")
+        sys.exit(2)
+    regressions = compare(results, baseline, args.tolerance, args.min_delta_ms)
+    if regressions:
+        print("REGRESSION:")
+        for line in regressions:
+            print(f"  {line}")
+        sys.exit(1)
+    print("Không có regression so với baseline")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,339 @@
+import argparse
+import asyncio
+import json
+import os
+import shutil
+import signal
+import subprocess
+import sys
+import time
+import urllib.error
+import urllib.request
+from pathlib import Path
+from typing import Dict, List, Optional
+from playwright.async_api import Browser, Playwright, async_playwright
+from tracing import percentile
+
+DEFAULT_PORT = 9222
+STATE_FILE = Path(__file__).parent / ".browser_daemon.json"
+PROFILE_DIR = Path(__file__).parent / ".browser_profile"
+ENDPOINT_ENV = "MOGA_BROWSER_ENDPOINT"
+
+# Profile khởi động nhanh: tắt mọi thứ chạy nền khi Chrome mở lên
+FAST_START_ARGS = [
+    "--no-first-run",
+    "--no-default-browser-check",
+    "--disable-extensions",
+    "--disable-component-update",
+    "--disable-background-networking",
+    "--disable-default-apps",
+    "--disable-sync",
+    "--disable-translate",
+    "--disable-breakpad",
+    "--disable-dev-shm-usage",
+    "--disable-features=Translate,MediaRouter,OptimizationHints",
+    "--disable-background-timer-throttling",
+    "--disable-renderer-backgrounding",
+    "--disable-backgrounding-occluded-windows",
+    "--metrics-recording-only",
+    "--password-store=basic",
+    "--use-mock-keychain",
+    "--mute-audio",
+]
+HEADLESS_ARGS = ["--headless=new", "--disable-gpu", "--hide-scrollbars"]
+CHROME_NAMES = ("google-chrome", "google-chrome-stable", "chrome", "chromium", "chromium-browser")
+
+
+def find_chrome() -> str:
+    """Tìm file chạy Chrome: biến môi trường CHROME_PATH, Chrome cài sẵn, rồi Chromium của Playwright"""
+    if os.environ.get("CHROME_PATH"):
+        return os.environ["CHROME_PATH"]
+    for name in CHROME_NAMES:
+        path = shutil.which(name)
+        if path:
+            return path
+    mac_chrome = "/Applications/Google Chrome.app/Contents/MacOS/Google Chrome"
+    if os.path.exists(mac_chrome):
+        return mac_chrome
+
+    async def bundled() -> str:
+        async with async_playwright() as p:
+            return p.chromium.executable_path
+
+    path = asyncio.run(bundled())
+    if not os.path.exists(path):
+        raise RuntimeError("Chrome not found; set CHROME_PATH or run `playwright install chromium`")
+    return path
+
+
+def daemon_endpoint() -> Optional[str]:
+    """Endpoint CDP của daemon đang chạy (biến môi trường, rồi file state), None nếu không có"""
+    if os.environ.get(ENDPOINT_ENV):
+        return os.environ[ENDPOINT_ENV]
+    try:
+        state = json.loads(STATE_FILE.read_text(encoding="utf-8"))
+    except (OSError, ValueError):
+        return None
+    return state.get("endpoint")
+
+
+def check_health(endpoint: str, timeout: float = 1.0) -> Optional[Dict]:
+    """Gọi /json/version của Chrome; trả về thông tin version nếu browser còn phản hồi"""
+    try:
+        with urllib.request.urlopen(f"{endpoint}/json/version", timeout=timeout) as response:
+            return json.loads(response.read())
+    except (OSError, ValueError, urllib.error.URLError):
+        return None
+
+
+class BrowserDaemon:
+    """Giữ một Chrome chạy lâu dài với cổng remote debugging để các job attach qua CDP"""
+
+    def __init__(
+        self,
+        port: int = DEFAULT_PORT,
+        headless: bool = True,
+        executable: Optional[str] = None,
+        profile_dir: Path = PROFILE_DIR,
+        health_interval: float = 5.0,
+        max_failures: int = 3,
+        max_restarts: int = 5,
+    ):
+        self.port = port
+        self.headless = headless
+        self.executable = executable
+        self.profile_dir = Path(profile_dir)
+        self.health_interval = health_interval
+        self.max_failures = max_failures
+        self.max_restarts = max_restarts
+        self.process: Optional[subprocess.Popen] = None
+        self.restarts = 0
+        self._stopping = False
+
+    @property
+    def endpoint(self) -> str:
+        return f"http://127.0.0.1:{self.port}"
+
+    def command(self) -> List[str]:
+        args = [
+            self.executable or find_chrome(),
+            f"--remote-debugging-port={self.port}",
+            "--remote-debugging-address=127.0.0.1",
+            f"--user-data-dir={self.profile_dir}",
+            *FAST_START_ARGS,
+        ]
+        if self.headless:
+            args += HEADLESS_ARGS
+        return args + ["about:blank"]
+
+    def start(self, timeout: float = 15.0) -> float:
+        """Khởi động Chrome, chờ endpoint CDP sẵn sàng; trả về thời gian khởi động (ms)"""
+        if check_health(self.endpoint):
+            raise RuntimeError(f"Port {self.port} is already serving a browser")
+        self.profile_dir.mkdir(parents=True, exist_ok=True)
+        started = time.perf_counter()
+        self.process = subprocess.Popen(
+            self.command(),
+            stdout=subprocess.DEVNULL,
+            stderr=subprocess.DEVNULL,
+            start_new_session=True,
+        )
+        deadline = time.monotonic() + timeout
+        while time.monotonic() < deadline:
+            if self.process.poll() is not None:
+                raise RuntimeError(f"Chrome exited during startup (code {self.process.returncode})")
+            info = check_health(self.endpoint, timeout=0.5)
+            if info:
+                elapsed = (time.perf_counter() - started) * 1000
+                self._write_state(info)
+                print(f"Browser daemon sẵn sàng: {self.endpoint} ({info.get('Browser')}, {elapsed:.0f} ms)")
+                return elapsed
+            time.sleep(0.05)
+        self._kill()
+        raise RuntimeError(f"Chrome did not open {self.endpoint} within {timeout}s")
+
+    def _write_state(self, info: Dict):
+        state = {
+            "endpoint": self.endpoint,
+            "pid": os.getpid(),
+            "browser_pid": self.process.pid if self.process else None,
+            "browser": info.get("Browser"),
+            "started_at": time.time(),
+            "restarts": self.restarts,
+        }
+        tmp = STATE_FILE.with_suffix(".tmp")
+        tmp.write_text(json.dumps(state, indent=2), encoding="utf-8")
+        os.replace(tmp, STATE_FILE)
+
+    def _kill(self):
+        if self.process and self.process.poll() is None:
+            self.process.terminate()
+            try:
+                self.process.wait(timeout=5)
+            except subprocess.TimeoutExpired:
+                self.process.kill()
+                self.process.wait()
+        self.process = None
+
+    def healthy(self) -> bool:
+        """Process còn sống và endpoint CDP còn trả lời"""
+        return bool(self.process and self.process.poll() is None and check_health(self.endpoint))
+
+    def restart(self):
+        """Khởi động lại Chrome sau khi crash/treo"""
+        self.restarts += 1
+        if self.restarts > self.max_restarts:
+            raise RuntimeError(f"Browser restarted {self.max_restarts} times, giving up")
+        print(f"Browser không phản hồi, khởi động lại (lần {self.restarts})")
+        self._kill()
+        time.sleep(min(0.5 * self.restarts, 5))
+        self.start()
+
+    def serve_forever(self):
+        """Vòng lặp health check; tự khởi động lại browser khi crash, dừng khi nhận SIGINT/SIGTERM"""
+        def handle_signal(signum, frame):
+            self._stopping = True
+
+        signal.signal(signal.SIGINT, handle_signal)
+        signal.signal(signal.SIGTERM, handle_signal)
+        self.start()
+        failures = 0
+        try:
+            while not self._stopping:
+                time.sleep(self.health_interval)
+                if self._stopping:
+                    break
+                if self.healthy():
+                    failures = 0
+                    continue
+                failures += 1
+                # Process đã chết thì restart ngay, còn treo thì chờ thêm vài lần check
+                if self.process is None or self.process.poll() is not None or failures >= self.max_failures:
+                    self.restart()
+                    failures = 0
+        finally:
+            self.stop()
+
+    def stop(self):
+        """Tắt Chrome và xóa file state"""
+        self._kill()
+        try:
+            state = json.loads(STATE_FILE.read_text(encoding="utf-8"))
+            if state.get("pid") == os.getpid():
+                STATE_FILE.unlink()
+        except (OSError, ValueError):
+            pass
+        print("Browser daemon đã dừng")
+
+
+async def connect(playwright: Playwright, endpoint: str, timeout: float = 10.0) -> Browser:
+    """Attach vào daemon qua CDP; thử lại trong lúc daemon đang khởi động lại browser"""
+    deadline = time.monotonic() + timeout
+    delay = 0.1
+    while True:
+        try:
+            return await playwright.chromium.connect_over_cdp(endpoint, timeout=timeout * 1000)
+        except Exception as e:
+            if time.monotonic() + delay > deadline:
+                raise RuntimeError(f"Cannot attach to browser daemon at {endpoint}: {e}") from e
+            await asyncio.sleep(delay)
+            delay = min(delay * 2, 1.0)
+
+
+async def measure_cold_start(headless: bool = True) -> float:
+    """Thời gian (ms) để có một page với launch browser mới như start_browser cũ"""
+    started = time.perf_counter()
+    async with async_playwright() as p:
+        browser = await p.chromium.launch(headless=headless, channel="chrome", args=FAST_START_ARGS)
+        await browser.new_page()
+        elapsed = (time.perf_counter() - started) * 1000
+        await browser.close()
+    return elapsed
+
+
+async def measure_warm_attach(endpoint: str) -> float:
+    """Thời gian (ms) để có một page với attach vào daemon và tạo context mới"""
+    started = time.perf_counter()
+    async with async_playwright() as p:
+        browser = await connect(p, endpoint)
+        context = await browser.new_context()
+        await context.new_page()
+        elapsed = (time.perf_counter() - started) * 1000
+        await context.close()
+        await browser.close()
+    return elapsed
+
+
+async def compare_startup(endpoint: str, runs: int = 5, headless: bool = True) -> Dict[str, List[float]]:
+    """Đo cold start và warm attach xen kẽ nhau, mỗi loại `runs` lần"""
+    samples: Dict[str, List[float]] = {"cold_start": [], "warm_attach": []}
+    for index in range(runs):
+        samples["cold_start"].append(await measure_cold_start(headless))
+        samples["warm_attach"].append(await measure_warm_attach(endpoint))
+        print(f"run {index + 1}/{runs}: cold {samples['cold_start'][-1]:.0f} ms, warm {samples['warm_attach'][-1]:.0f} ms")
+    return samples
+
+
+def print_startup_report(samples: Dict[str, List[float]]):
+    print(f"{'mode':<15} {'p50 ms':>10} {'p95 ms':>10} {'runs':>6}")
+    for mode, values in samples.items():
+        values = sorted(values)
+        print(f"{mode:<15} {percentile(values, 50):>10.0f} {percentile(values, 95):>10.0f} {len(values):>6}")
+    cold = percentile(sorted(samples["cold_start"]), 50)
+    warm = percentile(sorted(samples["warm_attach"]), 50)
+    if warm:
+        print(f"Warm attach nhanh hơn {cold / warm:.1f}x (p50)")
+
+
+def main():
+    """Chạy / kiểm tra / dừng browser daemon, hoặc đo cold start so với warm attach"""
+    parser = argparse.ArgumentParser(description="Browser daemon dùng chung cho các job MOGA")
+    sub = parser.add_subparsers(dest="command", required=True)
+    serve = sub.add_parser("serve", help="Chạy daemon ở foreground")
+    serve.add_argument("--port", type=int, default=DEFAULT_PORT)
+    serve.add_argument("--headed", action="store_true")
+    serve.add_argument("--executable", help="Đường dẫn Chrome (mặc định tự tìm)")
+    serve.add_argument("--health-interval", type=float, default=5.0)
+    sub.add_parser("status", help="Kiểm tra daemon còn sống")
+    sub.add_parser("stop", help="Dừng daemon đang chạy")
+    bench = sub.add_parser("bench", help="So sánh cold start với warm attach")
+    bench.add_argument("--runs", type=int, default=5)
+    args = parser.parse_args()
+
+    if args.command == "serve":
+        BrowserDaemon(
+            port=args.port,
+            headless=not args.headed,
+            executable=args.executable,
+            health_interval=args.health_interval,
+        ).serve_forever()
+        return
+
+    endpoint = daemon_endpoint()
+    if args.command == "status":
+        info = check_health(endpoint) if endpoint else None
+        if not info:
+            print("Browser daemon không chạy")
+            sys.exit(1)
+        print(f"Browser daemon: {endpoint} ({info.get('Browser')})")
+    elif args.command == "stop":
+        try:
+            state = json.loads(STATE_FILE.read_text(encoding="utf-8"))
+        except (OSError, ValueError):
+            print("Browser daemon không chạy")
+            sys.exit(1)
+        try:
+            os.kill(state["pid"], signal.SIGTERM)
+            print(f"Đã gửi SIGTERM tới daemon (pid {state['pid']})")
+        except ProcessLookupError:
+            STATE_FILE.unlink()
+            print("Daemon đã dừng từ trước, đã xóa file state")
+    elif args.command == "bench":
+        if not endpoint or not check_health(endpoint):
+            print("Cần chạy `python browser_daemon.py serve` trước khi đo")
+            sys.exit(1)
+        print_startup_report(asyncio.run(compare_startup(endpoint, args.runs)))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,157 @@
+import asyncio
+import time
+from dataclasses import dataclass, field
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+from urllib.parse import urlsplit
+from forms import bulk_fill
+from tracing import TRACER
+from waits import DRAWER_SELECTOR
+
+# Trạng thái trang: URL, số drawer đang mở và giá trị các ô text trong drawer trên cùng
+_CAPTURE_STATE_JS = """
+(drawerSelector) => {
+    const visible = el => el.getClientRects().length > 0;
+    const drawers = Array.from(document.querySelectorAll(drawerSelector)).filter(visible);
+    const fields = {};
+    if (drawers.length) {
+        for (const el of drawers[drawers.length - 1].querySelectorAll('input[name], textarea[name]')) {
+            if (!visible(el) || el.readOnly || el.disabled || ['checkbox', 'radio', 'hidden'].includes(el.type)) continue;
+            if (el.getAttribute('role') === 'combobox' || !el.value) continue;
+            fields[el.name] = el.value;
+        }
+    }
+    return {url: location.href, drawers: drawers.length, fields};
+}
+"""
+
+StepCall = Tuple[str, Tuple[Any, ...], Dict[str, Any]]
+
+# Step không idempotent: POST tạo record có thể đã thành công dù chờ response lỗi/timeout,
+# bấm Save lần nữa sẽ tạo record trùng nên lỗi là dừng luôn
+NON_RETRYABLE_STEPS = frozenset({"save_lead", "save_opportunity"})
+
+
+@dataclass
+class Checkpoint:
+    """Trạng thái trang sau khi một step chạy xong, đủ để quay lại và chạy tiếp step sau"""
+    step: str
+    url: str
+    drawers: int = 0
+    fields: Dict[str, str] = field(default_factory=dict)
+    # Step đã mở drawer hiện tại và các step đã điền vào drawer đó (để phát lại khi drawer bị mất)
+    drawer_opener: Optional[StepCall] = None
+    drawer_steps: List[StepCall] = field(default_factory=list)
+    created_at: float = field(default_factory=time.time)
+
+
+class StepRetrier:
+    """Chạy từng step của automation, lưu checkpoint sau mỗi step và chỉ retry step bị lỗi"""
+
+    def __init__(
+        self,
+        automation: Any,
+        max_retries: int = 2,
+        backoff: float = 0.5,
+        backoff_factor: float = 2.0,
+        max_backoff: float = 5.0,
+        non_retryable: Iterable[str] = NON_RETRYABLE_STEPS,
+    ):
+        self.automation = automation
+        self.max_retries = max_retries
+        self.non_retryable = frozenset(non_retryable)
+        self.backoff = backoff
+        self.backoff_factor = backoff_factor
+        self.max_backoff = max_backoff
+        self.checkpoint: Optional[Checkpoint] = None
+        self.retries = 0
+
+    @property
+    def page(self):
+        if self.automation.page is None:
+            raise RuntimeError("Page not initialized")
+        return self.automation.page
+
+    async def capture(self) -> Dict[str, Any]:
+        return await self.page.evaluate(_CAPTURE_STATE_JS, DRAWER_SELECTOR)
+
+    async def run(self, step: str, *args: Any, **kwargs: Any) -> Any:
+        """Chạy `automation.<step>(*args, **kwargs)`; lỗi thì khôi phục checkpoint, chờ backoff rồi chạy lại.
+        Step trong `non_retryable` chỉ chạy một lần"""
+        delay = self.backoff
+        max_retries = 0 if step in self.non_retryable else self.max_retries
+        for attempt in range(max_retries + 1):
+            try:
+                result = await getattr(self.automation, step)(*args, **kwargs)
+                break
+            except Exception as e:
+                if attempt >= max_retries:
+                    print(f"Step {step} thất bại sau {attempt + 1} lần: {e}")
+                    raise
+                self.retries += 1
+                print(f"Step {step} lỗi (lần {attempt + 1}), thử lại sau {delay:.1f}s: {e}")
+                await asyncio.sleep(delay)
+                delay = min(delay * self.backoff_factor, self.max_backoff)
+                with TRACER.span(f"restore:{step}", attempt=attempt + 1):
+                    await self.restore()
+        await self._record(step, args, kwargs)
+        return result
+
+    async def _record(self, step: str, args: Tuple[Any, ...], kwargs: Dict[str, Any]):
+        state = await self.capture()
+        previous = self.checkpoint
+        opener: Optional[StepCall] = None
+        drawer_steps: List[StepCall] = []
+        call = (step, args, kwargs)
+        if state["drawers"]:
+            if previous and previous.drawers:
+                # Vẫn ở trong drawer cũ: step này đã điền thêm vào form
+                opener = previous.drawer_opener
+                drawer_steps = previous.drawer_steps + [call]
+            else:
+                opener = call
+        self.checkpoint = Checkpoint(step, state["url"], state["drawers"], state["fields"], opener, drawer_steps)
+
+    async def restore(self):
+        """Đưa trang về trạng thái của checkpoint gần nhất"""
+        checkpoint = self.checkpoint
+        if checkpoint is None:
+            return
+        page = self.page
+        state = await self.capture()
+
+        # Đóng drawer/popup thừa do step lỗi mở ra (vd: drawer Company lồng nhau)
+        for _ in range(state["drawers"] - checkpoint.drawers):
+            await page.keyboard.press("Escape")
+        if state["drawers"] > checkpoint.drawers:
+            await self.automation.waits.network_idle()
+            state = await self.capture()
+
+        if _page_path(state["url"]) != _page_path(checkpoint.url):
+            print(f"Khôi phục URL: {checkpoint.url}")
+            await page.goto(checkpoint.url)
+            await self.automation.waits.network_idle()
+            state = await self.capture()
+
+        if checkpoint.drawers and not state["drawers"]:
+            # Drawer đã mất (reload/điều hướng): mở lại và phát lại các step đã điền
+            if checkpoint.drawer_opener is None:
+                raise RuntimeError(f"Cannot reopen drawer for checkpoint {checkpoint.step}")
+            print(f"Mở lại drawer, phát lại {len(checkpoint.drawer_steps)} step")
+            for step, args, kwargs in [checkpoint.drawer_opener] + checkpoint.drawer_steps:
+                await getattr(self.automation, step)(*args, **kwargs)
+            return
+
+        # Drawer vẫn mở: điền lại các ô text bị mất giá trị
+        lost = {
+            f"input[name='{name}']": value
+            for name, value in checkpoint.fields.items()
+            if state["fields"].get(name) != value
+        }
+        if lost:
+            print(f"Điền lại {len(lost)} ô bị mất giá trị")
+            await bulk_fill(page, lost, DRAWER_SELECTOR)
+
+
+def _page_path(url: str) -> str:
+    parts = urlsplit(url)
+    return f"{parts.netloc}{parts.path}"
@@ -0,0 +1,162 @@
+import base64
+import json
+import time
+import traceback
+from collections import deque
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Deque, Dict, Optional, Tuple
+from playwright.async_api import CDPSession, ConsoleMessage, Page, Request, Response
+from tracing import TRACE_DIR
+from waits import TRACKED_RESOURCE_TYPES
+
+DIAGNOSTICS_DIR = TRACE_DIR / "diagnostics"
+MAX_TEXT = 500
+
+
+def _clip(text: str, limit: int = MAX_TEXT) -> str:
+    return text if len(text) <= limit else text[:limit] + "…"
+
+
+class DiagnosticsRecorder:
+    """Ring buffer trong bộ nhớ: action, console, network và snapshot JPEG nhỏ; chỉ ghi ra đĩa khi step lỗi"""
+
+    def __init__(
+        self,
+        page: Page,
+        capacity: int = 300,
+        snapshot_capacity: int = 5,
+        snapshot_scale: float = 0.25,
+        snapshot_quality: int = 30,
+        budget: float = 0.03,
+        out_dir: Path = DIAGNOSTICS_DIR,
+    ):
+        self.page = page
+        self.events: Deque[Dict[str, Any]] = deque(maxlen=capacity)
+        self.snapshots: Deque[Tuple[float, str, str]] = deque(maxlen=snapshot_capacity)
+        self.snapshot_scale = snapshot_scale
+        self.snapshot_quality = snapshot_quality
+        # Tỉ lệ thời gian tối đa dành cho diagnostics so với thời gian chạy
+        self.budget = budget
+        self.out_dir = Path(out_dir)
+        self.started_ns = time.perf_counter_ns()
+        self.overhead_ns = 0
+        self.snapshots_taken = 0
+        self.snapshots_skipped = 0
+        self.dumps = 0
+        self._cdp: Optional[CDPSession] = None
+        self._cdp_failed = False
+        page.on("console", self._on_console)
+        page.on("pageerror", self._on_page_error)
+        page.on("response", self._on_response)
+        page.on("requestfailed", self._on_request_failed)
+
+    def _add(self, kind: str, **data: Any):
+        started = time.perf_counter_ns()
+        data["t"] = time.time()
+        data["kind"] = kind
+        self.events.append(data)
+        self.overhead_ns += time.perf_counter_ns() - started
+
+    def _on_console(self, message: ConsoleMessage):
+        self._add("console", level=message.type, text=_clip(message.text))
+
+    def _on_page_error(self, error: Exception):
+        self._add("pageerror", text=_clip(str(error)))
+
+    def _on_response(self, response: Response):
+        request = response.request
+        if request.resource_type in TRACKED_RESOURCE_TYPES or response.status >= 400:
+            self._add("network", method=request.method, url=_clip(response.url, 300), status=response.status)
+
+    def _on_request_failed(self, request: Request):
+        self._add("network", method=request.method, url=_clip(request.url, 300), failure=request.failure)
+
+    def overhead_ratio(self) -> float:
+        elapsed = time.perf_counter_ns() - self.started_ns
+        return self.overhead_ns / elapsed if elapsed else 0.0
+
+    async def _capture(self) -> Optional[str]:
+        """Chụp JPEG độ phân giải thấp (base64) qua CDP; trình duyệt không hỗ trợ CDP thì dùng screenshot thường"""
+        if self._cdp is None and not self._cdp_failed:
+            try:
+                self._cdp = await self.page.context.new_cdp_session(self.page)
+            except Exception:
+                self._cdp_failed = True
+        viewport = self.page.viewport_size or {"width": 1280, "height": 720}
+        if self._cdp is not None:
+            result = await self._cdp.send("Page.captureScreenshot", {
+                "format": "jpeg",
+                "quality": self.snapshot_quality,
+                "clip": {"x": 0, "y": 0, "width": viewport["width"], "height": viewport["height"], "scale": self.snapshot_scale},
+            })
+            return result["data"]
+        data = await self.page.screenshot(type="jpeg", quality=self.snapshot_quality)
+        return base64.b64encode(data).decode("ascii")
+
+    async def snapshot(self, label: str, force: bool = False):
+        """Thêm một snapshot vào buffer; bỏ qua nếu đã vượt budget overhead (trừ khi force)"""
+        if not force and self.overhead_ratio() > self.budget:
+            self.snapshots_skipped += 1
+            return
+        started = time.perf_counter_ns()
+        try:
+            data = await self._capture()
+        except Exception as e:
+            self._add("diagnostics", text=f"snapshot failed: {_clip(str(e))}")
+            data = None
+        if data:
+            self.snapshots.append((time.time(), label, data))
+            self.snapshots_taken += 1
+        self.overhead_ns += time.perf_counter_ns() - started
+
+    async def before_step(self, step: str):
+        self._add("action", step=step, url=_clip(self.page.url, 300))
+        await self.snapshot(step)
+
+    def after_step(self, step: str, elapsed_ms: float):
+        self._add("action", step=step, elapsed_ms=round(elapsed_ms, 1))
+
+    async def on_failure(self, step: str, error: BaseException) -> Optional[Path]:
+        """Ghi buffer ra đĩa một lần cho mỗi exception (step cha re-raise cùng exception thì bỏ qua)"""
+        if getattr(error, "_diagnostics_dumped", False):
+            return None
+        try:
+            setattr(error, "_diagnostics_dumped", True)
+        except AttributeError:
+            pass
+        self._add("error", step=step, text=_clip(repr(error)))
+        if not self.page.is_closed():
+            await self.snapshot(f"failure:{step}", force=True)
+        try:
+            path = self.dump(step, error)
+        except OSError as e:
+            print(f"Lỗi ghi diagnostics: {e}")
+            return None
+        print(f"Diagnostics của step {step} đã ghi vào {path}")
+        return path
+
+    def dump(self, step: str, error: BaseException) -> Path:
+        """Ghi events, snapshot và traceback vào một thư mục riêng"""
+        self.dumps += 1
+        stamp = datetime.now().strftime("%Y%m%d-%H%M%S")
+        safe_step = "".join(c if c.isalnum() or c in "-_" else "_" for c in step)[:60]
+        path = self.out_dir / f"{stamp}-{self.dumps}-{safe_step}"
+        path.mkdir(parents=True, exist_ok=True)
+        with (path / "events.jsonl").open("w", encoding="utf-8") as f:
+            for event in self.events:
+                f.write(json.dumps(event, ensure_ascii=False, default=str) + "\n")
+        for index, (_, label, data) in enumerate(self.snapshots):
+            safe_label = "".join(c if c.isalnum() or c in "-_" else "_" for c in label)[:60]
+            (path / f"{index:02d}-{safe_label}.jpg").write_bytes(base64.b64decode(data))
+        (path / "error.txt").write_text(
+            f"step: {step}\nurl: {self.page.url}\n\n" + "".join(traceback.format_exception(error)),
+            encoding="utf-8",
+        )
+        return path
+
+    def report(self) -> str:
+        return (
+            f"Diagnostics: overhead {self.overhead_ns / 1e6:.0f} ms ({self.overhead_ratio():.1%}, budget {self.budget:.0%}), "
+            f"snapshot {self.snapshots_taken} chụp / {self.snapshots_skipped} bỏ qua, {self.dumps} lần ghi lỗi"
+        )
@@ -0,0 +1,61 @@
+from typing import Any, Awaitable, Callable, Optional, Tuple
+from urllib.parse import urlparse
+from playwright.async_api import Page, Response
+
+# Đường dẫn API backend mà các form gọi tới (so khớp theo phần cuối của path)
+AUTH_PATH = "/api/auth/login"
+LEAD_CREATE_PATH = "/api/leads"
+OPPORTUNITY_CREATE_PATH = "/api/opportunities"
+
+
+class StepResponseError(RuntimeError):
+    """Backend trả về response không hợp lệ cho một step"""
+
+
+def response_matcher(path: str, method: str = "POST") -> Callable[[Response], bool]:
+    """Predicate chọn response của request `method` tới `path`"""
+    def matches(response: Response) -> bool:
+        return (
+            response.request.method == method
+            and urlparse(response.url).path.rstrip("/").endswith(path)
+        )
+    return matches
+
+
+def find_record_id(payload: Any) -> Optional[str]:
+    """Lấy ID record từ body JSON: {"id"}, {"_id"} hoặc lồng trong {"data": ...}"""
+    if not isinstance(payload, dict):
+        return None
+    for key in ("id", "_id"):
+        if payload.get(key) not in (None, ""):
+            return str(payload[key])
+    for key in ("data", "result", "record"):
+        if key in payload:
+            record_id = find_record_id(payload[key])
+            if record_id:
+                return record_id
+    return None
+
+
+async def expect_step_response(
+    page: Page,
+    path: str,
+    action: Callable[[], Awaitable[Any]],
+    method: str = "POST",
+    require_id: bool = False,
+    timeout: int = 10000,
+) -> Tuple[Response, Optional[str]]:
+    """Thực hiện action và chờ đúng response backend tương ứng; kiểm tra status và ID trả về"""
+    async with page.expect_response(response_matcher(path, method), timeout=timeout) as info:
+        await action()
+    response = await info.value
+    if not response.ok:
+        raise StepResponseError(f"{method} {path} returned {response.status}")
+    record_id = None
+    try:
+        record_id = find_record_id(await response.json())
+    except Exception:
+        pass
+    if require_id and record_id is None:
+        raise StepResponseError(f"{method} {path} returned no record ID")
+    return response, record_id
@@ -0,0 +1,385 @@
+import argparse
+import asyncio
+import importlib
+import json
+import time
+import zlib
+from dataclasses import asdict, dataclass, field
+from pathlib import Path
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Set, Tuple
+from urllib.parse import urlparse
+from playwright.async_api import APIRequestContext, Error as PlaywrightError, Playwright, Request
+from credentials import MOGA_STG_URL
+from endpoints import LEAD_CREATE_PATH, OPPORTUNITY_CREATE_PATH, StepResponseError, find_record_id
+from journal import ResultJournal
+from moga_standin import StandinServer
+from records import Record, iter_records, validate_file
+from session import AUTH_DIR, SessionCache
+from synthetic import RecordGenerator, load_catalog
+from tracing import percentile
+
+lead_module = importlib.import_module("01_login_success_test_optimized")
+opti_module = importlib.import_module("02_opti")
+
+CREATE_PATHS = {"lead": LEAD_CREATE_PATH, "opportunity": OPPORTUNITY_CREATE_PATH}
+# Status đáng retry: backend quá tải / gateway lỗi tạm thời
+RETRY_STATUSES = {429, 502, 503, 504}
+
+
+class SessionExpiredError(StepResponseError):
+    """Backend trả 401: session trong storage_state đã hết hạn, dừng cả lượt chạy"""
+
+
+class PayloadMismatchError(StepResponseError):
+    """Không dựng lại được body mà form gửi từ field của record: không chạy fast path"""
+
+
+@dataclass
+class PayloadTemplate:
+    """Body form gửi khi bấm Save, suy ra từ một lần tạo qua UI: key của body -> field của record, còn lại là hằng số"""
+    fields: Dict[str, str]
+    constants: Dict[str, Any]
+
+    @classmethod
+    def from_form(cls, record: Record, sent: Dict[str, Any]) -> "PayloadTemplate":
+        values = asdict(record)
+        fields: Dict[str, str] = {}
+        constants: Dict[str, Any] = {}
+        for key, value in sent.items():
+            # Ưu tiên field cùng tên; không có thì field chưa dùng có cùng giá trị
+            candidates = [key] if key in values and str(values[key]) == str(value) else [
+                name for name, v in values.items()
+                if v not in ("", None) and str(v) == str(value) and name not in fields.values()
+            ]
+            if candidates:
+                fields[key] = candidates[0]
+            else:
+                constants[key] = value
+        template = cls(fields, constants)
+        unmapped = sorted(name for name, v in values.items() if v not in ("", None) and name not in fields.values())
+        if unmapped:
+            raise PayloadMismatchError(f"form body has no value for record field(s) {unmapped}")
+        differing = sorted(k for k, v in template.build(record).items() if sent.get(k) != v)
+        if differing:
+            raise PayloadMismatchError(f"API payload differs from form body for key(s) {differing}")
+        return template
+
+    def build(self, record: Record) -> Dict[str, Any]:
+        return {**self.constants, **{key: getattr(record, name) for key, name in self.fields.items()}}
+
+
+def bearer_token(state: Dict[str, Any]) -> Optional[str]:
+    """Token trong localStorage của storage_state (nếu app dùng header Authorization thay vì cookie)"""
+    for origin in state.get("origins", []):
+        for item in origin.get("localStorage", []):
+            value = str(item.get("value", "")).strip('"')
+            if "token" in item.get("name", "").lower() and value and not any(c in value for c in " {["):
+                return value
+    return None
+
+
+async def new_api_context(playwright: Playwright, base_url: str, storage_state: str) -> APIRequestContext:
+    """APIRequestContext dùng chung (giữ kết nối keep-alive) với cookie/token của session đã đăng nhập"""
+    state = json.loads(Path(storage_state).read_text(encoding="utf-8"))
+    token = bearer_token(state)
+    return await playwright.request.new_context(
+        base_url=base_url,
+        storage_state=storage_state,
+        extra_http_headers={"Authorization": f"Bearer {token}"} if token else None,
+    )
+
+
+@dataclass
+class FastPathStats:
+    api: int = 0
+    ui: int = 0
+    failed: int = 0
+    skipped: int = 0
+    payload_mismatches: int = 0
+    elapsed: float = 0.0
+    api_latencies: List[float] = field(default_factory=list)
+
+    def report(self) -> str:
+        latencies = sorted(self.api_latencies)
+        created = self.api + self.ui
+        rate = created / self.elapsed if self.elapsed else 0.0
+        return (
+            f"Fast path: {created} record ({self.api} API, {self.ui} UI), {self.failed} lỗi, {self.skipped} bỏ qua, "
+            f"{rate:.1f} record/s; API p50 {percentile(latencies, 50):.0f} ms / p95 {percentile(latencies, 95):.0f} ms; "
+            f"payload UI khác API: {self.payload_mismatches}"
+        )
+
+
+class FastPathCreator:
+    """Tạo record bằng đúng API mà form gọi, dùng session đã đăng nhập và nhiều request song song.
+    Một phần `ui_fraction` record (chọn theo hash của key, cố định giữa các lần chạy) vẫn đi qua form để kiểm tra UI"""
+
+    def __init__(
+        self,
+        automation: Any,
+        kind: str,
+        storage_state: str,
+        base_url: str = MOGA_STG_URL,
+        concurrency: int = 16,
+        ui_fraction: float = 0.01,
+        journal: Optional[ResultJournal] = None,
+        max_retries: int = 2,
+        backoff: float = 0.5,
+    ):
+        self.automation = automation
+        self.kind = kind
+        self.path = CREATE_PATHS[kind]
+        self.storage_state = storage_state
+        self.base_url = base_url
+        self.concurrency = concurrency
+        self.ui_fraction = ui_fraction
+        self.journal = journal
+        self.max_retries = max_retries
+        self.backoff = backoff
+        self.stats = FastPathStats()
+        self.api: Optional[APIRequestContext] = None
+        self._ui_lock = asyncio.Lock()
+        self._aborted: Optional[BaseException] = None
+        self._reported_mismatches: Set[str] = set()
+        self.template: Optional[PayloadTemplate] = None
+
+    async def start(self, playwright: Playwright):
+        self.api = await new_api_context(playwright, self.base_url, self.storage_state)
+
+    async def close(self):
+        if self.api:
+            await self.api.dispose()
+            self.api = None
+
+    def use_ui(self, key: str) -> bool:
+        return zlib.crc32(key.encode("utf-8")) % 10000 < self.ui_fraction * 10000
+
+    async def create_via_api(self, record: Record) -> str:
+        """POST record lên backend; retry lỗi mạng và status tạm thời với backoff"""
+        if self.api is None:
+            raise RuntimeError("API context not started")
+        if self.template is None:
+            raise RuntimeError("Payload template not calibrated")
+        payload = self.template.build(record)
+        delay = self.backoff
+        for attempt in range(self.max_retries + 1):
+            try:
+                response = await self.api.post(self.path, data=payload)
+            except PlaywrightError as e:
+                if attempt >= self.max_retries:
+                    raise
+                print(f"POST {self.path} lỗi mạng (lần {attempt + 1}): {e}")
+            else:
+                try:
+                    if response.status == 401:
+                        raise SessionExpiredError(f"POST {self.path} returned 401")
+                    if response.ok:
+                        record_id = find_record_id(await response.json())
+                        if record_id is None:
+                            raise StepResponseError(f"POST {self.path} returned no record ID")
+                        return record_id
+                    if response.status not in RETRY_STATUSES or attempt >= self.max_retries:
+                        raise StepResponseError(f"POST {self.path} returned {response.status}")
+                finally:
+                    # Giải phóng body đã buffer, không thì bộ nhớ tăng theo số request
+                    await response.dispose()
+            await asyncio.sleep(delay)
+            delay *= 2
+        raise StepResponseError(f"POST {self.path} failed")
+
+    async def create_via_ui(self, record: Record) -> Optional[str]:
+        """Tạo record qua form và so body form gửi với body của fast path"""
+        record_id, sent = await self._submit_form(record)
+        if sent is not None:
+            self._compare_payload(record, sent)
+        return record_id
+
+    async def _submit_form(self, record: Record) -> Tuple[Optional[str], Optional[Dict[str, Any]]]:
+        """Tạo record qua form (một page, lần lượt); trả về ID và body POST mà form gửi"""
+        async with self._ui_lock:
+            page = self.automation.page
+            if page is None:
+                raise RuntimeError("Page not initialized")
+            sent: List[Request] = []
+
+            def on_request(request: Request):
+                if request.method == "POST" and urlparse(request.url).path.rstrip("/").endswith(self.path):
+                    sent.append(request)
+
+            page.on("request", on_request)
+            try:
+                if self.kind == "lead":
+                    await self.automation.add_new_lead()
+                    await self.automation.fill_lead_information(record)
+                    record_id = await self.automation.save_lead()
+                else:
+                    await self.automation.add_new_opti()
+                    await self.automation.fill_opti_information(record)
+                    record_id = await self.automation.save_opportunity()
+            finally:
+                page.remove_listener("request", on_request)
+        return record_id, (sent[-1].post_data_json or {}) if sent else None
+
+    async def calibrate(self, record: Record) -> Optional[str]:
+        """Tạo record đầu tiên qua form, dựng template body của API từ request form gửi.
+        Record được ghi journal ngay khi lưu xong (teardown tìm được) rồi mới dựng template;
+        body dựng lại khác body form thì dừng trước khi chạy fast path"""
+        started = time.perf_counter()
+        record_id, sent = await self._submit_form(record)
+        self.stats.ui += 1
+        if self.journal:
+            self.journal.record(self.kind, record.key, record_id, "ok", (time.perf_counter() - started) * 1000)
+            self.journal.flush()
+        if sent is None:
+            raise PayloadMismatchError(f"form sent no POST {self.path}")
+        self.template = PayloadTemplate.from_form(record, sent)
+        if self.template.constants:
+            print(f"Body form có giá trị cố định: {sorted(self.template.constants)}")
+        return record_id
+
+    def _compare_payload(self, record: Record, sent: Dict[str, Any]):
+        expected = self.template.build(record) if self.template else {}
+        missing = sorted(set(sent) - set(expected))
+        differing = sorted(k for k in expected if k in sent and str(sent[k]) != str(expected[k]))
+        if not missing and not differing:
+            return
+        self.stats.payload_mismatches += 1
+        signature = f"{missing}|{differing}"
+        if signature not in self._reported_mismatches:
+            self._reported_mismatches.add(signature)
+            print(f"Cảnh báo: form gửi khác fast path ({record.key}): thiếu {missing}, khác giá trị {differing}")
+
+    async def _create(self, record: Record, semaphore: asyncio.Semaphore):
+        started = time.perf_counter()
+        via_ui = self.use_ui(record.key)
+        try:
+            record_id = await (self.create_via_ui(record) if via_ui else self.create_via_api(record))
+        except SessionExpiredError as e:
+            self._aborted = e
+            return
+        except Exception as e:
+            self.stats.failed += 1
+            print(f"Lỗi tạo {self.kind} {record.key}: {e}")
+            if self.journal:
+                self.journal.record(self.kind, record.key, None, "failed", (time.perf_counter() - started) * 1000, repr(e))
+            return
+        finally:
+            semaphore.release()
+        duration_ms = (time.perf_counter() - started) * 1000
+        if via_ui:
+            self.stats.ui += 1
+        else:
+            self.stats.api += 1
+            self.stats.api_latencies.append(duration_ms)
+        if self.journal:
+            self.journal.record(self.kind, record.key, record_id, "ok", duration_ms)
+        created = self.stats.api + self.stats.ui
+        if created % 100 == 0:
+            print(f"Đã tạo {created} {self.kind} ({self.stats.ui} qua UI)")
+
+    async def run(self, records: Iterable[Record]) -> FastPathStats:
+        """Tạo tất cả record (đọc dần từ iterable), tối đa `concurrency` request cùng lúc"""
+        semaphore = asyncio.Semaphore(self.concurrency)
+        tasks: Set[asyncio.Task] = set()
+        started = time.perf_counter()
+        pending = self._skip_done(records)
+        if self.template is None:
+            # Record đầu tiên qua UI: lấy body thật của form trước khi gửi API song song
+            for record in pending:
+                await self.calibrate(record)
+                break
+        for record in pending:
+            if self._aborted:
+                break
+            await semaphore.acquire()
+            task = asyncio.create_task(self._create(record, semaphore))
+            tasks.add(task)
+            task.add_done_callback(tasks.discard)
+        if tasks:
+            await asyncio.gather(*tasks)
+        self.stats.elapsed = time.perf_counter() - started
+        if self._aborted:
+            raise self._aborted
+        return self.stats
+
+    def _skip_done(self, records: Iterable[Record]) -> Iterator[Record]:
+        """Bỏ qua record có key đã tạo thành công ở lần chạy trước (theo journal)"""
+        for record in records:
+            if self.journal and self.journal.is_done(self.kind, record.key):
+                self.stats.skipped += 1
+                continue
+            yield record
+
+
+async def run_fast_path(args: argparse.Namespace) -> FastPathStats:
+    server = None
+    base_url = args.url
+    if args.standin:
+        server = StandinServer(delay=args.delay)
+        server.start_in_background()
+        base_url = server.url
+        print(f"MOGA stand-in chạy tại {base_url}")
+    # Opportunity không có dropdown: file opportunity không cần catalog
+    catalog = load_catalog(args.catalog, standin=args.standin) if args.kind == "lead" or not args.file else None
+    if args.file:
+        total = validate_file(args.file, args.kind, catalog=catalog)
+        records = iter_records(args.file, args.kind)
+    else:
+        total = args.count
+        records = RecordGenerator(args.seed, args.tag, catalog).iter_records(args.kind, args.count, args.start)
+    print(f"Tạo {total} {args.kind} qua fast path, {args.ui_fraction:.1%} qua UI")
+    module = lead_module if args.kind == "lead" else opti_module
+    # State của stand-in để riêng, không ghi đè session staging của cùng username
+    session = SessionCache(base_url=base_url, auth_dir=AUTH_DIR / "standin" if args.standin else AUTH_DIR)
+    try:
+        with ResultJournal(target=base_url) as journal:
+            async with module.MOGAWebAutomation(headless=not args.headed) as automation:
+                state = await session.get_state(automation.browser)
+                # Luôn mở form: record đầu tiên đi qua UI để lấy body thật của API
+                context = await automation.browser.new_context(storage_state=state)
+                await automation.page.close()
+                automation.attach_page(await context.new_page())
+                await automation.navigate_to_url(base_url)
+                if args.kind == "lead":
+                    await automation.access_lead_section()
+                    await automation.change_list_view()
+                else:
+                    await automation.access_opti_section()
+                creator = FastPathCreator(
+                    automation, args.kind, state, base_url, args.concurrency, args.ui_fraction, journal,
+                )
+                await creator.start(automation.playwright)
+                try:
+                    stats = await creator.run(records)
+                finally:
+                    await creator.close()
+    finally:
+        if server:
+            server.shutdown()
+            server.server_close()
+    print(stats.report())
+    return stats
+
+
+def main():
+    """Tạo lead/opportunity hàng loạt qua API, kiểm tra một phần qua UI"""
+    parser = argparse.ArgumentParser(description="Tạo record MOGA CRM nhanh qua API backend của form")
+    parser.add_argument("kind", choices=("lead", "opportunity"))
+    parser.add_argument("--file", help="File CSV/JSONL; không có thì sinh record giả lập")
+    parser.add_argument("--count", type=int, default=1000, help="Số record giả lập")
+    parser.add_argument("--start", type=int, default=0)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--tag")
+    parser.add_argument("--catalog", type=Path, help="File catalog dropdown (mặc định dropdown_catalog.json; --standin dùng giá trị của stand-in)")
+    parser.add_argument("--concurrency", type=int, default=16, help="Số request tạo record cùng lúc")
+    parser.add_argument("--ui-fraction", type=float, default=0.01, help="Tỉ lệ record tạo qua form để kiểm tra UI")
+    parser.add_argument("--url", default=MOGA_STG_URL)
+    parser.add_argument("--standin", action="store_true", help="Chạy trên stand-in local thay vì --url")
+    parser.add_argument("--delay", type=float, default=0.05, help="Độ trễ API của stand-in (giây)")
+    parser.add_argument("--headed", action="store_true")
+    args = parser.parse_args()
+    asyncio.run(run_fast_path(args))
+
+
+if __name__ == "__main__":
+    main()
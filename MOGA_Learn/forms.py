@@ -0,0 +1,84 @@
+from typing import Mapping, Optional
+from playwright.async_api import Locator, Page
+from page_objects import Role, Selector, to_locator
+
+# Role(textbox, <tên>) được gửi sang JS dưới dạng "name=<tên>" (tìm theo accessible name), còn lại là CSS selector
+NAME_PREFIX = "name="
+
+# Điền nhiều ô text trong một lần evaluate; dùng native setter + event input/change để React nhận giá trị
+_BULK_FILL_JS = """
+([rootSelector, entries, namePrefix]) => {
+    const visible = el => el.getClientRects().length > 0;
+    let root = document;
+    if (rootSelector) {
+        const roots = Array.from(document.querySelectorAll(rootSelector)).filter(visible);
+        if (roots.length) root = roots[roots.length - 1];
+    }
+    const textboxes = Array.from(root.querySelectorAll('input, textarea'))
+        .filter(el => visible(el) && !['checkbox', 'radio', 'button', 'submit', 'hidden'].includes(el.type)
+            && el.getAttribute('role') !== 'combobox');
+    const accessibleName = el => {
+        if (el.getAttribute('aria-label')) return el.getAttribute('aria-label');
+        const labelledBy = el.getAttribute('aria-labelledby');
+        if (labelledBy) {
+            return labelledBy.split(/\\s+/).map(id => (document.getElementById(id) || {}).textContent || '').join(' ');
+        }
+        if (el.labels && el.labels.length) return el.labels[0].textContent;
+        return el.getAttribute('placeholder') || el.getAttribute('title') || '';
+    };
+    const byName = name => {
+        const wanted = name.trim().toLowerCase();
+        const names = textboxes.map(el => [el, accessibleName(el).trim().toLowerCase()]);
+        const exact = names.filter(([, n]) => n === wanted);
+        if (exact.length === 1) return exact[0][0];
+        const partial = names.filter(([, n]) => n.includes(wanted));
+        return partial.length === 1 ? partial[0][0] : null;
+    };
+    const missing = [];
+    for (const [key, value] of entries) {
+        let el = null;
+        if (key.startsWith(namePrefix)) {
+            el = byName(key.slice(namePrefix.length));
+        } else {
+            const matches = Array.from(root.querySelectorAll(key)).filter(visible);
+            el = matches.length === 1 ? matches[0] : null;
+        }
+        if (!el || el.readOnly || el.disabled) {
+            missing.push(key);
+            continue;
+        }
+        const proto = el instanceof HTMLTextAreaElement ? HTMLTextAreaElement.prototype : HTMLInputElement.prototype;
+        el.focus();
+        Object.getOwnPropertyDescriptor(proto, 'value').set.call(el, value);
+        el.dispatchEvent(new Event('input', {bubbles: true}));
+        el.dispatchEvent(new Event('change', {bubbles: true}));
+        el.blur();
+    }
+    return missing;
+}
+"""
+
+
+def _js_key(selector: Selector) -> str:
+    if isinstance(selector, Role):
+        return NAME_PREFIX + selector.name
+    if isinstance(selector, str):
+        return selector
+    raise TypeError(f"bulk_fill only supports Role or CSS selectors, got {selector!r}")
+
+
+def field_locator(page: Page, selector: Selector) -> Locator:
+    """Locator Playwright tương ứng với một selector của bulk_fill"""
+    return to_locator(page, selector)
+
+
+async def bulk_fill(page: Page, fields: Mapping[Selector, str], root: Optional[str] = None) -> int:
+    """Điền các ô text trong một round trip; ô không tìm được thì fallback về locator.fill()"""
+    by_key = {_js_key(selector): selector for selector, value in fields.items() if value}
+    if not by_key:
+        return 0
+    entries = [(key, fields[selector]) for key, selector in by_key.items()]
+    missing = await page.evaluate(_BULK_FILL_JS, [root, entries, NAME_PREFIX])
+    for key in missing:
+        await field_locator(page, by_key[key]).fill(fields[by_key[key]])
+    return len(entries) - len(missing)
@@ -0,0 +1,194 @@
+import argparse
+import sqlite3
+import time
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple, Union
+from credentials import MOGA_STG_URL
+from tracing import TRACE_DIR, TRACER, percentile
+
+JOURNAL_FILE = TRACE_DIR / "journal.sqlite"
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS results (
+    seq INTEGER PRIMARY KEY AUTOINCREMENT,
+    run_id TEXT NOT NULL,
+    target TEXT NOT NULL DEFAULT '',
+    kind TEXT NOT NULL,
+    key TEXT NOT NULL,
+    record_id TEXT,
+    status TEXT NOT NULL,
+    duration_ms REAL,
+    error TEXT,
+    finished_at REAL NOT NULL
+);
+"""
+
+_INDEXES = """
+CREATE INDEX IF NOT EXISTS results_target_key ON results (target, kind, key, status);
+CREATE INDEX IF NOT EXISTS results_run ON results (run_id, status);
+"""
+
+# Dòng 'ok' mà sau đó chưa có dòng 'deleted' (teardown) cho cùng key
+_NOT_DELETED = (
+    "NOT EXISTS (SELECT 1 FROM results d WHERE d.target = r.target AND d.kind = r.kind AND d.key = r.key"
+    " AND d.status = 'deleted' AND d.seq > r.seq)"
+)
+
+JournalRow = Tuple[str, str, str, str, Optional[str], str, Optional[float], Optional[str], float]
+
+
+class ResultJournal:
+    """Nhật ký append-only (SQLite WAL) các record đã xử lý, dùng để chạy lại bulk run mà không tạo trùng.
+    Ghi theo batch: commit khi đủ `batch_size` dòng hoặc quá `flush_interval` giây.
+    Mỗi journal chỉ đọc/ghi các dòng của `target` (base URL), stand-in và staging không lẫn nhau"""
+
+    def __init__(
+        self,
+        path: Union[str, Path] = JOURNAL_FILE,
+        batch_size: int = 20,
+        flush_interval: float = 1.0,
+        durable: bool = False,
+        run_id: Optional[str] = None,
+        target: str = MOGA_STG_URL,
+    ):
+        self.path = Path(path)
+        self.target = target.rstrip("/")
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.run_id = run_id or TRACER.run_id
+        # timeout: nhiều shard có thể ghi cùng một file
+        self.conn = sqlite3.connect(self.path, timeout=30)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        # NORMAL: WAL chỉ fsync lúc checkpoint, crash của process không mất dữ liệu đã commit;
+        # durable=True (FULL) fsync mỗi commit, an toàn cả khi mất điện
+        self.conn.execute(f"PRAGMA synchronous={'FULL' if durable else 'NORMAL'}")
+        self.conn.executescript(_SCHEMA)
+        columns = {row[1] for row in self.conn.execute("PRAGMA table_info(results)")}
+        if "target" not in columns:
+            # Journal tạo trước khi có cột target
+            self.conn.execute("ALTER TABLE results ADD COLUMN target TEXT NOT NULL DEFAULT ''")
+        self.conn.executescript(_INDEXES)
+        self.pending: List[JournalRow] = []
+        self._last_flush = time.monotonic()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+    def is_done(self, kind: str, key: str) -> bool:
+        """Key đã tạo thành công ở lần chạy trước và chưa bị teardown xoá.
+        Một truy vấn theo index mỗi key thay vì nạp mọi key vào bộ nhớ; dòng của run hiện tại không tính"""
+        return self.conn.execute(
+            f"SELECT 1 FROM results r WHERE target = ? AND kind = ? AND key = ? AND status = 'ok'"
+            f" AND run_id != ? AND {_NOT_DELETED} LIMIT 1",
+            (self.target, kind, key, self.run_id),
+        ).fetchone() is not None
+
+    def record(
+        self,
+        kind: str,
+        key: str,
+        record_id: Optional[str],
+        status: str = "ok",
+        duration_ms: Optional[float] = None,
+        error: Optional[str] = None,
+    ):
+        """Thêm một dòng kết quả; tự commit khi đủ batch hoặc quá hạn"""
+        self.pending.append((self.run_id, self.target, kind, key, record_id, status, duration_ms, error, time.time()))
+        if len(self.pending) >= self.batch_size or time.monotonic() - self._last_flush >= self.flush_interval:
+            self.flush()
+
+    def flush(self):
+        if self.pending:
+            with self.conn:
+                self.conn.executemany(
+                    "INSERT INTO results (run_id, target, kind, key, record_id, status, duration_ms, error, finished_at)"
+                    " VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                    self.pending,
+                )
+            self.pending.clear()
+        self._last_flush = time.monotonic()
+
+    def close(self):
+        self.flush()
+        self.conn.close()
+
+    def summary(self, run_id: Optional[str] = None) -> Dict[Tuple[str, str], Dict[str, float]]:
+        """Số lượng và p50/p95 thời gian theo (kind, status), lọc theo run nếu có"""
+        self.flush()
+        where, params = "WHERE target = ?", (self.target,)
+        if run_id:
+            where, params = where + " AND run_id = ?", params + (run_id,)
+        durations: Dict[Tuple[str, str], List[float]] = {}
+        counts: Dict[Tuple[str, str], int] = {}
+        for kind, status, duration in self.conn.execute(
+            f"SELECT kind, status, duration_ms FROM results {where} ORDER BY duration_ms", params
+        ):
+            counts[(kind, status)] = counts.get((kind, status), 0) + 1
+            if duration is not None:
+                durations.setdefault((kind, status), []).append(duration)
+        return {
+            group: {
+                "count": count,
+                "p50": percentile(durations.get(group, []), 50),
+                "p95": percentile(durations.get(group, []), 95),
+            }
+            for group, count in counts.items()
+        }
+
+    def created_ids(self, kind: Optional[str] = None, run_id: Optional[str] = None) -> List[Tuple[str, str, str]]:
+        """(kind, key, record_id) của các record đã tạo thành công và chưa bị xoá"""
+        self.flush()
+        query = f"SELECT kind, key, record_id FROM results r WHERE target = ? AND status = 'ok' AND {_NOT_DELETED}"
+        params: List[Any] = [self.target]
+        if kind:
+            query += " AND kind = ?"
+            params.append(kind)
+        if run_id:
+            query += " AND run_id = ?"
+            params.append(run_id)
+        return list(self.conn.execute(query + " ORDER BY seq", params))
+
+    def failures(self, kind: Optional[str] = None) -> List[Tuple[str, str, str, str]]:
+        """Lần lỗi gần nhất của các key chưa từng tạo thành công: (kind, key, run_id, error)"""
+        self.flush()
+        query = """
+            SELECT kind, key, run_id, error FROM results r
+            WHERE target = ? AND status = 'failed'
+              AND seq = (SELECT MAX(seq) FROM results WHERE target = r.target AND kind = r.kind AND key = r.key)
+        """
+        params: Tuple[Any, ...] = (self.target,)
+        if kind:
+            query += " AND kind = ?"
+            params += (kind,)
+        return list(self.conn.execute(query + " ORDER BY seq", params))
+
+
+def main():
+    """Truy vấn nhật ký kết quả"""
+    parser = argparse.ArgumentParser(description="Báo cáo từ nhật ký kết quả bulk run")
+    parser.add_argument("command", choices=("summary", "ids", "failed"))
+    parser.add_argument("--journal", default=str(JOURNAL_FILE))
+    parser.add_argument("--kind", choices=("lead", "opportunity"))
+    parser.add_argument("--run-id")
+    parser.add_argument("--target", default=MOGA_STG_URL, help="Base URL mà các record được tạo trên đó")
+    args = parser.parse_args()
+
+    with ResultJournal(args.journal, target=args.target) as journal:
+        if args.command == "summary":
+            print(f"{'kind':<12} {'status':<8} {'count':>8} {'p50 ms':>10} {'p95 ms':>10}")
+            for (kind, status), s in sorted(journal.summary(args.run_id).items()):
+                print(f"{kind:<12} {status:<8} {s['count']:>8} {s['p50']:>10.1f} {s['p95']:>10.1f}")
+        elif args.command == "ids":
+            for kind, key, record_id in journal.created_ids(args.kind, args.run_id):
+                print(f"{kind}\t{key}\t{record_id}")
+        else:
+            for kind, key, run_id, error in journal.failures(args.kind):
+                print(f"{kind}\t{key}\t{run_id}\t{error}")
+
+
+if __name__ == "__main__":
+    main()
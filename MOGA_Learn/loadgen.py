@@ -0,0 +1,337 @@
+import argparse
+import asyncio
+import contextlib
+import itertools
+import json
+import os
+import re
+import sys
+import time
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Dict, List, Optional
+from urllib.parse import urlsplit
+from playwright.async_api import Page, Request
+from browser_daemon import daemon_endpoint
+from credentials import MOGA_STG_URL
+from moga_standin import StandinServer, parse_endpoint_delays
+from routing import ResourceRouter
+from runner import WorkflowRunner, lead_module, opti_module
+from synthetic import RecordGenerator, load_catalog
+from tracing import TRACER, TRACE_DIR, percentile
+from waits import TRACKED_RESOURCE_TYPES
+
+LOAD_REPORT_FILE = TRACE_DIR / "loadgen.json"
+# Segment là số / hex dài / uuid được gom thành :id để các request cùng endpoint vào chung một nhóm
+_ID_SEGMENT_RE = re.compile(r"/(\d+|[0-9a-fA-F]{16,}|[0-9a-fA-F-]{36})(?=/|$)")
+
+
+def endpoint_key(method: str, url: str) -> str:
+    return f"{method} {_ID_SEGMENT_RE.sub('/:id', urlsplit(url).path) or '/'}"
+
+
+@dataclass
+class LoadProfile:
+    """Lịch tải: tăng dần tới `users` VU trong ramp_up giây, giữ hold giây, rồi giảm dần trong ramp_down giây"""
+    users: int
+    ramp_up: float = 30.0
+    hold: float = 60.0
+    ramp_down: float = 15.0
+
+    @property
+    def duration(self) -> float:
+        return self.ramp_up + self.hold + self.ramp_down
+
+    def target(self, elapsed: float) -> int:
+        """Số VU cần chạy tại thời điểm elapsed (giây)"""
+        if elapsed < 0 or elapsed >= self.duration:
+            return 0
+        if elapsed < self.ramp_up:
+            return max(1, int(self.users * elapsed / self.ramp_up + 0.5))
+        if elapsed < self.ramp_up + self.hold:
+            return self.users
+        remaining = self.duration - elapsed
+        return int(self.users * remaining / self.ramp_down + 0.5) if self.ramp_down else 0
+
+
+@dataclass
+class Bucket:
+    """Thống kê trong một khoảng thời gian của timeline"""
+    requests: int = 0
+    errors: int = 0
+    latencies: List[float] = field(default_factory=list)
+    iterations: int = 0
+    failed_iterations: int = 0
+    users: int = 0
+
+
+class LatencyRecorder:
+    """Ghi thời gian phản hồi phía server (requestStart -> responseStart) của từng request qua network event"""
+
+    def __init__(self, bucket_seconds: float = 5.0):
+        self.bucket_seconds = bucket_seconds
+        self.started = time.monotonic()
+        self.counts: Dict[str, int] = {}
+        self.latencies: Dict[str, List[float]] = {}
+        self.errors: Dict[str, int] = {}
+        self.buckets: Dict[int, Bucket] = {}
+
+    def bucket(self) -> Bucket:
+        index = int((time.monotonic() - self.started) // self.bucket_seconds)
+        return self.buckets.setdefault(index, Bucket())
+
+    def attach(self, page: Page):
+        page.on("requestfinished", self._on_finished)
+        page.on("requestfailed", self._on_failed)
+
+    async def _on_finished(self, request: Request):
+        if request.resource_type not in TRACKED_RESOURCE_TYPES:
+            return
+        timing = request.timing
+        if timing["responseStart"] >= 0 and timing["requestStart"] >= 0:
+            latency = timing["responseStart"] - timing["requestStart"]
+        else:
+            latency = timing["responseEnd"]
+        try:
+            response = await request.response()
+        except Exception:
+            response = None
+        self._record(endpoint_key(request.method, request.url), latency, response is None or response.status >= 400)
+
+    def _on_failed(self, request: Request):
+        if request.resource_type in TRACKED_RESOURCE_TYPES:
+            self._record(endpoint_key(request.method, request.url), None, True)
+
+    def _record(self, key: str, latency: Optional[float], error: bool):
+        bucket = self.bucket()
+        bucket.requests += 1
+        self.counts[key] = self.counts.get(key, 0) + 1
+        if latency is not None and latency >= 0:
+            self.latencies.setdefault(key, []).append(latency)
+            bucket.latencies.append(latency)
+        if error:
+            self.errors[key] = self.errors.get(key, 0) + 1
+            bucket.errors += 1
+
+    def endpoint_report(self, duration: float) -> Dict[str, Dict[str, float]]:
+        report = {}
+        for key, total in sorted(self.counts.items()):
+            values = sorted(self.latencies.get(key, []))
+            report[key] = {
+                "requests": total,
+                "rps": total / duration if duration else 0.0,
+                "p50": percentile(values, 50),
+                "p95": percentile(values, 95),
+                "p99": percentile(values, 99),
+                "error_rate": self.errors.get(key, 0) / total,
+            }
+        return report
+
+    def timeline(self) -> List[Dict[str, float]]:
+        rows = []
+        for index in sorted(self.buckets):
+            bucket = self.buckets[index]
+            values = sorted(bucket.latencies)
+            rows.append({
+                "t": index * self.bucket_seconds,
+                "users": bucket.users,
+                "rps": bucket.requests / self.bucket_seconds,
+                "error_rate": bucket.errors / bucket.requests if bucket.requests else 0.0,
+                "p95": percentile(values, 95),
+                "iterations": bucket.iterations,
+                "failed_iterations": bucket.failed_iterations,
+            })
+        return rows
+
+
+class LoadGenerator:
+    """Chạy các virtual user theo LoadProfile; mỗi vòng lặp của VU là một session mới (context mới)"""
+
+    def __init__(
+        self,
+        runner: WorkflowRunner,
+        profile: LoadProfile,
+        recorder: LatencyRecorder,
+        records: RecordGenerator,
+        think_time: float = 1.0,
+    ):
+        self.runner = runner
+        self.profile = profile
+        self.recorder = recorder
+        # Mỗi vòng lặp lấy số thứ tự mới: key không trùng, có tag nên teardown --tag tìm được
+        self.records = records
+        self._index = itertools.count()
+        self.think_time = think_time
+        self.target = 0
+        self.active = 0
+        self.iterations = 0
+        self.failed_iterations = 0
+
+    async def scenario(self):
+        """Đăng nhập, mở danh sách Lead, tạo lead, tạo opportunity"""
+        index = next(self._index)
+        lead_record = self.records.lead_batch(index, 1)[0]
+        opti_record = self.records.opportunity_batch(index, 1)[0]
+        context = await self.runner.new_context()
+        try:
+            page = await context.new_page()
+            self.recorder.attach(page)
+            lead = lead_module.MOGAWebAutomation(headless=True)
+            lead.attach_page(page)
+            lead.waits.verbose = False
+            await lead.navigate_to_url(self.runner.base_url)
+            await lead.login_success()
+            await lead.access_lead_section()
+            await lead.change_list_view()
+            await lead.add_new_lead()
+            await lead.fill_lead_information(lead_record)
+            await lead.save_lead()
+            opti = opti_module.MOGAWebAutomation(headless=True)
+            opti.attach_page(page)
+            opti.waits.verbose = False
+            await opti.access_opti_section()
+            await opti.add_new_opti()
+            await opti.fill_opti_information(opti_record)
+            await opti.save_opportunity()
+        finally:
+            await context.close()
+
+    async def virtual_user(self, user_id: int):
+        """Lặp scenario cho tới khi số VU vượt target (ramp-down) hoặc hết thời gian"""
+        try:
+            while self.active <= self.target:
+                try:
+                    await self.scenario()
+                    self.iterations += 1
+                    self.recorder.bucket().iterations += 1
+                except Exception as e:
+                    self.failed_iterations += 1
+                    self.recorder.bucket().failed_iterations += 1
+                    print(f"VU {user_id} lỗi: {e}", file=sys.stderr)
+                await asyncio.sleep(self.think_time)
+        finally:
+            self.active -= 1
+
+    async def run(self, progress_interval: float = 5.0):
+        started = time.monotonic()
+        users: List[asyncio.Task] = []
+        next_progress = 0.0
+        next_id = 1
+        while True:
+            elapsed = time.monotonic() - started
+            if elapsed >= self.profile.duration:
+                break
+            self.target = self.profile.target(elapsed)
+            while self.active < self.target:
+                self.active += 1
+                users.append(asyncio.create_task(self.virtual_user(next_id)))
+                next_id += 1
+            bucket = self.recorder.bucket()
+            bucket.users = max(bucket.users, self.active)
+            if elapsed >= next_progress:
+                print(
+                    f"[{elapsed:5.0f}s] VU {self.active}/{self.target}, "
+                    f"iteration {self.iterations} ok / {self.failed_iterations} lỗi",
+                    file=sys.stderr,
+                )
+                next_progress += progress_interval
+            await asyncio.sleep(0.2)
+        # Hết lịch: VU hoàn thành vòng lặp hiện tại rồi dừng
+        self.target = 0
+        await asyncio.gather(*users)
+
+
+def print_load_report(endpoints: Dict[str, Dict[str, float]], timeline: List[Dict[str, float]]):
+    print(f"{'endpoint':<40} {'req':>6} {'rps':>7} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} {'error':>7}")
+    for key, row in endpoints.items():
+        print(
+            f"{key:<40} {row['requests']:>6} {row['rps']:>7.2f} {row['p50']:>8.0f} "
+            f"{row['p95']:>8.0f} {row['p99']:>8.0f} {row['error_rate']:>7.1%}"
+        )
+    print()
+    print(f"{'t (s)':>6} {'VU':>4} {'rps':>7} {'p95 ms':>8} {'error':>7} {'iter ok':>8} {'iter lỗi':>9}")
+    for row in timeline:
+        print(
+            f"{row['t']:>6.0f} {row['users']:>4} {row['rps']:>7.2f} {row['p95']:>8.0f} "
+            f"{row['error_rate']:>7.1%} {row['iterations']:>8} {row['failed_iterations']:>9}"
+        )
+
+
+async def run_load(args: argparse.Namespace) -> Dict:
+    server = None
+    base_url = args.url
+    if args.standin:
+        server = StandinServer(delay=args.delay, endpoint_delays=parse_endpoint_delays(args.endpoint_delay))
+        server.start_in_background()
+        base_url = server.url
+        print(f"MOGA stand-in chạy tại {base_url}", file=sys.stderr)
+    profile = LoadProfile(args.users, args.ramp_up, args.hold, args.ramp_down)
+    tag = args.tag or f"load{TRACER.run_id}"
+    records = RecordGenerator(tag=tag, catalog=load_catalog(args.catalog, standin=args.standin))
+    print(f"Record tạo trong lần chạy này có tag {tag} (xoá bằng: python teardown.py all --tag {tag} --url {base_url})", file=sys.stderr)
+    recorder = LatencyRecorder(args.bucket)
+    cdp_endpoint = daemon_endpoint() if args.attach else None
+    # Span của hàng nghìn step không cần cho load test và làm bộ nhớ tăng theo thời gian chạy
+    TRACER.enabled = False
+    try:
+        async with WorkflowRunner(
+            concurrency=args.users, headless=not args.headed, base_url=base_url,
+            router=ResourceRouter() if args.routing else None, cdp_endpoint=cdp_endpoint,
+        ) as runner:
+            generator = LoadGenerator(runner, profile, recorder, records, args.think_time)
+            recorder.started = time.monotonic()
+            with contextlib.ExitStack() as stack:
+                if not args.verbose:
+                    # Log của từng step quá nhiều khi nhiều VU chạy cùng lúc; chỉ giữ progress trên stderr
+                    stack.enter_context(contextlib.redirect_stdout(stack.enter_context(open(os.devnull, "w"))))
+                await generator.run()
+            duration = time.monotonic() - recorder.started
+    finally:
+        if server:
+            server.shutdown()
+            server.server_close()
+    return {
+        "profile": vars(profile),
+        "tag": tag,
+        "duration": duration,
+        "iterations": generator.iterations,
+        "failed_iterations": generator.failed_iterations,
+        "endpoints": recorder.endpoint_report(duration),
+        "timeline": recorder.timeline(),
+    }
+
+
+def main():
+    """Load test MOGA CRM (hoặc stand-in local) bằng các virtual user chạy workflow thật"""
+    parser = argparse.ArgumentParser(description="Tạo tải bằng virtual user chạy workflow MOGA CRM")
+    parser.add_argument("--users", type=int, default=5)
+    parser.add_argument("--ramp-up", type=float, default=30.0)
+    parser.add_argument("--hold", type=float, default=60.0)
+    parser.add_argument("--ramp-down", type=float, default=15.0)
+    parser.add_argument("--think-time", type=float, default=1.0, help="Nghỉ giữa hai vòng lặp của một VU (giây)")
+    parser.add_argument("--bucket", type=float, default=5.0, help="Độ dài mỗi khoảng của timeline (giây)")
+    parser.add_argument("--url", default=MOGA_STG_URL)
+    parser.add_argument("--standin", action="store_true", help="Chạy trên stand-in local thay vì --url")
+    parser.add_argument("--tag", help="Tag của record tạo ra (mặc định: load + run_id)")
+    parser.add_argument("--catalog", type=Path, help="File catalog dropdown (mặc định dropdown_catalog.json)")
+    parser.add_argument("--delay", type=float, default=0.05, help="Độ trễ API của stand-in (giây)")
+    parser.add_argument("--endpoint-delay", action="append", metavar="PATH=SECONDS")
+    parser.add_argument("--headed", action="store_true")
+    parser.add_argument("--attach", action="store_true", help="Attach vào browser daemon đang chạy")
+    parser.add_argument("--routing", action="store_true", help="Chặn resource / dùng asset cache như runner")
+    parser.add_argument("--verbose", action="store_true", help="In log của từng step")
+    parser.add_argument("--output", type=Path, default=LOAD_REPORT_FILE)
+    args = parser.parse_args()
+    if args.users < 1:
+        parser.error("--users must be >= 1")
+
+    result = asyncio.run(run_load(args))
+    print_load_report(result["endpoints"], result["timeline"])
+    print(f"Iteration: {result['iterations']} ok, {result['failed_iterations']} lỗi trong {result['duration']:.0f}s")
+    args.output.parent.mkdir(parents=True, exist_ok=True)
+    args.output.write_text(json.dumps(result, indent=2, default=str), encoding="utf-8")
+    print(f"Kết quả đã ghi vào {args.output}")
+
+
+if __name__ == "__main__":
+    main()
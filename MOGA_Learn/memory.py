@@ -0,0 +1,180 @@
+import json
+import time
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Dict, Optional
+from playwright.async_api import CDPSession, Page
+from tracing import TRACE_DIR
+
+MEMORY_FILE = TRACE_DIR / "memory.jsonl"
+MB = 1024 * 1024
+
+
+@dataclass
+class MemoryLimits:
+    """Ngưỡng recycle; 0 nghĩa là không giới hạn theo tiêu chí đó"""
+    records_per_page: int = 100
+    records_per_context: int = 500
+    max_js_heap_mb: float = 300.0
+    max_rss_mb: float = 1500.0
+    sample_every: int = 10
+
+
+def _rss_mb(pid: int) -> Optional[float]:
+    """RSS của một process Chrome (Linux, đọc /proc); None nếu không đọc được"""
+    try:
+        with open(f"/proc/{pid}/status", encoding="ascii") as f:
+            for line in f:
+                if line.startswith("VmRSS:"):
+                    return int(line.split()[1]) / 1024
+    except (OSError, ValueError):
+        return None
+    return None
+
+
+class MemoryGovernor:
+    """Theo dõi bộ nhớ renderer/browser và recycle page/context khi vượt ngưỡng, giữ nguyên trạng thái đăng nhập"""
+
+    def __init__(self, automation: Any, limits: Optional[MemoryLimits] = None, metrics_path: Path = MEMORY_FILE):
+        self.automation = automation
+        self.limits = limits or MemoryLimits()
+        self.metrics_path = Path(metrics_path)
+        self.records = 0
+        self.page_records = 0
+        self.context_records = 0
+        self.recycles = {"page": 0, "context": 0}
+        self.peak_js_heap_mb = 0.0
+        self._started = time.time()
+        self._cdp: Optional[CDPSession] = None
+        self._cdp_page: Optional[Page] = None
+        self._browser_cdp: Optional[CDPSession] = None
+        self._browser_cdp_failed = False
+
+    @property
+    def page(self) -> Page:
+        if self.automation.page is None:
+            raise RuntimeError("Page not initialized")
+        return self.automation.page
+
+    async def _page_metrics(self) -> Dict[str, float]:
+        if self._cdp_page is not self.page:
+            self._cdp = await self.page.context.new_cdp_session(self.page)
+            await self._cdp.send("Performance.enable")
+            self._cdp_page = self.page
+        result = await self._cdp.send("Performance.getMetrics")
+        metrics = {m["name"]: m["value"] for m in result["metrics"]}
+        return {
+            "js_heap_used_mb": round(metrics.get("JSHeapUsedSize", 0) / MB, 1),
+            "js_heap_total_mb": round(metrics.get("JSHeapTotalSize", 0) / MB, 1),
+            "nodes": int(metrics.get("Nodes", 0)),
+            "listeners": int(metrics.get("JSEventListeners", 0)),
+            "documents": int(metrics.get("Documents", 0)),
+        }
+
+    async def _process_rss(self) -> Dict[str, Optional[float]]:
+        """RSS tổng của process browser và các renderer (cần Chrome chạy cùng máy)"""
+        browser = self.page.context.browser
+        if browser is None or self._browser_cdp_failed:
+            return {}
+        try:
+            if self._browser_cdp is None:
+                self._browser_cdp = await browser.new_browser_cdp_session()
+            info = await self._browser_cdp.send("SystemInfo.getProcessInfo")
+        except Exception:
+            self._browser_cdp_failed = True
+            return {}
+        totals: Dict[str, Optional[float]] = {}
+        for process in info.get("processInfo", []):
+            rss = _rss_mb(process["id"])
+            if rss is None:
+                continue
+            key = f"{process['type']}_rss_mb"
+            totals[key] = round((totals.get(key) or 0.0) + rss, 1)
+        return totals
+
+    async def sample(self, event: str = "sample") -> Dict[str, Any]:
+        """Đo bộ nhớ hiện tại và ghi một dòng vào file metrics"""
+        row: Dict[str, Any] = {
+            "t": round(time.time() - self._started, 2),
+            "event": event,
+            "records": self.records,
+            "page_records": self.page_records,
+            "context_records": self.context_records,
+        }
+        try:
+            row.update(await self._page_metrics())
+        except Exception as e:
+            row["error"] = repr(e)
+        row.update(await self._process_rss())
+        self.peak_js_heap_mb = max(self.peak_js_heap_mb, row.get("js_heap_used_mb", 0.0))
+        self.metrics_path.parent.mkdir(parents=True, exist_ok=True)
+        with self.metrics_path.open("a", encoding="utf-8") as f:
+            f.write(json.dumps(row) + "\n")
+        return row
+
+    async def after_record(self) -> Optional[str]:
+        """Gọi sau mỗi record (khi không có drawer mở); recycle page/context nếu cần, trả về loại đã recycle"""
+        self.records += 1
+        self.page_records += 1
+        self.context_records += 1
+        limits = self.limits
+        kind = None
+        if limits.records_per_context and self.context_records >= limits.records_per_context:
+            kind = "context"
+        elif limits.records_per_page and self.page_records >= limits.records_per_page:
+            kind = "page"
+        if kind is None and limits.sample_every and self.records % limits.sample_every == 0:
+            row = await self.sample()
+            rss = sum(v for k, v in row.items() if k.endswith("_rss_mb") and v)
+            if limits.max_rss_mb and rss > limits.max_rss_mb:
+                kind = "context"
+            elif limits.max_js_heap_mb and row.get("js_heap_used_mb", 0) > limits.max_js_heap_mb:
+                kind = "page"
+        if kind:
+            await self.recycle(kind)
+        return kind
+
+    async def recycle(self, kind: str = "page"):
+        """Thay page (hoặc cả context) bằng cái mới, mở lại URL hiện tại và màn hình đang làm việc; cookie/localStorage được giữ nguyên"""
+        old_page = self.page
+        old_context = old_page.context
+        url = old_page.url
+        viewport = old_page.viewport_size
+        router = getattr(self.automation, "router", None)
+        started = time.perf_counter()
+        if kind == "context":
+            browser = old_context.browser
+            if browser is None:
+                raise RuntimeError("Cannot recycle a persistent context")
+            state = await old_context.storage_state()
+            context = await browser.new_context(viewport=viewport, storage_state=state)
+            if router:
+                await router.install(context)
+            page = await context.new_page()
+        else:
+            page = await old_context.new_page()
+            if router:
+                await router.install(page)
+        await page.goto(url)
+        self.automation.attach_page(page)
+        await self.automation.waits.network_idle()
+        # SPA không giữ màn hình (Lead/Opportunity, list view) trong URL: đi lại các bước tới màn hình đó
+        for step in list(getattr(self.automation, "section_steps", [])):
+            await getattr(self.automation, step)()
+        if kind == "context":
+            await old_context.close()
+            self.context_records = 0
+        else:
+            await old_page.close()
+        self.page_records = 0
+        self._cdp = None
+        self._cdp_page = None
+        self.recycles[kind] += 1
+        print(f"Recycle {kind} sau {self.records} record ({(time.perf_counter() - started) * 1000:.0f} ms)")
+        await self.sample(f"recycle:{kind}")
+
+    def report(self) -> str:
+        return (
+            f"Memory: {self.records} record, recycle {self.recycles['page']} page / {self.recycles['context']} context, "
+            f"JS heap đỉnh {self.peak_js_heap_mb:.0f} MB, metrics tại {self.metrics_path}"
+        )
@@ -0,0 +1,323 @@
+import argparse
+import hashlib
+import itertools
+import json
+import mimetypes
+import secrets
+import threading
+import time
+from http.cookies import SimpleCookie
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+from urllib.parse import parse_qs, urlparse
+from endpoints import AUTH_PATH, LEAD_CREATE_PATH, OPPORTUNITY_CREATE_PATH
+from records import LEAD_DROPDOWNS, LEAD_SEARCH_DROPDOWNS
+
+SESSION_COOKIE = "session"
+ME_PATH = "/api/auth/me"
+PROFILE_PATH = "/api/users/me"
+RECORD_PATHS = {LEAD_CREATE_PATH: "lead", OPPORTUNITY_CREATE_PATH: "opportunity"}
+STATIC_DIR = Path(__file__).parent / "standin_static"
+
+# Giá trị có sẵn của các dropdown trong form lead (theo placeholder)
+STANDIN_OPTIONS = {
+    "Gender": ["Male", "Female", "Other"],
+    "Industry": ["Event", "Education", "Finance", "Healthcare", "Retail", "Technology"],
+    "Source": ["Source 1", "Source 2", "Source 3"],
+    "Status": ["Hot lead", "Warm lead", "Cold lead"],
+    "Lead Segmentation": ["Cheap", "Standard", "Premium"],
+    "Lead label": ["acc01", "acc02", "acc03"],
+    "Pick list": ["Option 1", "Option 2", "Option 3"],
+    "Country": ["Vietnam", "Thailand", "Singapore", "Malaysia", "Japan", "Korea"],
+}
+# Dropdown City chỉ hiện các thành phố của Country đã chọn
+STANDIN_CITIES = {
+    "Vietnam": ["Bến Tre", "Hà Nội", "Hồ Chí Minh", "Đà Nẵng", "Cần Thơ", "Huế"],
+    "Thailand": ["Bangkok", "Chiang Mai", "Phuket"],
+    "Singapore": ["Singapore"],
+    "Malaysia": ["Kuala Lumpur", "Penang"],
+    "Japan": ["Tokyo", "Osaka", "Kyoto"],
+    "Korea": ["Seoul", "Busan"],
+}
+STANDIN_OPTIONS["City"] = [city for cities in STANDIN_CITIES.values() for city in cities]
+STANDIN_COMPANIES = ["Opla Company", "Acme Corp", "Globex"]
+STANDIN_CONTACTS = ["Contact 1", "Contact 2", "Contact 3"]
+
+
+class StandinHandler(BaseHTTPRequestHandler):
+    """Giả lập trang và các endpoint backend MOGA CRM mà automation phụ thuộc"""
+
+    server: "StandinServer"
+
+    def log_message(self, format: str, *args: Any):
+        pass
+
+    def _send_json(self, status: int, payload: Any, headers: Optional[Dict[str, str]] = None):
+        body = json.dumps(payload).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _read_json(self) -> Any:
+        length = int(self.headers.get("Content-Length") or 0)
+        if not length:
+            return {}
+        try:
+            return json.loads(self.rfile.read(length))
+        except ValueError:
+            return None
+
+    def _session_token(self) -> Optional[str]:
+        auth = self.headers.get("Authorization", "")
+        if auth.startswith("Bearer "):
+            return auth[len("Bearer "):]
+        cookie = SimpleCookie(self.headers.get("Cookie", ""))
+        if SESSION_COOKIE in cookie:
+            return cookie[SESSION_COOKIE].value
+        return None
+
+    def _is_authenticated(self) -> bool:
+        return self._session_token() in self.server.tokens
+
+    def _send_static(self, name: str):
+        path = (STATIC_DIR / name).resolve()
+        if STATIC_DIR.resolve() not in path.parents or not path.is_file():
+            self._send_json(404, {"message": "not found"})
+            return
+        body = path.read_bytes()
+        etag = '"' + hashlib.sha256(body).hexdigest()[:16] + '"'
+        if self.headers.get("If-None-Match") == etag:
+            self.send_response(304)
+            self.send_header("ETag", etag)
+            self.end_headers()
+            return
+        self.send_response(200)
+        self.send_header("Content-Type", mimetypes.guess_type(path.name)[0] or "application/octet-stream")
+        self.send_header("Content-Length", str(len(body)))
+        self.send_header("Cache-Control", "no-cache")
+        self.send_header("ETag", etag)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _send_index(self):
+        template = (STATIC_DIR / "index.html").read_text(encoding="utf-8")
+        body = template.replace("{{CONFIG}}", json.dumps(self.server.app_config())).encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "text/html; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        path = urlparse(self.path).path.rstrip("/")
+        if path.startswith("/static/"):
+            self._send_static(path[len("/static/"):])
+            return
+        if not path.startswith("/api/"):
+            # SPA: mọi đường dẫn khác đều trả về index.html
+            self._send_index()
+            return
+        self.server.simulate_latency(path)
+        if path == ME_PATH:
+            if self._is_authenticated():
+                self._send_json(200, {"data": {"id": "me"}})
+            else:
+                self._send_json(401, {"message": "unauthorized"})
+        elif path in RECORD_PATHS:
+            if not self._is_authenticated():
+                self._send_json(401, {"message": "unauthorized"})
+                return
+            records = self.server.list_records(RECORD_PATHS[path])
+            # Phân trang như API thật khi có ?page=&limit= (page bắt đầu từ 1)
+            query = parse_qs(urlparse(self.path).query)
+            if "limit" in query:
+                try:
+                    limit = max(1, int(query["limit"][0]))
+                    page = max(1, int(query.get("page", ["1"])[0]))
+                except ValueError:
+                    self._send_json(400, {"message": "invalid page/limit"})
+                    return
+                records = records[(page - 1) * limit:page * limit]
+            self._send_json(200, {"data": records})
+        else:
+            self._send_json(404, {"message": "not found"})
+
+    def do_PUT(self):
+        path = urlparse(self.path).path.rstrip("/")
+        self.server.simulate_latency(path)
+        body = self._read_json()
+        if path != PROFILE_PATH:
+            self._send_json(404, {"message": "not found"})
+        elif not self._is_authenticated():
+            self._send_json(401, {"message": "unauthorized"})
+        elif body is None:
+            self._send_json(400, {"message": "invalid JSON"})
+        else:
+            self._send_json(200, {"data": {"id": "me", **body}})
+
+    def do_POST(self):
+        path = urlparse(self.path).path.rstrip("/")
+        self.server.simulate_latency(path)
+        body = self._read_json()
+        if body is None:
+            self._send_json(400, {"message": "invalid JSON"})
+            return
+        if path == AUTH_PATH:
+            if not body.get("email") or not body.get("password"):
+                self._send_json(401, {"message": "invalid credentials"})
+                return
+            token = self.server.new_token()
+            self._send_json(
+                200,
+                {"data": {"id": body["email"], "token": token}},
+                {"Set-Cookie": f"{SESSION_COOKIE}={token}; Path=/; HttpOnly"},
+            )
+        elif path in RECORD_PATHS:
+            if not self._is_authenticated():
+                self._send_json(401, {"message": "unauthorized"})
+                return
+            record_id = self.server.create_record(RECORD_PATHS[path], body)
+            self._send_json(201, {"data": {"id": record_id}})
+        else:
+            self._send_json(404, {"message": "not found"})
+
+    def do_DELETE(self):
+        path = urlparse(self.path).path.rstrip("/")
+        collection, _, record_id = path.rpartition("/")
+        self.server.simulate_latency(collection)
+        if collection not in RECORD_PATHS:
+            self._send_json(404, {"message": "not found"})
+        elif not self._is_authenticated():
+            self._send_json(401, {"message": "unauthorized"})
+        elif self.server.delete_record(RECORD_PATHS[collection], record_id):
+            self._send_json(200, {"data": {"id": record_id}})
+        else:
+            self._send_json(404, {"message": "not found"})
+
+
+class StandinServer(ThreadingHTTPServer):
+    """Server giả lập MOGA CRM chạy local, có thể cấu hình độ trễ phía server"""
+
+    daemon_threads = True
+
+    def __init__(
+        self,
+        host: str = "127.0.0.1",
+        port: int = 0,
+        delay: float = 0.0,
+        endpoint_delays: Optional[Dict[str, float]] = None,
+        animation_ms: int = 150,
+        search_delay_ms: int = 50,
+    ):
+        super().__init__((host, port), StandinHandler)
+        self.delay = delay
+        self.endpoint_delays = endpoint_delays or {}
+        self.animation_ms = animation_ms
+        self.search_delay_ms = search_delay_ms
+        self.tokens = set()
+        self.records: Dict[str, Dict[str, Any]] = {kind: {} for kind in RECORD_PATHS.values()}
+        self._ids = itertools.count(1)
+        self._lock = threading.Lock()
+
+    @property
+    def url(self) -> str:
+        host, port = self.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def simulate_latency(self, path: str = ""):
+        """Độ trễ phía server cho API; endpoint_delays ghi đè delay mặc định theo path"""
+        delay = self.endpoint_delays.get(path, self.delay)
+        if delay > 0:
+            time.sleep(delay)
+
+    def app_config(self) -> Dict[str, Any]:
+        """Cấu hình nhúng vào trang cho app.js"""
+        return {
+            "api": {
+                "auth": AUTH_PATH,
+                "me": ME_PATH,
+                "profile": PROFILE_PATH,
+                "leads": LEAD_CREATE_PATH,
+                "opportunities": OPPORTUNITY_CREATE_PATH,
+            },
+            "options": STANDIN_OPTIONS,
+            "cities": STANDIN_CITIES,
+            "lead_dropdowns": list(LEAD_DROPDOWNS.items()),
+            "lead_search_dropdowns": list(LEAD_SEARCH_DROPDOWNS.items()),
+            "companies": STANDIN_COMPANIES,
+            "contacts": STANDIN_CONTACTS,
+            "animationMs": self.animation_ms,
+            "searchDelayMs": self.search_delay_ms,
+        }
+
+    def new_token(self) -> str:
+        token = secrets.token_hex(16)
+        with self._lock:
+            self.tokens.add(token)
+        return token
+
+    def create_record(self, kind: str, payload: Dict[str, Any]) -> str:
+        with self._lock:
+            record_id = str(next(self._ids))
+            self.records[kind][record_id] = payload
+        return record_id
+
+    def delete_record(self, kind: str, record_id: str) -> bool:
+        with self._lock:
+            return self.records[kind].pop(record_id, None) is not None
+
+    def list_records(self, kind: str) -> List[Dict[str, Any]]:
+        with self._lock:
+            return [{"id": record_id, **payload} for record_id, payload in self.records[kind].items()]
+
+    def start_in_background(self) -> threading.Thread:
+        """Chạy server trong thread nền (dùng cho test/benchmark)"""
+        thread = threading.Thread(target=self.serve_forever, daemon=True)
+        thread.start()
+        return thread
+
+
+def parse_endpoint_delays(values: Optional[List[str]]) -> Dict[str, float]:
+    """Chuyển các giá trị "PATH=SECONDS" của --endpoint-delay thành dict"""
+    delays = {}
+    for value in values or []:
+        path, sep, seconds = value.partition("=")
+        if not sep or not path.startswith("/"):
+            raise ValueError(f"Expected PATH=SECONDS, got {value!r}")
+        delays[path] = float(seconds)
+    return delays
+
+
+def main():
+    """Chạy server giả lập"""
+    parser = argparse.ArgumentParser(description="Server giả lập MOGA CRM")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--delay", type=float, default=0.0, help="Độ trễ phía server (giây)")
+    parser.add_argument(
+        "--endpoint-delay", action="append", metavar="PATH=SECONDS",
+        help="Độ trễ riêng cho một endpoint, vd: /api/leads=0.3 (lặp lại được)",
+    )
+    parser.add_argument("--animation-ms", type=int, default=150)
+    args = parser.parse_args()
+    server = StandinServer(
+        args.host, args.port, args.delay,
+        endpoint_delays=parse_endpoint_delays(args.endpoint_delay),
+        animation_ms=args.animation_ms,
+    )
+    print(f"MOGA stand-in chạy tại {server.url}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,206 @@
+import asyncio
+from dataclasses import dataclass, field
+from typing import Dict, Iterable, Mapping, NamedTuple, Optional, Set, Tuple, Union
+from playwright.async_api import Locator, Page
+from records import LEAD_DROPDOWNS, LEAD_SEARCH_DROPDOWNS
+from waits import DRAWER_SELECTOR
+
+
+class Role(NamedTuple):
+    """Selector theo ARIA role + accessible name (tương đương page.get_by_role)"""
+    role: str
+    name: str
+
+
+class Placeholder(NamedTuple):
+    """Selector theo placeholder (tương đương page.get_by_placeholder)"""
+    text: str
+
+
+Selector = Union[str, Role, Placeholder]
+
+
+class SelectorDriftError(RuntimeError):
+    """Selector trong registry không còn khớp với DOM thật"""
+
+
+def to_locator(page: Page, selector: Selector) -> Locator:
+    """Chuyển selector trong registry thành Playwright Locator"""
+    if isinstance(selector, Role):
+        return page.get_by_role(role=selector.role, name=selector.name)
+    if isinstance(selector, Placeholder):
+        return page.get_by_placeholder(selector.text)
+    return page.locator(selector)
+
+
+@dataclass(frozen=True)
+class Screen:
+    """Page object: các selector của một màn hình, định nghĩa một lần"""
+    name: str
+    selectors: Mapping[str, Selector]
+    # Các key được kiểm tra với DOM; mặc định là mọi selector không phải template
+    verify_keys: Tuple[str, ...] = field(default=())
+
+    def locator(self, page: Page, key: str, **params: str) -> Locator:
+        selector = self.selectors[key]
+        if params and isinstance(selector, str):
+            selector = selector.format(**params)
+        return to_locator(page, selector)
+
+    def form_values(self, record: object, keys: Iterable[str]) -> Dict[Selector, str]:
+        """{selector: giá trị} cho forms.bulk_fill; key trùng tên field của record"""
+        return {self.selectors[key]: getattr(record, key) for key in keys}
+
+    def keys_to_verify(self) -> Tuple[str, ...]:
+        if self.verify_keys:
+            return self.verify_keys
+        return tuple(k for k, s in self.selectors.items() if not (isinstance(s, str) and "{" in s))
+
+    async def verify(self, page: Page, timeout: int = 5000):
+        """Kiểm tra mọi selector của màn hình có trong DOM; thiếu thì báo lỗi ngay"""
+        keys = self.keys_to_verify()
+        results = await asyncio.gather(
+            *(self.locator(page, key).first.wait_for(state="attached", timeout=timeout) for key in keys),
+            return_exceptions=True,
+        )
+        missing = [key for key, result in zip(keys, results) if isinstance(result, Exception)]
+        if missing:
+            raise SelectorDriftError(f"Screen '{self.name}': selectors not found in DOM: {', '.join(missing)}")
+
+
+_VERIFIED_SCREENS: Set[str] = set()
+
+
+async def verify_once(page: Page, screen: Screen, timeout: int = 5000):
+    """Kiểm tra selector của một màn hình một lần cho cả process"""
+    if screen.name in _VERIFIED_SCREENS:
+        return
+    await screen.verify(page, timeout)
+    _VERIFIED_SCREENS.add(screen.name)
+
+
+ANTD = Screen("antd", {
+    "drawer": DRAWER_SELECTOR,
+    "select_by_placeholder": "div.ant-select:has(span.ant-select-selection-placeholder:text-is('{placeholder}'))",
+    "save": Role("button", "Save"),
+})
+
+LOGIN = Screen("login", {
+    "email": Role("textbox", "email"),
+    "password": Role("textbox", "password"),
+    "sign_in": Role("button", "sign in"),
+    "toast": "div.Toastify__toast-container--bottom-left div.Toastify__toast",
+}, verify_keys=("email", "password", "sign_in"))
+
+SHELL = Screen("shell", {
+    "side_menu": "aside",
+    "lead_menu": Role("menuitem", "Lead"),
+    "opportunity_menu": Role("menuitem", "Opportunity"),
+    "user_menu": "div[class^='ant-dropdown-trigger']",
+})
+
+LEAD = Screen("lead", {
+    "change_view": "svg[data-icon='bars']",
+    "add_lead": Role("button", "Add lead"),
+})
+
+# Key của các ô text trùng tên field của LeadRecord
+LEAD_TEXT_FIELDS = (
+    "account_name", "contact_name", "phone", "email", "job_title",
+    "tax_id", "address", "text", "link", "number",
+)
+LEAD_FORM = Screen("lead_form", {
+    "account_name": Role("textbox", "Account name"),
+    "contact_name": "input[name='name']",
+    "phone": "input[autocomplete='tel']",
+    "email": Role("textbox", "Email"),
+    "job_title": Role("textbox", "Job title"),
+    "tax_id": "input[name='tax_identification_number']",
+    "address": "input[name='address']",
+    "text": Role("textbox", "Text"),
+    "link": Role("textbox", "Link"),
+    "number": "input[placeholder='Number']",
+    "date_picker": "div.ant-picker",
+})
+LEAD_FORM_SELECTS = tuple(LEAD_DROPDOWNS.values()) + tuple(LEAD_SEARCH_DROPDOWNS.values())
+
+OPPORTUNITY = Screen("opportunity", {
+    "add_opportunity": Role("button", "Add opportunity"),
+})
+
+OPPORTUNITY_TEXT_FIELDS = ("external_id", "name")
+OPPORTUNITY_FORM = Screen("opportunity_form", {
+    "external_id": Role("textbox", "External ID"),
+    "name": Role("textbox", "name"),
+    "company": Placeholder("Company"),
+    "contact": "div.ant-select:has(span.ant-select-selection-placeholder:text('Contact name'))",
+    "date_picker": "div.ant-picker:has(input[name='{field}'])",
+    "company_item": "ul.ant-list-items > div.flex.cursor-pointer",
+    "contact_checkbox": "ul.ant-list-items input[type='checkbox']",
+}, verify_keys=("external_id", "name", "company", "contact"))
+OPPORTUNITY_FORM_SELECTS = ("Contact name",)
+
+PERSONAL_SETTING = Screen("personal_setting", {
+    "menu_popup": "div[class$='ant-dropdown-placement-bottomRight']",
+    "open": Role("button", "Personal Setting"),
+    "first_name": "input[name='firstName']",
+    "last_name": "input[name='lastName']",
+    "phone": "input[autocomplete='tel']",
+    "save": Role("button", "Save"),
+}, verify_keys=("first_name", "last_name", "phone", "save"))
+
+
+# Một lần duyệt DOM: gắn data-attribute cho mỗi antd Select theo placeholder của nó
+_INDEX_SELECTS_JS = """
+([rootSelector, attr]) => {
+    const roots = Array.from(document.querySelectorAll(rootSelector)).filter(el => el.getClientRects().length > 0);
+    const root = roots.length ? roots[roots.length - 1] : document;
+    // Xóa dấu của drawer cũ để locator không khớp nhầm
+    document.querySelectorAll(`[${attr}]`).forEach(el => el.removeAttribute(attr));
+    const byLabel = new Map();
+    for (const select of root.querySelectorAll('div.ant-select')) {
+        const placeholder = select.querySelector('.ant-select-selection-placeholder');
+        if (!placeholder) continue;
+        const label = placeholder.textContent.trim();
+        // Placeholder trùng nhau: bỏ khỏi bản đồ, dùng selector :has() như cũ
+        byLabel.set(label, byLabel.has(label) ? null : select);
+    }
+    const labels = [];
+    for (const [label, select] of byLabel) {
+        if (!select) continue;
+        select.setAttribute(attr, label);
+        labels.push(label);
+    }
+    return labels;
+}
+"""
+
+
+class DropdownIndex:
+    """Bản đồ placeholder -> antd Select của drawer đang mở, tạo bằng một lần duyệt DOM"""
+
+    ATTR = "data-moga-select"
+
+    def __init__(self, page: Page, labels: Iterable[str]):
+        self.page = page
+        self.labels = set(labels)
+
+    @classmethod
+    async def build(
+        cls,
+        page: Page,
+        root: str = DRAWER_SELECTOR,
+        expected: Iterable[str] = (),
+    ) -> "DropdownIndex":
+        labels = await page.evaluate(_INDEX_SELECTS_JS, [root, cls.ATTR])
+        missing = [label for label in expected if label not in labels]
+        if missing:
+            raise SelectorDriftError(f"Dropdowns not found in drawer: {', '.join(missing)}")
+        return cls(page, labels)
+
+    def locator(self, placeholder: str) -> Optional[Locator]:
+        """Locator của select đã đánh dấu, hoặc None nếu placeholder không có trong bản đồ"""
+        if placeholder not in self.labels:
+            return None
+        value = placeholder.replace("\\", "\\\\").replace('"', '\\"')
+        return self.page.locator(f'div.ant-select[{self.ATTR}="{value}"]')
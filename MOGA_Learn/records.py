@@ -0,0 +1,270 @@
+import csv
+import hashlib
+import json
+import re
+from dataclasses import dataclass, field, fields
+from datetime import date
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional, Set, Tuple, Union
+
+
+def _day_of_this_month(day: int) -> str:
+    return date.today().replace(day=day).isoformat()
+
+
+@dataclass
+class LeadRecord:
+    """Dữ liệu một lead; giá trị rỗng nghĩa là bỏ qua field đó khi điền form"""
+    account_name: str = "Account"
+    contact_name: str = "Contact"
+    phone: str = "+8412345678"
+    email: str = "account@gmail.com"
+    job_title: str = "Title 1"
+    gender: str = "Male"
+    industry: str = "Event"
+    source: str = "Source 1"
+    status: str = "Hot lead"
+    segmentation: str = "Cheap"
+    lead_label: str = "acc01"
+    pick_list: str = "Option 1"
+    country: str = "Vietnam"
+    city: str = "Bến Tre"
+    tax_id: str = "TAX1.1"
+    address: str = "Sala sarina, A0011"
+    text: str = "ABC"
+    link: str = "https://oplacrm.com"
+    number: str = "123"
+    date: str = field(default_factory=lambda: _day_of_this_month(15))
+
+    @property
+    def key(self) -> str:
+        return self.email
+
+
+@dataclass
+class OpportunityRecord:
+    """Dữ liệu một opportunity"""
+    external_id: str = "Opla-001"
+    name: str = "Opportunity 1"
+    date_opened: str = field(default_factory=lambda: _day_of_this_month(1))
+    date_closed: str = field(default_factory=lambda: _day_of_this_month(15))
+
+    @property
+    def key(self) -> str:
+        return self.external_id
+
+
+Record = Union[LeadRecord, OpportunityRecord]
+
+RECORD_TYPES = {"lead": LeadRecord, "opportunity": OpportunityRecord}
+
+# field -> placeholder của antd Select trong form lead
+LEAD_DROPDOWNS = {
+    "gender": "Gender",
+    "industry": "Industry",
+    "source": "Source",
+    "status": "Status",
+    "segmentation": "Lead Segmentation",
+    "lead_label": "Lead label",
+    "pick_list": "Pick list",
+}
+LEAD_SEARCH_DROPDOWNS = {
+    "country": "Country",
+    "city": "City",
+}
+
+# Field làm key của record (LeadRecord.key / OpportunityRecord.key), phải có và không trùng trong một file
+KEY_FIELDS = {"lead": "email", "opportunity": "external_id"}
+
+# Giá trị dropdown thu thập từ form thật (synthetic.py harvest): placeholder -> option, City là country -> thành phố
+CATALOG_FILE = Path(__file__).parent / "dropdown_catalog.json"
+
+REQUIRED_FIELDS = {
+    "lead": ("account_name", "contact_name"),
+    "opportunity": ("external_id", "name"),
+}
+
+_EMAIL_RE = re.compile(r"^[^@\s]+@[^@\s]+\.[^@\s]+$")
+_PHONE_RE = re.compile(r"^\+?\d{6,15}$")
+_NUMBER_RE = re.compile(r"^-?\d+(\.\d+)?$")
+
+
+class RecordValidationError(ValueError):
+    """File dữ liệu có record không hợp lệ"""
+
+    def __init__(self, path: Path, errors: List[Tuple[int, str]], truncated: bool = False):
+        self.path = path
+        self.errors = errors
+        lines = [f"  line {line}: {message}" for line, message in errors]
+        if truncated:
+            lines.append("  ...")
+        super().__init__(f"Invalid records in {path}:\n" + "\n".join(lines))
+
+
+def iter_rows(path: Union[str, Path]) -> Iterator[Tuple[int, Dict[str, Any]]]:
+    """Đọc lần lượt từng dòng của file CSV hoặc JSONL, trả về (số dòng, dict)"""
+    path = Path(path)
+    suffix = path.suffix.lower()
+    with path.open(encoding="utf-8-sig", newline="") as f:
+        if suffix == ".csv":
+            reader = csv.DictReader(f)
+            for row in reader:
+                yield reader.line_num, row
+        elif suffix in (".jsonl", ".ndjson"):
+            for line_num, line in enumerate(f, 1):
+                if not line.strip():
+                    continue
+                try:
+                    row = json.loads(line)
+                except ValueError as e:
+                    yield line_num, {"__error__": f"invalid JSON: {e}"}
+                    continue
+                if not isinstance(row, dict):
+                    row = {"__error__": "expected a JSON object"}
+                yield line_num, row
+        else:
+            raise ValueError(f"Unsupported file type: {path.suffix} (expected .csv or .jsonl)")
+
+
+def _check_date(value: str, name: str) -> List[str]:
+    try:
+        date.fromisoformat(value)
+    except ValueError:
+        return [f"{name} must be YYYY-MM-DD, got {value!r}"]
+    # Ngày được gõ thẳng vào input của date picker nên tháng/năm nào cũng được
+    return []
+
+
+def read_catalog(path: Union[str, Path] = CATALOG_FILE) -> Optional[Dict[str, Any]]:
+    """Catalog dropdown đã harvest; chưa có file thì None"""
+    path = Path(path)
+    if not path.exists():
+        return None
+    return json.loads(path.read_text(encoding="utf-8"))
+
+
+def required_columns(kind: str) -> List[str]:
+    """Cột phải có trong header của file: field bắt buộc và key của record"""
+    return list(dict.fromkeys(REQUIRED_FIELDS[kind] + (KEY_FIELDS[kind],)))
+
+
+def _check_options(record: LeadRecord, catalog: Dict[str, Any]) -> List[str]:
+    errors = []
+    for name, placeholder in {**LEAD_DROPDOWNS, **LEAD_SEARCH_DROPDOWNS}.items():
+        value = getattr(record, name)
+        if not value or name == "city":
+            continue
+        if value not in catalog.get(placeholder, []):
+            errors.append(f"{name} {value!r} is not an option of {placeholder}")
+    if record.city and record.country:
+        cities = catalog.get(LEAD_SEARCH_DROPDOWNS["city"], {})
+        if record.city not in cities.get(record.country, []):
+            errors.append(f"city {record.city!r} is not an option of City for {record.country!r}")
+    return errors
+
+
+def validate_record(kind: str, record: Record, catalog: Optional[Dict[str, Any]] = None) -> List[str]:
+    """Trả về danh sách lỗi của một record (rỗng nếu hợp lệ); có catalog thì kiểm tra cả giá trị dropdown"""
+    errors = [f"{name} is required" for name in REQUIRED_FIELDS[kind] if not getattr(record, name)]
+    if isinstance(record, LeadRecord):
+        if record.email and not _EMAIL_RE.match(record.email):
+            errors.append(f"invalid email {record.email!r}")
+        if record.phone and not _PHONE_RE.match(record.phone.replace(" ", "")):
+            errors.append(f"invalid phone {record.phone!r}")
+        if record.link and not record.link.startswith(("http://", "https://")):
+            errors.append(f"link must start with http:// or https://, got {record.link!r}")
+        if record.number and not _NUMBER_RE.match(record.number):
+            errors.append(f"number must be numeric, got {record.number!r}")
+        if record.city and not record.country:
+            errors.append("city requires country")
+        if record.date:
+            errors.extend(_check_date(record.date, "date"))
+        if catalog:
+            errors.extend(_check_options(record, catalog))
+    else:
+        for name in ("date_opened", "date_closed"):
+            if getattr(record, name):
+                errors.extend(_check_date(getattr(record, name), name))
+        if record.date_opened and record.date_closed and record.date_closed < record.date_opened:
+            errors.append("date_closed is before date_opened")
+    return errors
+
+
+def build_record(kind: str, row: Dict[str, Any], catalog: Optional[Dict[str, Any]] = None) -> Tuple[Record, List[str]]:
+    """Chuyển một dòng dữ liệu thành record; cột thiếu để trống (bỏ qua field đó), không dùng giá trị mẫu"""
+    if "__error__" in row:
+        return RECORD_TYPES[kind](), [row["__error__"]]
+    record_cls = RECORD_TYPES[kind]
+    # csv.DictReader gom các ô thừa (nhiều ô hơn header) vào key None
+    if None in row:
+        return record_cls(), [f"too many columns: {len(row[None])} cell(s) more than the header"]
+    known = {f.name for f in fields(record_cls)}
+    unknown = sorted(str(k) for k in row if k not in known)
+    if unknown:
+        return record_cls(), [f"unknown columns: {', '.join(unknown)}"]
+    values = {name: "" for name in known}
+    values.update((k, "" if v is None else str(v).strip()) for k, v in row.items())
+    record = record_cls(**values)
+    return record, validate_record(kind, record, catalog)
+
+
+def read_header(path: Union[str, Path]) -> Optional[List[str]]:
+    """Header của file CSV (None với JSONL: mỗi dòng tự mang tên field)"""
+    path = Path(path)
+    if path.suffix.lower() != ".csv":
+        return None
+    with path.open(encoding="utf-8-sig", newline="") as f:
+        return next(csv.reader(f), [])
+
+
+def validate_file(
+    path: Union[str, Path], kind: str, max_errors: int = 20, catalog: Optional[Dict[str, Any]] = None,
+) -> int:
+    """Kiểm tra toàn bộ file trước khi chạy (đọc streaming); trả về số record hợp lệ.
+    Key của record (KEY_FIELDS) phải có giá trị riêng trên từng dòng, không lấy giá trị mặc định.
+    Kiểm tra trùng key giữ digest 8 byte của mỗi key: bộ nhớ O(số key), không giữ chính key hay số dòng.
+    Có catalog thì giá trị dropdown phải là option thật, lỗi được báo trước khi mở browser"""
+    if kind not in RECORD_TYPES:
+        raise ValueError(f"Unknown record kind: {kind}")
+    header = read_header(path)
+    if header is not None:
+        missing = [column for column in required_columns(kind) if column not in header]
+        if missing:
+            raise RecordValidationError(Path(path), [(1, f"missing required column(s): {', '.join(missing)}")])
+    key_field = KEY_FIELDS[kind]
+    errors: List[Tuple[int, str]] = []
+    truncated = False
+    count = 0
+    seen: Set[bytes] = set()
+    for line_num, row in iter_rows(path):
+        count += 1
+        _, problems = build_record(kind, row, catalog)
+        if "__error__" not in row:
+            key = str(row.get(key_field) or "").strip()
+            if not key:
+                problems.append(f"{key_field} is required (record key)")
+            else:
+                digest = hashlib.blake2b(key.encode("utf-8"), digest_size=8).digest()
+                if digest in seen:
+                    problems.append(f"duplicate {key_field} {key!r}")
+                else:
+                    seen.add(digest)
+        for problem in problems:
+            if len(errors) >= max_errors:
+                truncated = True
+                break
+            errors.append((line_num, problem))
+    if errors:
+        raise RecordValidationError(Path(path), errors, truncated)
+    return count
+
+
+def iter_records(path: Union[str, Path], kind: str) -> Iterator[Record]:
+    """Generator đọc lần lượt record từ file; bộ nhớ không phụ thuộc kích thước file"""
+    if kind not in RECORD_TYPES:
+        raise ValueError(f"Unknown record kind: {kind}")
+    for line_num, row in iter_rows(path):
+        record, problems = build_record(kind, row)
+        if problems:
+            raise RecordValidationError(Path(path), [(line_num, p) for p in problems])
+        yield record
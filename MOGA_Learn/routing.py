@@ -0,0 +1,215 @@
+import hashlib
+import json
+import os
+import re
+import time
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Dict, Iterable, Optional, Tuple, Union
+from urllib.parse import urlparse
+from playwright.async_api import BrowserContext, Error as PlaywrightError, Page, Request, Route
+
+CACHE_DIR = Path(__file__).parent / ".asset_cache"
+DEFAULT_BLOCKED_TYPES = ("image", "font", "media")
+DEFAULT_BLOCKED_HOSTS = (
+    "google-analytics.com",
+    "googletagmanager.com",
+    "doubleclick.net",
+    "facebook.net",
+    "hotjar.com",
+    "clarity.ms",
+    "segment.io",
+    "mixpanel.com",
+)
+DEFAULT_CACHE_TYPES = ("script", "stylesheet")
+DEFAULT_MAX_AGE = 24 * 60 * 60  # giây
+
+# Bundle có hash trong tên file (vd: main.3f9a2c1d.js) không bao giờ đổi nội dung
+_FINGERPRINT_RE = re.compile(r"[.-][0-9a-f]{8,}\.(js|css|mjs)$", re.IGNORECASE)
+_MAX_AGE_RE = re.compile(r"(?:^|[,\s])max-age=(\d+)", re.IGNORECASE)
+# Header không còn đúng sau khi Playwright đã giải nén body
+_DROP_HEADERS = {"content-encoding", "content-length", "transfer-encoding"}
+
+
+@dataclass
+class RoutingStats:
+    """Thống kê request bị chặn / phục vụ từ cache"""
+    blocked_requests: int = 0
+    cache_hits: int = 0
+    revalidated: int = 0
+    cache_misses: int = 0
+    bytes_saved: int = 0
+
+    @property
+    def requests_saved(self) -> int:
+        return self.blocked_requests + self.cache_hits
+
+    def report(self) -> str:
+        return (
+            f"Routing: chặn {self.blocked_requests} request, cache hit {self.cache_hits}, "
+            f"revalidate {self.revalidated}, miss {self.cache_misses}, "
+            f"tiết kiệm {self.requests_saved} request / {self.bytes_saved / 1024:.1f} KiB"
+        )
+
+
+class AssetCache:
+    """Cache static asset trên đĩa: body lưu theo sha256 nội dung, index lưu theo sha256 URL"""
+
+    def __init__(self, root: Path = CACHE_DIR):
+        self.root = Path(root)
+        self.blobs = self.root / "blobs"
+        self.index = self.root / "index"
+        self.blobs.mkdir(parents=True, exist_ok=True)
+        self.index.mkdir(parents=True, exist_ok=True)
+
+    @staticmethod
+    def _digest(data: bytes) -> str:
+        return hashlib.sha256(data).hexdigest()
+
+    def _entry_path(self, url: str) -> Path:
+        return self.index / f"{self._digest(url.encode('utf-8'))}.json"
+
+    @staticmethod
+    def _write_atomic(path: Path, data: bytes):
+        tmp_path = path.with_name(f"{path.name}.{os.getpid()}.tmp")
+        tmp_path.write_bytes(data)
+        os.replace(tmp_path, path)
+
+    def get(self, url: str) -> Optional[Tuple[Dict, bytes]]:
+        """Trả về (entry, body) nếu URL đã có trong cache"""
+        try:
+            entry = json.loads(self._entry_path(url).read_text(encoding="utf-8"))
+            body = (self.blobs / entry["sha256"]).read_bytes()
+        except (OSError, ValueError, KeyError):
+            return None
+        return entry, body
+
+    def put(self, url: str, status: int, headers: Dict[str, str], body: bytes):
+        """Lưu asset; nội dung trùng nhau giữa nhiều URL chỉ lưu một lần"""
+        sha = self._digest(body)
+        blob_path = self.blobs / sha
+        if not blob_path.exists():
+            self._write_atomic(blob_path, body)
+        entry = {
+            "url": url,
+            "status": status,
+            "headers": {k: v for k, v in headers.items() if k.lower() not in _DROP_HEADERS},
+            "sha256": sha,
+            "stored_at": time.time(),
+        }
+        self._write_atomic(self._entry_path(url), json.dumps(entry).encode("utf-8"))
+
+    def touch(self, url: str):
+        """Đánh dấu entry vừa được server xác nhận không đổi (304)"""
+        path = self._entry_path(url)
+        try:
+            entry = json.loads(path.read_text(encoding="utf-8"))
+        except (OSError, ValueError):
+            return
+        entry["stored_at"] = time.time()
+        self._write_atomic(path, json.dumps(entry).encode("utf-8"))
+
+
+class ResourceRouter:
+    """Chặn resource không cần thiết và phục vụ static asset không đổi từ cache trên đĩa"""
+
+    def __init__(
+        self,
+        block_types: Iterable[str] = DEFAULT_BLOCKED_TYPES,
+        block_hosts: Iterable[str] = DEFAULT_BLOCKED_HOSTS,
+        cache_types: Iterable[str] = DEFAULT_CACHE_TYPES,
+        cache_dir: Optional[Path] = CACHE_DIR,
+        max_age: int = DEFAULT_MAX_AGE,
+    ):
+        self.block_types = set(block_types)
+        self.block_hosts = tuple(block_hosts)
+        self.cache_types = set(cache_types)
+        self.cache = AssetCache(cache_dir) if cache_dir else None
+        self.max_age = max_age
+        self.stats = RoutingStats()
+
+    async def install(self, target: Union[Page, BrowserContext]):
+        """Gắn router vào page hoặc cả context"""
+        await target.route("**/*", self._handle)
+
+    def _is_blocked(self, request: Request) -> bool:
+        if request.resource_type in self.block_types:
+            return True
+        host = urlparse(request.url).hostname or ""
+        return any(host == blocked or host.endswith("." + blocked) for blocked in self.block_hosts)
+
+    @staticmethod
+    def _header(entry: Dict, name: str) -> Optional[str]:
+        return next((v for k, v in entry["headers"].items() if k.lower() == name), None)
+
+    def _is_fresh(self, url: str, entry: Dict) -> bool:
+        """Dùng bản trên đĩa không cần hỏi server: bundle có hash, hoặc còn trong max-age server cho phép.
+        no-cache hoặc không có max-age thì luôn revalidate"""
+        cache_control = self._header(entry, "cache-control") or ""
+        if "no-cache" in cache_control.lower():
+            return False
+        if _FINGERPRINT_RE.search(urlparse(url).path):
+            return True
+        max_age = _MAX_AGE_RE.search(cache_control)
+        if max_age is None:
+            return False
+        return time.time() - entry.get("stored_at", 0) < min(int(max_age.group(1)), self.max_age)
+
+    async def _fetch(self, route: Route, headers: Optional[Dict[str, str]] = None):
+        """route.fetch; lỗi mạng thì trả None để request đi thẳng tới server như bình thường"""
+        try:
+            return await route.fetch(headers=headers)
+        except PlaywrightError as e:
+            print(f"Lỗi fetch {route.request.url}: {e}")
+            return None
+
+    async def _handle(self, route: Route, request: Request):
+        if self._is_blocked(request):
+            self.stats.blocked_requests += 1
+            await route.abort("blockedbyclient")
+            return
+        if self.cache is None or request.method != "GET" or request.resource_type not in self.cache_types:
+            await route.continue_()
+            return
+
+        cached = self.cache.get(request.url)
+        if cached:
+            entry, body = cached
+            if self._is_fresh(request.url, entry):
+                self.stats.cache_hits += 1
+                self.stats.bytes_saved += len(body)
+                await route.fulfill(status=entry["status"], headers=entry["headers"], body=body)
+                return
+            # Hết hạn / cần revalidate: hỏi lại server bằng conditional request
+            validators = {}
+            for name, header in (("etag", "If-None-Match"), ("last-modified", "If-Modified-Since")):
+                value = self._header(entry, name)
+                if value:
+                    validators[header] = value
+            if validators:
+                response = await self._fetch(route, {**request.headers, **validators})
+                if response is None:
+                    await route.continue_()
+                    return
+                if response.status == 304:
+                    self.stats.revalidated += 1
+                    self.stats.bytes_saved += len(body)
+                    self.cache.touch(request.url)
+                    await route.fulfill(status=entry["status"], headers=entry["headers"], body=body)
+                    return
+                await self._store_and_fulfill(route, request, response)
+                return
+
+        response = await self._fetch(route)
+        if response is None:
+            await route.continue_()
+            return
+        await self._store_and_fulfill(route, request, response)
+
+    async def _store_and_fulfill(self, route: Route, request: Request, response):
+        self.stats.cache_misses += 1
+        body = await response.body()
+        cache_control = response.headers.get("cache-control", "")
+        if response.status == 200 and "no-store" not in cache_control:
+            self.cache.put(request.url, response.status, response.headers, body)
+        await route.fulfill(response=response, body=body)
@@ -0,0 +1,272 @@
+import argparse
+import asyncio
+import importlib
+import time
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+from playwright.async_api import async_playwright, Browser, BrowserContext, Playwright
+from browser_daemon import connect, daemon_endpoint
+from credentials import MOGA_STG_URL
+from routing import ResourceRouter
+from session import SessionCache
+from tracing import TRACER, TRACE_FILE
+
+# Tên file bắt đầu bằng số nên phải import qua importlib
+lead_module = importlib.import_module("01_login_success_test_optimized")
+opti_module = importlib.import_module("02_opti")
+
+# Mỗi loại job = class automation + danh sách step (tên method) chạy theo thứ tự
+JOB_STEPS: Dict[str, Tuple[type, List[str]]] = {
+    "lead": (
+        lead_module.MOGAWebAutomation,
+        ["login_success", "access_lead_section", "change_list_view", "add_new_lead", "fill_lead_information", "save_lead"],
+    ),
+    "opportunity": (
+        opti_module.MOGAWebAutomation,
+        ["login_success", "access_opti_section", "add_new_opti", "fill_opti_information", "save_opportunity"],
+    ),
+    "personal_settings": (
+        lead_module.MOGAWebAutomation,
+        ["login_success", "update_personal_settings"],
+    ),
+}
+
+DEFAULT_VIEWPORT = {"width": 1600, "height": 1200}
+
+
+@dataclass
+class Job:
+    """Một workflow cần chạy; params là kwargs cho từng step, vd: {"fill_lead_information": {...}}"""
+    kind: str
+    params: Dict[str, Dict[str, Any]] = field(default_factory=dict)
+    job_id: int = 0
+
+
+@dataclass
+class JobResult:
+    """Kết quả chạy một job"""
+    job: Job
+    ok: bool
+    elapsed: float
+    worker: int
+    error: Optional[str] = None
+
+
+class WorkflowRunner:
+    """Chạy nhiều workflow song song, mỗi job trong một BrowserContext riêng của cùng một browser"""
+
+    def __init__(
+        self,
+        concurrency: int = 4,
+        headless: bool = True,
+        base_url: str = MOGA_STG_URL,
+        session: Optional[SessionCache] = None,
+        router: Optional[ResourceRouter] = None,
+        cdp_endpoint: Optional[str] = None,
+        diagnostics: bool = False,
+        handle_sigint: bool = True,
+    ):
+        if concurrency < 1:
+            raise ValueError("concurrency must be >= 1")
+        self.concurrency = concurrency
+        self.headless = headless
+        self.base_url = base_url
+        self.session = session
+        self.router = router
+        self.cdp_endpoint = cdp_endpoint
+        self.diagnostics = diagnostics
+        # False: Ctrl-C không đóng browser, process gọi tự quyết định khi nào dừng (vd: shard)
+        self.handle_sigint = handle_sigint
+        self.playwright: Optional[Playwright] = None
+        self.browser: Optional[Browser] = None
+
+    async def __aenter__(self):
+        """Context manager entry"""
+        await self.start()
+        return self
+
+    async def __aexit__(self, exc_type, exc_val, exc_tb):
+        """Context manager exit"""
+        await self.close()
+
+    async def start(self):
+        """Khởi tạo một browser dùng chung cho mọi job (hoặc attach vào browser daemon)"""
+        started = time.perf_counter()
+        self.playwright = await async_playwright().start()
+        if self.cdp_endpoint:
+            self.browser = await connect(self.playwright, self.cdp_endpoint)
+        else:
+            self.browser = await self.playwright.chromium.launch(
+                headless=self.headless,
+                channel="chrome",
+                handle_sigint=self.handle_sigint,
+            )
+        mode = "attach" if self.cdp_endpoint else "launch"
+        print(f"Browser {mode}: {(time.perf_counter() - started) * 1000:.0f} ms")
+
+    async def close(self):
+        """Đóng browser (khi attach chỉ ngắt kết nối, daemon vẫn chạy)"""
+        if self.browser:
+            await self.browser.close()
+        if self.playwright:
+            await self.playwright.stop()
+
+    async def new_context(self, storage_state: Optional[str] = None) -> BrowserContext:
+        """Tạo BrowserContext mới cho một job"""
+        if self.browser is None:
+            raise RuntimeError("Browser not initialized")
+        if not self.browser.is_connected() and self.cdp_endpoint:
+            # Daemon vừa khởi động lại browser: attach lại trước khi tạo context
+            self.browser = await connect(self.playwright, self.cdp_endpoint)
+        context = await self.browser.new_context(viewport=DEFAULT_VIEWPORT, storage_state=storage_state)
+        if self.router:
+            await self.router.install(context)
+        return context
+
+    async def open_authenticated(self, automation_cls: type) -> Tuple[BrowserContext, Any]:
+        """Mở context đã đăng nhập sẵn từ session cache, đăng nhập lại một lần nếu bị đẩy về trang login"""
+        if self.session is None or self.browser is None:
+            raise RuntimeError("Session cache not configured")
+        for attempt in range(2):
+            generation = self.session.generation()
+            context = await self.new_context(await self.session.get_state(self.browser))
+            try:
+                automation = automation_cls(headless=self.headless, diagnostics=self.diagnostics)
+                automation.attach_page(await context.new_page())
+                await automation.navigate_to_url(self.base_url)
+                await automation.waits.network_idle()
+                if not await self.session.is_login_page(automation.page):
+                    return context, automation
+            except Exception:
+                await context.close()
+                raise
+            await context.close()
+            if attempt == 0:
+                print("Session hết hạn, đăng nhập lại")
+                await self.session.relogin(self.browser, generation)
+        raise RuntimeError("Still redirected to login after re-login")
+
+    async def run_job(self, job: Job, worker: int = 0) -> JobResult:
+        """Chạy một job trong context riêng, tái sử dụng các step của MOGAWebAutomation"""
+        if job.kind not in JOB_STEPS:
+            raise ValueError(f"Unknown job kind: {job.kind}")
+        with TRACER.span(f"job:{job.kind}", job_id=job.job_id, worker=worker) as span:
+            result = await self._run_job(job, worker)
+            if span and not result.ok:
+                span.outcome = "error"
+                span.error = result.error
+            return result
+
+    async def _run_job(self, job: Job, worker: int) -> JobResult:
+        automation_cls, steps = JOB_STEPS[job.kind]
+        started = time.perf_counter()
+        context: Optional[BrowserContext] = None
+        try:
+            if self.session:
+                context, automation = await self.open_authenticated(automation_cls)
+                steps = [step for step in steps if step != "login_success"]
+            else:
+                context = await self.new_context()
+                automation = automation_cls(headless=self.headless, diagnostics=self.diagnostics)
+                automation.attach_page(await context.new_page())
+                await automation.navigate_to_url(self.base_url)
+            for step in steps:
+                await getattr(automation, step)(**job.params.get(step, {}))
+            await automation.waits.network_idle()
+            return JobResult(job, True, time.perf_counter() - started, worker)
+        except Exception as e:
+            print(f"Lỗi job {job.job_id} ({job.kind}): {e}")
+            return JobResult(job, False, time.perf_counter() - started, worker, error=repr(e))
+        finally:
+            if context:
+                await context.close()
+
+    async def run(
+        self,
+        jobs: Iterable[Job],
+        on_result: Optional[Callable[[JobResult], None]] = None,
+    ) -> List[JobResult]:
+        """Chạy các job với tối đa `concurrency` job cùng lúc; jobs được đọc dần vào hàng đợi"""
+        queue: asyncio.Queue = asyncio.Queue(maxsize=self.concurrency * 2)
+        results: List[JobResult] = []
+
+        async def producer():
+            for job_id, job in enumerate(jobs):
+                if not job.job_id:
+                    job.job_id = job_id + 1
+                await queue.put(job)
+            for _ in range(self.concurrency):
+                await queue.put(None)
+
+        async def worker(worker_id: int):
+            while True:
+                job = await queue.get()
+                if job is None:
+                    return
+                result = await self.run_job(job, worker_id)
+                results.append(result)
+                if on_result:
+                    on_result(result)
+
+        await asyncio.gather(producer(), *(worker(i) for i in range(self.concurrency)))
+        return results
+
+
+def print_summary(results: List[JobResult], wall_time: float):
+    """In tổng kết kết quả chạy"""
+    ok = sum(1 for r in results if r.ok)
+    print(f"Hoàn thành {ok}/{len(results)} job trong {wall_time:.1f}s")
+    for r in results:
+        if not r.ok:
+            print(f"  job {r.job.job_id} ({r.job.kind}) thất bại: {r.error}")
+
+
+async def main():
+    """Hàm main để chạy nhiều workflow song song"""
+    parser = argparse.ArgumentParser(description="Chạy song song các workflow MOGA CRM")
+    parser.add_argument("--leads", type=int, default=1)
+    parser.add_argument("--opportunities", type=int, default=0)
+    parser.add_argument("--personal-settings", type=int, default=0)
+    parser.add_argument("--concurrency", type=int, default=4)
+    parser.add_argument("--headed", action="store_true")
+    parser.add_argument("--no-session-cache", action="store_true", help="Đăng nhập lại trong mỗi job")
+    parser.add_argument("--no-routing", action="store_true", help="Không chặn resource / không dùng asset cache")
+    parser.add_argument(
+        "--attach", nargs="?", const="", metavar="ENDPOINT",
+        help="Attach vào browser daemon (mặc định endpoint của daemon đang chạy) thay vì launch Chrome",
+    )
+    parser.add_argument("--diagnostics", action="store_true", help="Ghi ring buffer diagnostics ra đĩa khi step lỗi")
+    parser.add_argument("--trace-file", default=str(TRACE_FILE), help="File JSON lines để ghi span")
+    parser.add_argument("--chrome-trace", help="Ghi thêm file Chrome trace-event")
+    args = parser.parse_args()
+
+    jobs = (
+        [Job("lead") for _ in range(args.leads)]
+        + [Job("opportunity") for _ in range(args.opportunities)]
+        + [Job("personal_settings") for _ in range(args.personal_settings)]
+    )
+    TRACER.flush_path = Path(args.trace_file)
+    started = time.perf_counter()
+    session = None if args.no_session_cache else SessionCache()
+    router = None if args.no_routing else ResourceRouter()
+    cdp_endpoint = None
+    if args.attach is not None:
+        cdp_endpoint = args.attach or daemon_endpoint()
+        if not cdp_endpoint:
+            parser.error("no running browser daemon; start one with `python browser_daemon.py serve`")
+    async with WorkflowRunner(
+        concurrency=args.concurrency, headless=not args.headed, session=session, router=router,
+        cdp_endpoint=cdp_endpoint, diagnostics=args.diagnostics,
+    ) as runner:
+        results = await runner.run(jobs)
+    print_summary(results, time.perf_counter() - started)
+    if args.chrome_trace:
+        TRACER.export_chrome_trace(args.chrome_trace)
+    TRACER.export_jsonl(args.trace_file)
+    if router:
+        print(router.stats.report())
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
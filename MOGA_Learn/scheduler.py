@@ -0,0 +1,216 @@
+import argparse
+import asyncio
+import time
+from dataclasses import dataclass, field
+from graphlib import CycleError, TopologicalSorter
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+from playwright.async_api import BrowserContext
+from browser_daemon import daemon_endpoint
+from credentials import MOGA_STG_URL
+from routing import ResourceRouter
+from runner import WorkflowRunner, lead_module, opti_module
+from tracing import TRACER, TRACE_FILE
+
+SHARED_BRANCH = "shared"
+
+
+@dataclass
+class StepSpec:
+    """Một node trong đồ thị: gọi `method` của automation đang chạy trong tab `tab`"""
+    name: str
+    automation_cls: type
+    method: str
+    branch: str
+    tab: str
+    after: Tuple[str, ...] = ()
+    params: Dict[str, Any] = field(default_factory=dict)
+
+
+@dataclass
+class StepResult:
+    """Kết quả một step; status là ok / failed / skipped (vì step phụ thuộc bị lỗi)"""
+    name: str
+    branch: str
+    status: str
+    elapsed: float = 0.0
+    error: Optional[str] = None
+
+    @property
+    def ok(self) -> bool:
+        return self.status == "ok"
+
+
+@dataclass
+class BranchResult:
+    """Kết quả của một nhánh workflow"""
+    branch: str
+    steps: List[StepResult]
+
+    @property
+    def ok(self) -> bool:
+        return all(step.ok for step in self.steps)
+
+    @property
+    def elapsed(self) -> float:
+        return sum(step.elapsed for step in self.steps)
+
+
+def chain(
+    branch: str,
+    tab: str,
+    automation_cls: type,
+    methods: Sequence[Any],
+    after: Tuple[str, ...] = (),
+) -> List[StepSpec]:
+    """Tạo các step chạy tuần tự trong một tab; phần tử là tên method hoặc (tên method, params)"""
+    steps: List[StepSpec] = []
+    for item in methods:
+        method, params = (item, {}) if isinstance(item, str) else item
+        name = f"{branch}.{method}"
+        steps.append(StepSpec(name, automation_cls, method, branch, tab, after, dict(params)))
+        after = (name,)
+    return steps
+
+
+def build_workflow_graph(base_url: str = MOGA_STG_URL) -> List[StepSpec]:
+    """Một lần đăng nhập, sau đó lead / opportunity / personal settings chạy song song ở 3 tab"""
+    lead_cls = lead_module.MOGAWebAutomation
+    opti_cls = opti_module.MOGAWebAutomation
+    login = chain(SHARED_BRANCH, "lead", lead_cls, [("navigate_to_url", {"url": base_url}), "login_success"])
+    logged_in = (login[-1].name,)
+    # Tab lead dùng lại page vừa đăng nhập; các tab khác mở mới và dùng chung cookie của context
+    lead = chain("lead", "lead", lead_cls, [
+        "access_lead_section", "change_list_view", "add_new_lead", "fill_lead_information", "save_lead",
+    ], after=logged_in)
+    opportunity = chain("opportunity", "opportunity", opti_cls, [
+        ("navigate_to_url", {"url": base_url}),
+        "access_opti_section", "add_new_opti", "fill_opti_information", "save_opportunity",
+    ], after=logged_in)
+    settings = chain("personal_settings", "personal_settings", lead_cls, [
+        ("navigate_to_url", {"url": base_url}), "update_personal_settings",
+    ], after=logged_in)
+    return login + lead + opportunity + settings
+
+
+class StepScheduler:
+    """Chạy đồ thị step theo phụ thuộc; các nhánh độc lập chạy đồng thời trong các tab của cùng một context"""
+
+    def __init__(self, context: BrowserContext, steps: List[StepSpec]):
+        self.context = context
+        self.steps = {step.name: step for step in steps}
+        if len(self.steps) != len(steps):
+            raise ValueError("Duplicate step names in workflow graph")
+        self.order = self._topological_order()
+        self._tabs: Dict[str, Any] = {}
+        self._tab_locks: Dict[str, asyncio.Lock] = {}
+
+    def _topological_order(self) -> List[str]:
+        graph = {}
+        for step in self.steps.values():
+            unknown = [dep for dep in step.after if dep not in self.steps]
+            if unknown:
+                raise ValueError(f"Step {step.name} depends on unknown steps: {', '.join(unknown)}")
+            graph[step.name] = step.after
+        try:
+            return list(TopologicalSorter(graph).static_order())
+        except CycleError as e:
+            raise ValueError(f"Workflow graph has a cycle: {e.args[1]}") from e
+
+    async def _automation(self, step: StepSpec):
+        """Automation của tab; tạo page mới khi tab được dùng lần đầu"""
+        automation = self._tabs.get(step.tab)
+        if automation is None:
+            automation = step.automation_cls(headless=True)
+            automation.attach_page(await self.context.new_page())
+            self._tabs[step.tab] = automation
+        elif not isinstance(automation, step.automation_cls):
+            # Tab dùng chung page nhưng step thuộc class automation khác
+            page = automation.page
+            automation = step.automation_cls(headless=True)
+            automation.attach_page(page)
+            self._tabs[step.tab] = automation
+        return automation
+
+    async def _run_step(self, step: StepSpec, deps: List["asyncio.Task[StepResult]"]) -> StepResult:
+        dep_results = await asyncio.gather(*deps)
+        failed = [r.name for r in dep_results if not r.ok]
+        if failed:
+            return StepResult(step.name, step.branch, "skipped", error=f"dependency failed: {', '.join(failed)}")
+        lock = self._tab_locks.setdefault(step.tab, asyncio.Lock())
+        started = time.perf_counter()
+        async with lock:
+            with TRACER.span(f"step:{step.name}", branch=step.branch, tab=step.tab):
+                try:
+                    automation = await self._automation(step)
+                    await getattr(automation, step.method)(**step.params)
+                except Exception as e:
+                    print(f"Lỗi step {step.name}: {e}")
+                    return StepResult(step.name, step.branch, "failed", time.perf_counter() - started, repr(e))
+        return StepResult(step.name, step.branch, "ok", time.perf_counter() - started)
+
+    async def run(self) -> Dict[str, BranchResult]:
+        """Chạy toàn bộ đồ thị; lỗi ở một nhánh chỉ làm bỏ qua các step phụ thuộc vào nó"""
+        tasks: Dict[str, asyncio.Task] = {}
+        for name in self.order:
+            step = self.steps[name]
+            tasks[name] = asyncio.create_task(self._run_step(step, [tasks[dep] for dep in step.after]))
+        await asyncio.gather(*tasks.values())
+        branches: Dict[str, BranchResult] = {}
+        for step in self.steps.values():
+            branches.setdefault(step.branch, BranchResult(step.branch, [])).steps.append(tasks[step.name].result())
+        return branches
+
+    async def close(self):
+        """Đóng các tab đã mở"""
+        for automation in self._tabs.values():
+            if automation.page and not automation.page.is_closed():
+                await automation.page.close()
+
+
+def print_branch_results(branches: Dict[str, BranchResult], wall_time: float):
+    """In kết quả theo từng nhánh"""
+    for branch in branches.values():
+        status = "OK" if branch.ok else "FAILED"
+        print(f"[{status}] {branch.branch}: {branch.elapsed:.1f}s")
+        for step in branch.steps:
+            if not step.ok:
+                print(f"  {step.name} {step.status}: {step.error}")
+    ok = sum(1 for b in branches.values() if b.ok)
+    print(f"Hoàn thành {ok}/{len(branches)} nhánh trong {wall_time:.1f}s")
+
+
+async def main():
+    """Đăng nhập một lần rồi chạy song song các nhánh workflow trong các tab"""
+    parser = argparse.ArgumentParser(description="Chạy workflow MOGA CRM theo đồ thị phụ thuộc")
+    parser.add_argument("--url", default=MOGA_STG_URL)
+    parser.add_argument("--headed", action="store_true")
+    parser.add_argument("--attach", action="store_true", help="Attach vào browser daemon đang chạy")
+    parser.add_argument("--no-routing", action="store_true", help="Không chặn resource / không dùng asset cache")
+    parser.add_argument("--trace-file", default=str(TRACE_FILE), help="File JSON lines để ghi span")
+    args = parser.parse_args()
+
+    cdp_endpoint = daemon_endpoint() if args.attach else None
+    if args.attach and not cdp_endpoint:
+        parser.error("no running browser daemon; start one with `python browser_daemon.py serve`")
+    router = None if args.no_routing else ResourceRouter()
+    TRACER.flush_path = Path(args.trace_file)
+    started = time.perf_counter()
+    async with WorkflowRunner(
+        concurrency=1, headless=not args.headed, base_url=args.url, router=router, cdp_endpoint=cdp_endpoint,
+    ) as runner:
+        context = await runner.new_context()
+        scheduler = StepScheduler(context, build_workflow_graph(args.url))
+        try:
+            branches = await scheduler.run()
+        finally:
+            await scheduler.close()
+            await context.close()
+    print_branch_results(branches, time.perf_counter() - started)
+    TRACER.export_jsonl(args.trace_file)
+    if router:
+        print(router.stats.report())
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
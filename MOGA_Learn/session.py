@@ -0,0 +1,107 @@
+import asyncio
+import hashlib
+import importlib
+import json
+import os
+import time
+from pathlib import Path
+from typing import Dict, Optional
+from playwright.async_api import Browser, Page
+from credentials import USERNAME, PASSWORD, MOGA_STG_URL
+
+lead_module = importlib.import_module("01_login_success_test_optimized")
+
+AUTH_DIR = Path(__file__).parent / ".auth"
+DEFAULT_MAX_AGE = 8 * 60 * 60  # giây
+LOGIN_URL_MARKERS = ("login", "signin", "sign-in")
+
+
+class SessionCache:
+    """Lưu storage_state (cookies + localStorage) sau khi đăng nhập, mỗi credential một file"""
+
+    def __init__(
+        self,
+        credentials: Optional[Dict[str, str]] = None,
+        base_url: str = MOGA_STG_URL,
+        auth_dir: Path = AUTH_DIR,
+        max_age: int = DEFAULT_MAX_AGE,
+    ):
+        self.credentials = credentials or {USERNAME: PASSWORD}
+        self.base_url = base_url
+        self.auth_dir = Path(auth_dir)
+        self.max_age = max_age
+        self._locks: Dict[str, asyncio.Lock] = {}
+        self._generations: Dict[str, int] = {}
+
+    def state_path(self, username: str = USERNAME) -> Path:
+        """Đường dẫn file storage_state của một credential"""
+        digest = hashlib.sha256(username.encode("utf-8")).hexdigest()[:16]
+        return self.auth_dir / f"{digest}.json"
+
+    def generation(self, username: str = USERNAME) -> int:
+        """Số lần session của credential đã được làm mới trong process này"""
+        return self._generations.get(username, 0)
+
+    def is_fresh(self, username: str = USERNAME) -> bool:
+        """Kiểm tra file state còn hạn (theo max_age và hạn của cookies)"""
+        path = self.state_path(username)
+        if not path.exists():
+            return False
+        now = time.time()
+        if now - path.stat().st_mtime > self.max_age:
+            return False
+        try:
+            state = json.loads(path.read_text(encoding="utf-8"))
+        except (OSError, ValueError):
+            return False
+        for cookie in state.get("cookies", []):
+            expires = cookie.get("expires", -1)
+            if 0 < expires < now:
+                return False
+        return True
+
+    async def get_state(self, browser: Browser, username: str = USERNAME) -> str:
+        """Trả về file state hợp lệ, đăng nhập lại nếu chưa có hoặc đã hết hạn"""
+        if self.is_fresh(username):
+            return str(self.state_path(username))
+        return await self.relogin(browser, self.generation(username), username)
+
+    async def relogin(self, browser: Browser, seen_generation: int, username: str = USERNAME) -> str:
+        """Đăng nhập lại; nhiều worker gọi cùng lúc thì chỉ một worker thực sự đăng nhập"""
+        lock = self._locks.setdefault(username, asyncio.Lock())
+        async with lock:
+            # Worker khác đã làm mới session trong lúc chờ lock
+            if self.generation(username) != seen_generation and self.state_path(username).exists():
+                return str(self.state_path(username))
+            await self._login(browser, username)
+            self._generations[username] = self.generation(username) + 1
+            return str(self.state_path(username))
+
+    async def _login(self, browser: Browser, username: str):
+        """Đăng nhập trong context tạm rồi ghi storage_state ra đĩa"""
+        if username not in self.credentials:
+            raise KeyError(f"No password configured for {username}")
+        print(f"Đăng nhập để tạo session cho {username}")
+        path = self.state_path(username)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        context = await browser.new_context()
+        try:
+            automation = lead_module.MOGAWebAutomation()
+            automation.attach_page(await context.new_page())
+            await automation.navigate_to_url(self.base_url)
+            await automation.login_success(username, self.credentials[username])
+            await automation.waits.network_idle()
+            # Tên tạm riêng theo process: nhiều shard đăng nhập cùng lúc không ghi đè file tạm của nhau
+            tmp_path = path.with_name(f"{path.name}.{os.getpid()}.tmp")
+            await context.storage_state(path=str(tmp_path))
+            os.replace(tmp_path, path)
+        finally:
+            await context.close()
+
+    @staticmethod
+    async def is_login_page(page: Page) -> bool:
+        """Phát hiện bị chuyển về trang đăng nhập (session hết hạn)"""
+        url = page.url.lower()
+        if any(marker in url for marker in LOGIN_URL_MARKERS):
+            return True
+        return await page.get_by_role(role="button", name="sign in").is_visible()
@@ -0,0 +1,443 @@
+import argparse
+import asyncio
+import json
+import multiprocessing as mp
+import os
+import queue
+import signal
+import threading
+import time
+from dataclasses import dataclass, field
+from typing import Any, Dict, Iterable, List, Optional
+from browser_daemon import daemon_endpoint
+from routing import ResourceRouter
+from runner import Job, JobResult, WorkflowRunner
+from session import SessionCache
+from tracing import TRACER, TRACE_DIR, TRACE_FILE, load_spans, percentile, print_stats, step_stats
+
+SHARD_TRACE_PATTERN = "shard-{shard}.jsonl"
+# Job của shard bị crash được chạy lại tối đa bao nhiêu lần trên shard khác
+MAX_JOB_ATTEMPTS = 2
+# Sau khi shard chết: chờ bấy nhiêu giây cho "start" của job shard khác đã lấy trộm từ hàng đợi của nó
+DEAD_QUEUE_GRACE = 2.0
+
+
+@dataclass
+class ShardConfig:
+    """Cấu hình cho mỗi process shard (phải pickle được vì dùng spawn)"""
+    concurrency: int = 2
+    headless: bool = True
+    session_cache: bool = True
+    routing: bool = True
+    cdp_endpoint: Optional[str] = None
+    diagnostics: bool = False
+    run_id: str = ""
+
+
+@dataclass
+class ShardStats:
+    """Số liệu của một shard"""
+    shard: int
+    ok: int = 0
+    failed: int = 0
+    stolen: int = 0
+    busy: float = 0.0
+    crashed: bool = False
+    exitcode: Optional[int] = None
+    pid: Optional[int] = None
+
+
+def _next_job(
+    shard: int, queues: List[Any], remaining: Any, feeding_done: Any, stop: Any, stats: ShardStats, dead: Any,
+) -> Optional[Job]:
+    """Lấy job từ hàng đợi của shard; hết thì lấy trộm từ hàng đợi của shard khác (trừ shard đã chết: process cha xử lý)"""
+    others = list(range(shard + 1, len(queues))) + list(range(shard))
+    while not stop.is_set():
+        try:
+            job = queues[shard].get(timeout=0.05)
+        except queue.Empty:
+            job = None
+            for other in others:
+                if dead[other]:
+                    continue
+                try:
+                    job = queues[other].get_nowait()
+                except queue.Empty:
+                    continue
+                stats.stolen += 1
+                break
+        if job is not None:
+            return job
+        if feeding_done.is_set() and remaining.value <= 0:
+            return None
+    return None
+
+
+async def _shard_main(shard: int, config: ShardConfig, queues, results, remaining, feeding_done, stop, dead):
+    stats = ShardStats(shard, pid=os.getpid())
+    trace_path = TRACE_DIR / SHARD_TRACE_PATTERN.format(shard=shard)
+    if config.run_id:
+        TRACER.run_id = config.run_id
+    # Span ghi dần ra file riêng của shard để bộ nhớ không tăng theo số job
+    TRACER.flush_path = trace_path
+    TRACER.flush_threshold = 2000
+    session = SessionCache() if config.session_cache else None
+    router = ResourceRouter() if config.routing else None
+    async with WorkflowRunner(
+        concurrency=config.concurrency, headless=config.headless, session=session, router=router,
+        cdp_endpoint=config.cdp_endpoint, diagnostics=config.diagnostics, handle_sigint=False,
+    ) as runner:
+        async def worker(worker_id: int):
+            while True:
+                job = await asyncio.to_thread(_next_job, shard, queues, remaining, feeding_done, stop, stats, dead)
+                if job is None:
+                    return
+                results.put(("start", shard, job.job_id))
+                result = await runner.run_job(job, worker_id)
+                stats.busy += result.elapsed
+                if result.ok:
+                    stats.ok += 1
+                else:
+                    stats.failed += 1
+                results.put(("result", shard, result))
+                # remaining chỉ giảm khi job chạy xong: shard khác không thoát sớm khi còn job có thể bị chuyển lại
+                with remaining.get_lock():
+                    remaining.value -= 1
+
+        await asyncio.gather(*(worker(i) for i in range(config.concurrency)))
+    TRACER.export_jsonl(trace_path)
+    results.put(("done", shard, stats))
+
+
+def shard_entry(shard: int, config: ShardConfig, queues, results, remaining, feeding_done, stop, dead):
+    """Điểm vào của process shard: event loop + Playwright riêng"""
+    # Ctrl-C do process cha xử lý: shard chạy xong job đang dở rồi thoát theo cờ stop.
+    # Process group riêng để Ctrl-C của terminal không tới driver Playwright và Chrome do shard sinh ra
+    if hasattr(os, "setpgrp"):
+        os.setpgrp()
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    asyncio.run(_shard_main(shard, config, queues, results, remaining, feeding_done, stop, dead))
+
+
+async def prime_session(config: ShardConfig):
+    """Đăng nhập một lần trong process cha; các shard đọc chung file state thay vì cùng đăng nhập"""
+    async with WorkflowRunner(concurrency=1, headless=config.headless, cdp_endpoint=config.cdp_endpoint) as runner:
+        await SessionCache().get_state(runner.browser)
+
+
+@dataclass
+class ShardedReport:
+    """Kết quả gộp của tất cả shard"""
+    results: List[JobResult] = field(default_factory=list)
+    shards: Dict[int, ShardStats] = field(default_factory=dict)
+    wall_time: float = 0.0
+    interrupted: bool = False
+
+
+class ShardedExecutor:
+    """Chia job cho nhiều process, mỗi process có event loop, Playwright và pool automation riêng"""
+
+    def __init__(self, shards: int = 0, config: Optional[ShardConfig] = None, queue_size: int = 0):
+        self.shards = shards or max(1, (os.cpu_count() or 2) - 1)
+        self.config = config or ShardConfig()
+        self.config.run_id = self.config.run_id or TRACER.run_id
+        self.queue_size = queue_size or self.config.concurrency * 4
+        self.ctx = mp.get_context("spawn")
+
+    def run(self, jobs: Iterable[Job]) -> ShardedReport:
+        if self.config.session_cache and not SessionCache().is_fresh():
+            asyncio.run(prime_session(self.config))
+        ctx = self.ctx
+        queues = [ctx.Queue(maxsize=self.queue_size) for _ in range(self.shards)]
+        results = ctx.Queue()
+        remaining = ctx.Value("i", 0)
+        feeding_done = ctx.Event()
+        stop = ctx.Event()
+        # Cờ shard đã chết: các shard khác thôi lấy trộm từ hàng đợi của nó
+        dead_flags = ctx.Array("b", self.shards)
+        report = ShardedReport(shards={i: ShardStats(i) for i in range(self.shards)})
+        started = time.perf_counter()
+
+        processes = {}
+        for shard in range(self.shards):
+            process = ctx.Process(
+                target=shard_entry,
+                args=(shard, self.config, queues, results, remaining, feeding_done, stop, dead_flags),
+                name=f"moga-shard-{shard}",
+            )
+            process.start()
+            processes[shard] = process
+            report.shards[shard].pid = process.pid
+
+        pending: Dict[int, Job] = {}
+        attempts: Dict[int, int] = {}
+        in_flight: Dict[int, set] = {shard: set() for shard in processes}
+        # Job đã đưa vào hàng đợi nhưng chưa shard nào báo "start": job_id -> shard của hàng đợi
+        queued_on: Dict[int, int] = {}
+        lock = threading.Lock()
+
+        def enqueue(job: Job, preferred: int, count: bool = True) -> bool:
+            """Đưa job vào hàng đợi của shard còn sống; count=False khi chuyển lại job đã được đếm"""
+            alive = [s for s, p in processes.items() if p.is_alive()]
+            if not alive:
+                return False
+            target = preferred if preferred in alive else alive[0]
+            if count:
+                with remaining.get_lock():
+                    remaining.value += 1
+            while not stop.is_set():
+                # Ghi trước khi put: "start" có thể tới trước khi put trả về
+                with lock:
+                    queued_on[job.job_id] = target
+                try:
+                    queues[target].put(job, timeout=0.2)
+                    return True
+                except queue.Full:
+                    if not processes[target].is_alive():
+                        alive = [s for s, p in processes.items() if p.is_alive()]
+                        if not alive:
+                            break
+                        target = alive[0]
+            with lock:
+                queued_on.pop(job.job_id, None)
+            if count:
+                with remaining.get_lock():
+                    remaining.value -= 1
+            return False
+
+        def feeder():
+            for index, job in enumerate(jobs):
+                if stop.is_set():
+                    break
+                if not job.job_id:
+                    job.job_id = index + 1
+                with lock:
+                    pending[job.job_id] = job
+                    attempts[job.job_id] = 1
+                if not enqueue(job, index % self.shards):
+                    break
+            feeding_done.set()
+
+        feeder_thread = threading.Thread(target=feeder, daemon=True)
+        feeder_thread.start()
+        finished = set()
+
+        def handle(kind: str, shard: int, payload: Any):
+            if kind == "start":
+                with lock:
+                    queued_on.pop(payload, None)
+                in_flight[shard].add(payload)
+                if report.shards[shard].crashed:
+                    # "start" tới sau khi shard đã bị xử lý crash: vẫn phải chuyển lại job đó
+                    self._requeue(shard, report, in_flight, pending, attempts, lock, enqueue, remaining)
+            elif kind == "result":
+                in_flight[shard].discard(payload.job.job_id)
+                with lock:
+                    pending.pop(payload.job.job_id, None)
+                report.results.append(payload)
+            elif kind == "done":
+                payload.pid = processes[shard].pid
+                report.shards[shard] = payload
+                finished.add(shard)
+
+        try:
+            while len(finished) < len(processes):
+                dead = [s for s, p in processes.items() if s not in finished and not p.is_alive()]
+                if dead:
+                    for shard in dead:
+                        dead_flags[shard] = 1
+                    # Nhận hết message shard chết đã gửi ("start" cuối cùng) trước khi chuyển lại job của nó
+                    while True:
+                        try:
+                            handle(*results.get(timeout=0.2))
+                        except queue.Empty:
+                            break
+                    crashed = [s for s in dead if s not in finished]
+                    self._check_crashes(dead, processes, finished, report, in_flight, pending, attempts, lock, enqueue, remaining)
+                    if crashed:
+                        self._recover_queues(crashed, queues, results, handle, queued_on, report, pending, lock, enqueue, remaining)
+                try:
+                    kind, shard, payload = results.get(timeout=0.2)
+                except queue.Empty:
+                    continue
+                handle(kind, shard, payload)
+        except KeyboardInterrupt:
+            report.interrupted = True
+            print("Nhận Ctrl-C: dừng lấy job mới, chờ các shard chạy xong job đang dở...")
+            stop.set()
+            self._drain(processes, results, report, finished)
+        finally:
+            stop.set()
+            feeding_done.set()
+            for shard, process in processes.items():
+                process.join(timeout=30)
+                if process.is_alive():
+                    process.terminate()
+                    process.join()
+                report.shards[shard].exitcode = process.exitcode
+        report.wall_time = time.perf_counter() - started
+        return report
+
+    def _check_crashes(self, dead, processes, finished, report, in_flight, pending, attempts, lock, enqueue, remaining):
+        """Shard chết mà chưa gửi "done": job đang chạy của nó được chuyển sang shard khác hoặc đánh dấu lỗi"""
+        for shard in dead:
+            process = processes[shard]
+            if shard in finished:
+                continue
+            finished.add(shard)
+            stats = report.shards[shard]
+            stats.crashed = True
+            stats.exitcode = process.exitcode
+            print(f"Shard {shard} crash (exit code {process.exitcode}), {len(in_flight[shard])} job đang chạy bị ảnh hưởng")
+            self._requeue(shard, report, in_flight, pending, attempts, lock, enqueue, remaining)
+
+    def _recover_queues(self, crashed, queues, results, handle, queued_on, report, pending, lock, enqueue, remaining):
+        """Job còn nằm trong hàng đợi của shard đã crash: lấy ra được thì chuyển sang shard khác.
+        Không lấy được (shard chết khi đang giữ lock đọc của hàng đợi) thì đánh dấu lỗi để remaining về được 0"""
+        for shard in crashed:
+            while True:
+                try:
+                    job = queues[shard].get_nowait()
+                except (queue.Empty, OSError, EOFError):
+                    break
+                if not enqueue(job, (shard + 1) % self.shards, count=False):
+                    with lock:
+                        queued_on[job.job_id] = shard
+        # Job shard khác vừa lấy trộm: "start" của nó tới trong lúc chờ
+        deadline = time.monotonic() + DEAD_QUEUE_GRACE
+        while time.monotonic() < deadline:
+            try:
+                handle(*results.get(timeout=0.1))
+            except queue.Empty:
+                continue
+        with lock:
+            lost = sorted(job_id for job_id, shard in queued_on.items() if shard in crashed)
+            for job_id in lost:
+                queued_on.pop(job_id)
+        for job_id in lost:
+            with lock:
+                job = pending.pop(job_id, None)
+            with remaining.get_lock():
+                remaining.value -= 1
+            if job is not None:
+                report.results.append(JobResult(job, False, 0.0, -1, error="lost in crashed shard's queue"))
+        if lost:
+            print(f"{len(lost)} job kẹt trong hàng đợi của shard đã crash được đánh dấu lỗi")
+
+    def _requeue(self, shard, report, in_flight, pending, attempts, lock, enqueue, remaining):
+        """Chuyển job đang chạy của shard đã crash sang shard khác, quá số lần thử thì đánh dấu lỗi"""
+        for job_id in sorted(in_flight[shard]):
+            with lock:
+                job = pending.get(job_id)
+                attempts[job_id] = attempts.get(job_id, 1) + 1
+                retry = job is not None and attempts[job_id] <= MAX_JOB_ATTEMPTS
+            if retry and enqueue(job, (shard + 1) % self.shards, count=False):
+                continue
+            with lock:
+                pending.pop(job_id, None)
+            with remaining.get_lock():
+                remaining.value -= 1
+            if job is not None:
+                report.results.append(JobResult(job, False, 0.0, -1, error=f"shard {shard} crashed"))
+        in_flight[shard].clear()
+
+    def _drain(self, processes, results, report, finished, timeout: float = 60.0):
+        """Sau Ctrl-C: nhận nốt kết quả của job đang dở trong tối đa `timeout` giây"""
+        deadline = time.monotonic() + timeout
+        while len(finished) < len(processes) and time.monotonic() < deadline:
+            try:
+                kind, shard, payload = results.get(timeout=0.5)
+            except queue.Empty:
+                for shard, process in processes.items():
+                    if not process.is_alive():
+                        finished.add(shard)
+                continue
+            except KeyboardInterrupt:
+                print("Ctrl-C lần hai: dừng ngay")
+                break
+            if kind == "result":
+                report.results.append(payload)
+            elif kind == "done":
+                report.shards[shard] = payload
+                finished.add(shard)
+
+
+def merge_shard_traces(shards: int, run_id: str, output=TRACE_FILE) -> List[Dict[str, Any]]:
+    """Gộp span của các shard (lần chạy này) vào file trace chung, thêm trường shard"""
+    spans = []
+    for shard in range(shards):
+        path = TRACE_DIR / SHARD_TRACE_PATTERN.format(shard=shard)
+        if not path.exists():
+            continue
+        for span in load_spans([path]):
+            if span.get("run_id") == run_id:
+                span["shard"] = shard
+                spans.append(span)
+        path.unlink()
+    output.parent.mkdir(parents=True, exist_ok=True)
+    with output.open("a", encoding="utf-8") as f:
+        for span in spans:
+            f.write(json.dumps(span, ensure_ascii=False) + "\n")
+    return spans
+
+
+def print_sharded_report(report: ShardedReport, spans: List[Dict[str, Any]]):
+    ok = sum(1 for r in report.results if r.ok)
+    total = len(report.results)
+    rate = total / report.wall_time if report.wall_time else 0.0
+    status = " (bị dừng bằng Ctrl-C)" if report.interrupted else ""
+    print(f"Hoàn thành {ok}/{total} job trong {report.wall_time:.1f}s ({rate:.2f} job/s){status}")
+    print(f"{'shard':>5} {'pid':>8} {'ok':>5} {'lỗi':>5} {'stolen':>7} {'busy s':>8} {'trạng thái':>12}")
+    for stats in report.shards.values():
+        state = "crash" if stats.crashed else f"exit {stats.exitcode}"
+        print(f"{stats.shard:>5} {stats.pid or '-':>8} {stats.ok:>5} {stats.failed:>5} {stats.stolen:>7} {stats.busy:>8.1f} {state:>12}")
+    by_kind: Dict[str, List[float]] = {}
+    for result in report.results:
+        if result.ok:
+            by_kind.setdefault(result.job.kind, []).append(result.elapsed * 1000)
+    for kind, values in sorted(by_kind.items()):
+        values.sort()
+        print(f"job {kind}: p50 {percentile(values, 50):.0f} ms, p95 {percentile(values, 95):.0f} ms ({len(values)} ok)")
+    for result in report.results:
+        if not result.ok:
+            print(f"  job {result.job.job_id} ({result.job.kind}) thất bại: {result.error}")
+    if spans:
+        print_stats(step_stats(spans))
+
+
+def main():
+    """Chạy workflow trên nhiều process (mỗi process một event loop + Playwright)"""
+    parser = argparse.ArgumentParser(description="Chạy workflow MOGA CRM trên nhiều CPU core")
+    parser.add_argument("--shards", type=int, default=0, help="Số process (mặc định: số core - 1)")
+    parser.add_argument("--concurrency", type=int, default=2, help="Số job song song trong mỗi shard")
+    parser.add_argument("--leads", type=int, default=4)
+    parser.add_argument("--opportunities", type=int, default=0)
+    parser.add_argument("--personal-settings", type=int, default=0)
+    parser.add_argument("--headed", action="store_true")
+    parser.add_argument("--no-session-cache", action="store_true")
+    parser.add_argument("--no-routing", action="store_true")
+    parser.add_argument("--attach", action="store_true", help="Các shard attach vào browser daemon đang chạy")
+    parser.add_argument("--diagnostics", action="store_true")
+    args = parser.parse_args()
+
+    jobs = (
+        [Job("lead") for _ in range(args.leads)]
+        + [Job("opportunity") for _ in range(args.opportunities)]
+        + [Job("personal_settings") for _ in range(args.personal_settings)]
+    )
+    config = ShardConfig(
+        concurrency=args.concurrency,
+        headless=not args.headed,
+        session_cache=not args.no_session_cache,
+        routing=not args.no_routing,
+        cdp_endpoint=daemon_endpoint() if args.attach else None,
+        diagnostics=args.diagnostics,
+    )
+    executor = ShardedExecutor(args.shards, config)
+    report = executor.run(iter(jobs))
+    spans = merge_shard_traces(executor.shards, config.run_id)
+    print_sharded_report(report, spans)
+
+
+if __name__ == "__main__":
+    main()
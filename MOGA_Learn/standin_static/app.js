@@ -0,0 +1,471 @@
+// Stand-in của MOGA CRM: chỉ giữ lại markup mà các script automation phụ thuộc
+(function () {
+  "use strict";
+
+  const CONFIG = window.STANDIN_CONFIG;
+  const root = document.getElementById("root");
+
+  function h(html) {
+    const template = document.createElement("template");
+    template.innerHTML = html.trim();
+    return template.content.firstElementChild;
+  }
+
+  function escapeHtml(value) {
+    return String(value).replace(/[&<>"']/g, (c) => ({
+      "&": "&amp;", "<": "&lt;", ">": "&gt;", '"': "&quot;", "'": "&#39;",
+    })[c]);
+  }
+
+  async function api(method, path, body) {
+    const response = await fetch(path, {
+      method,
+      credentials: "same-origin",
+      headers: body ? { "Content-Type": "application/json" } : {},
+      body: body ? JSON.stringify(body) : undefined,
+    });
+    let data = null;
+    try { data = await response.json(); } catch (e) { /* body rỗng */ }
+    return { ok: response.ok, status: response.status, data };
+  }
+
+  // Giả lập animation vào của antd: thêm class *-enter rồi gỡ ra sau animationMs
+  function animateIn(el, prefix) {
+    const classes = [prefix + "-enter", prefix + "-enter-active"];
+    el.classList.add(...classes);
+    setTimeout(() => el.classList.remove(...classes), CONFIG.animationMs);
+  }
+
+  function toast(message) {
+    let container = document.querySelector(".Toastify__toast-container--bottom-left");
+    if (!container) {
+      const wrapper = h('<div class="Toastify"><div class="Toastify__toast-container Toastify__toast-container--bottom-left"></div></div>');
+      document.body.appendChild(wrapper);
+      container = wrapper.firstElementChild;
+    }
+    const item = h(`<div class="Toastify__toast" role="alert">${escapeHtml(message)}</div>`);
+    container.appendChild(item);
+    setTimeout(() => item.remove(), 3000);
+  }
+
+  // ---------- Drawer ----------
+
+  const openDrawers = [];
+
+  function openDrawer(title, body, onSave) {
+    const parent = openDrawers[openDrawers.length - 1];
+    if (parent) parent.querySelector(".ant-drawer-footer").hidden = true;
+    const drawer = h(`
+      <div class="ant-drawer ant-drawer-open">
+        <div class="ant-drawer-mask"></div>
+        <div class="ant-drawer-content-wrapper">
+          <div class="ant-drawer-content">
+            <div class="ant-drawer-header">${escapeHtml(title)}</div>
+            <div class="ant-drawer-body"></div>
+            <div class="ant-drawer-footer">
+              <button type="button" class="cancel">Cancel</button>
+              <button type="button" class="save">Save</button>
+            </div>
+          </div>
+        </div>
+      </div>`);
+    drawer.querySelector(".ant-drawer-body").appendChild(body);
+    const footer = drawer.querySelector(".ant-drawer-footer");
+    if (onSave) {
+      footer.querySelector(".save").addEventListener("click", onSave);
+    } else {
+      footer.querySelector(".save").remove();
+    }
+    footer.querySelector(".cancel").addEventListener("click", () => closeDrawer(drawer));
+    document.body.appendChild(drawer);
+    openDrawers.push(drawer);
+    animateIn(drawer.querySelector(".ant-drawer-content-wrapper"), "ant-drawer-panel-motion-right");
+    return drawer;
+  }
+
+  function closeDrawer(drawer) {
+    const index = openDrawers.indexOf(drawer);
+    if (index >= 0) openDrawers.splice(index, 1);
+    drawer.remove();
+    const parent = openDrawers[openDrawers.length - 1];
+    if (parent) parent.querySelector(".ant-drawer-footer").hidden = false;
+  }
+
+  // ---------- antd Select ----------
+
+  let closeOpenPopup = null;
+
+  document.addEventListener("mousedown", (event) => {
+    if (closeOpenPopup && !event.target.closest(".ant-select, .ant-select-dropdown, .ant-picker, .ant-picker-dropdown")) {
+      closeOpenPopup();
+    }
+  });
+
+  function positionPopup(popup, anchor) {
+    const rect = anchor.getBoundingClientRect();
+    popup.style.left = `${rect.left + window.scrollX}px`;
+    popup.style.top = `${rect.bottom + window.scrollY + 4}px`;
+    popup.style.minWidth = `${rect.width}px`;
+  }
+
+  function setSelectValue(select, value) {
+    select.dataset.value = value;
+    const selector = select.querySelector(".ant-select-selector");
+    selector.querySelectorAll(".ant-select-selection-placeholder, .ant-select-selection-item").forEach((el) => el.remove());
+    selector.appendChild(h(`<span class="ant-select-selection-item" title="${escapeHtml(value)}">${escapeHtml(value)}</span>`));
+  }
+
+  function makeSelect(placeholder, options, search) {
+    const select = h(`
+      <div class="ant-select${search ? " ant-select-show-search" : ""}">
+        <div class="ant-select-selector">
+          <span class="ant-select-selection-search">
+            <input class="ant-select-selection-search-input" role="combobox" aria-expanded="false" autocomplete="off"${search ? "" : " readonly"}>
+          </span>
+          <span class="ant-select-selection-placeholder">${escapeHtml(placeholder)}</span>
+        </div>
+      </div>`);
+    select.dataset.value = "";
+    const input = select.querySelector("input");
+    let popup = null;
+    let filterTimer = null;
+
+    function renderOptions(filter) {
+      const holder = popup.querySelector(".rc-virtual-list-holder-inner");
+      const needle = (filter || "").toLowerCase();
+      // options có thể là hàm (vd: City phụ thuộc Country đang chọn)
+      const values = typeof options === "function" ? options() : options;
+      const matches = values.filter((o) => !needle || o.toLowerCase().includes(needle));
+      holder.innerHTML = matches.length
+        ? matches.map((o) => `<div class="ant-select-item ant-select-item-option" title="${escapeHtml(o)}"><div class="ant-select-item-option-content">${escapeHtml(o)}</div></div>`).join("")
+        : '<div class="ant-select-item-empty">No data</div>';
+    }
+
+    function close() {
+      if (!popup) return;
+      popup.remove();
+      popup = null;
+      input.value = "";
+      input.setAttribute("aria-expanded", "false");
+      closeOpenPopup = null;
+    }
+
+    function open() {
+      if (closeOpenPopup) closeOpenPopup();
+      popup = h(`
+        <div class="ant-select-dropdown">
+          <div class="rc-virtual-list"><div class="rc-virtual-list-holder"><div class="rc-virtual-list-holder-inner"></div></div></div>
+        </div>`);
+      renderOptions("");
+      positionPopup(popup, select);
+      document.body.appendChild(popup);
+      animateIn(popup, "ant-slide-up");
+      input.setAttribute("aria-expanded", "true");
+      input.focus();
+      closeOpenPopup = close;
+      popup.addEventListener("click", (event) => {
+        const option = event.target.closest(".ant-select-item-option");
+        if (!option) return;
+        setSelectValue(select, option.getAttribute("title"));
+        close();
+      });
+    }
+
+    select.addEventListener("click", () => { if (!popup) open(); });
+    input.addEventListener("input", () => {
+      if (!popup) return;
+      // Lọc option bất đồng bộ như khi antd gọi API tìm kiếm
+      clearTimeout(filterTimer);
+      filterTimer = setTimeout(() => popup && renderOptions(input.value), CONFIG.searchDelayMs);
+    });
+    return select;
+  }
+
+  // ---------- DatePicker ----------
+
+  function pad(n) { return String(n).padStart(2, "0"); }
+
+  function makePicker(name, label) {
+    const picker = h(`
+      <div class="ant-picker">
+        <div class="ant-picker-input"><input name="${name}" aria-label="${escapeHtml(label)}" placeholder="Select date" autocomplete="off"></div>
+      </div>`);
+    const input = picker.querySelector("input");
+    let popup = null;
+
+    function close() {
+      if (!popup) return;
+      popup.remove();
+      popup = null;
+      closeOpenPopup = null;
+    }
+
+    function open() {
+      if (closeOpenPopup) closeOpenPopup();
+      const shown = /^\d{4}-\d{2}-\d{2}$/.test(input.value) ? new Date(input.value + "T00:00:00") : new Date();
+      const year = shown.getFullYear();
+      const month = shown.getMonth();
+      const start = new Date(year, month, 1 - new Date(year, month, 1).getDay());
+      let rows = "";
+      for (let week = 0; week < 6; week++) {
+        rows += "<tr>";
+        for (let day = 0; day < 7; day++) {
+          const d = new Date(start.getFullYear(), start.getMonth(), start.getDate() + week * 7 + day);
+          const inView = d.getMonth() === month ? " ant-picker-cell-in-view" : "";
+          const title = `${d.getFullYear()}-${pad(d.getMonth() + 1)}-${pad(d.getDate())}`;
+          rows += `<td class="ant-picker-cell${inView}" title="${title}"><div class="ant-picker-cell-inner">${d.getDate()}</div></td>`;
+        }
+        rows += "</tr>";
+      }
+      popup = h(`<div class="ant-picker-dropdown"><div class="ant-picker-panel"><table class="ant-picker-content"><tbody>${rows}</tbody></table></div></div>`);
+      positionPopup(popup, picker);
+      document.body.appendChild(popup);
+      animateIn(popup, "ant-slide-up");
+      closeOpenPopup = close;
+      popup.addEventListener("click", (event) => {
+        const cell = event.target.closest("td.ant-picker-cell");
+        if (!cell) return;
+        input.value = cell.getAttribute("title");
+        close();
+      });
+    }
+
+    picker.addEventListener("click", () => { if (!popup) open(); });
+    input.addEventListener("keydown", (event) => {
+      if (event.key === "Enter" && /^\d{4}-\d{2}-\d{2}$/.test(input.value)) close();
+    });
+    return picker;
+  }
+
+  // ---------- Login ----------
+
+  function renderLogin() {
+    history.replaceState(null, "", "/login");
+    root.innerHTML = "";
+    const form = h(`
+      <form class="login">
+        <input type="email" name="email" aria-label="email">
+        <input type="password" name="password" aria-label="password">
+        <button type="submit">Sign in</button>
+      </form>`);
+    form.addEventListener("submit", async (event) => {
+      event.preventDefault();
+      const result = await api("POST", CONFIG.api.auth, { email: form.email.value, password: form.password.value });
+      if (result.ok) {
+        toast("Login successfully");
+        renderApp();
+      } else {
+        toast("Login failed");
+      }
+    });
+    root.appendChild(form);
+  }
+
+  // ---------- App ----------
+
+  function content() { return document.getElementById("content"); }
+
+  function renderApp() {
+    if (location.pathname === "/login") history.replaceState(null, "", "/");
+    root.innerHTML = "";
+    const shell = h(`
+      <div class="layout">
+        <aside>
+          <ul role="menu">
+            <li role="menuitem" data-page="lead">Lead</li>
+            <li role="menuitem" data-page="opportunity">Opportunity</li>
+          </ul>
+        </aside>
+        <main>
+          <header><div class="ant-dropdown-trigger user-menu">My account</div></header>
+          <section id="content"></section>
+        </main>
+      </div>`);
+    shell.querySelectorAll("[role=menuitem]").forEach((item) => {
+      item.addEventListener("click", () => (item.dataset.page === "lead" ? renderLeadPage() : renderOpportunityPage()));
+    });
+    shell.querySelector(".ant-dropdown-trigger").addEventListener("click", openUserMenu);
+    root.appendChild(shell);
+  }
+
+  function openUserMenu() {
+    document.querySelectorAll(".ant-dropdown").forEach((el) => el.remove());
+    const menu = h(`
+      <div class="ant-dropdown ant-dropdown-placement-bottomRight">
+        <ul class="ant-dropdown-menu"><li><button type="button">Personal Setting</button></li></ul>
+      </div>`);
+    menu.querySelector("button").addEventListener("click", () => {
+      menu.remove();
+      renderPersonalSetting();
+    });
+    document.body.appendChild(menu);
+  }
+
+  function renderPersonalSetting() {
+    content().innerHTML = "";
+    const form = h(`
+      <form class="personal-setting">
+        <h2>Personal Setting</h2>
+        <input name="firstName" aria-label="First name">
+        <input name="lastName" aria-label="Last name">
+        <input autocomplete="tel" aria-label="Phone">
+        <button type="submit">Save</button>
+      </form>`);
+    form.addEventListener("submit", async (event) => {
+      event.preventDefault();
+      const result = await api("PUT", CONFIG.api.profile, {
+        firstName: form.firstName.value,
+        lastName: form.lastName.value,
+        phone: form.querySelector("input[autocomplete='tel']").value,
+      });
+      toast(result.ok ? "Updated successfully" : "Update failed");
+    });
+    content().appendChild(form);
+  }
+
+  async function renderRecordList(kind, container) {
+    const result = await api("GET", CONFIG.api[kind]);
+    const records = (result.data && result.data.data) || [];
+    container.innerHTML = records.map((r) => `<li data-id="${escapeHtml(r.id)}">${escapeHtml(r.account_name || r.name || r.id)}</li>`).join("");
+  }
+
+  function renderLeadPage() {
+    content().innerHTML = "";
+    const page = h(`
+      <div class="lead-page">
+        <div class="toolbar">
+          <button type="button" class="view-toggle" aria-label="List view">
+            <svg data-icon="bars" viewBox="0 0 10 10" width="16" height="16"><path d="M0 1h10M0 5h10M0 9h10" stroke="currentColor"/></svg>
+          </button>
+          <button type="button" class="add">Add lead</button>
+        </div>
+        <ul class="record-list kanban"></ul>
+      </div>`);
+    const list = page.querySelector(".record-list");
+    page.querySelector(".view-toggle").addEventListener("click", () => {
+      list.classList.toggle("kanban");
+      renderRecordList("leads", list);
+    });
+    page.querySelector(".add").addEventListener("click", () => openLeadDrawer(list));
+    content().appendChild(page);
+  }
+
+  function openLeadDrawer(list) {
+    const options = CONFIG.options;
+    const body = h('<div class="lead-form"></div>');
+    const textInputs = [
+      ['aria-label="Account name" name="account_name"', "account_name"],
+      ['aria-label="Contact name" name="name"', "contact_name"],
+      ['aria-label="Phone" autocomplete="tel" name="phone"', "phone"],
+      ['aria-label="Email" name="email"', "email"],
+      ['aria-label="Job title" name="job_title"', "job_title"],
+    ];
+    const otherInputs = [
+      ['aria-label="Tax ID" name="tax_identification_number"', "tax_id"],
+      ['aria-label="Address" name="address"', "address"],
+      ['aria-label="Text" name="text"', "text"],
+      ['aria-label="Link" name="link"', "link"],
+      ['aria-label="Amount" name="number" placeholder="Number"', "number"],
+    ];
+    const fields = {};
+    textInputs.forEach(([attrs, key]) => { fields[key] = body.appendChild(h(`<input ${attrs}>`)); });
+    const selects = {};
+    CONFIG.lead_dropdowns.forEach(([key, placeholder]) => {
+      selects[key] = body.appendChild(makeSelect(placeholder, options[placeholder] || [], false));
+    });
+    CONFIG.lead_search_dropdowns.forEach(([key, placeholder]) => {
+      const values = key === "city"
+        ? () => CONFIG.cities[selects.country ? selects.country.dataset.value : ""] || []
+        : options[placeholder] || [];
+      selects[key] = body.appendChild(makeSelect(placeholder, values, true));
+    });
+    otherInputs.forEach(([attrs, key]) => { fields[key] = body.appendChild(h(`<input ${attrs}>`)); });
+    const picker = body.appendChild(makePicker("date", "Date"));
+
+    const drawer = openDrawer("Add lead", body, async () => {
+      const payload = {};
+      Object.entries(fields).forEach(([key, input]) => { payload[key] = input.value; });
+      Object.entries(selects).forEach(([key, select]) => { payload[key] = select.dataset.value; });
+      payload.date = picker.querySelector("input").value;
+      const result = await api("POST", CONFIG.api.leads, payload);
+      if (result.ok) {
+        closeDrawer(drawer);
+        toast("Created lead successfully");
+        renderRecordList("leads", list);
+      } else {
+        toast("Create lead failed");
+      }
+    });
+  }
+
+  function renderOpportunityPage() {
+    content().innerHTML = "";
+    const page = h(`
+      <div class="opportunity-page">
+        <div class="toolbar"><button type="button" class="add">Add opportunity</button></div>
+        <ul class="record-list"></ul>
+      </div>`);
+    const list = page.querySelector(".record-list");
+    page.querySelector(".add").addEventListener("click", () => openOpportunityDrawer(list));
+    content().appendChild(page);
+    renderRecordList("opportunities", list);
+  }
+
+  function openCompanyDrawer(input) {
+    const body = h(`<ul class="ant-list-items">${CONFIG.companies.map((c) => `<div class="flex cursor-pointer">${escapeHtml(c)}</div>`).join("")}</ul>`);
+    const drawer = openDrawer("Select company", body, null);
+    body.addEventListener("click", (event) => {
+      const item = event.target.closest("div.cursor-pointer");
+      if (!item) return;
+      input.value = item.textContent;
+      closeDrawer(drawer);
+    });
+  }
+
+  function openContactDrawer(select) {
+    const body = h(`<ul class="ant-list-items">${CONFIG.contacts.map((c) => `<li><label><input type="checkbox" value="${escapeHtml(c)}"> ${escapeHtml(c)}</label></li>`).join("")}</ul>`);
+    const drawer = openDrawer("Select contact", body, () => {
+      const checked = Array.from(body.querySelectorAll("input:checked")).map((el) => el.value);
+      if (checked.length) setSelectValue(select, checked.join(", "));
+      closeDrawer(drawer);
+    });
+  }
+
+  function openOpportunityDrawer(list) {
+    const body = h('<div class="opportunity-form"></div>');
+    const externalId = body.appendChild(h('<input aria-label="External ID" name="external_id">'));
+    const name = body.appendChild(h('<input aria-label="Name" name="name">'));
+    const company = body.appendChild(h('<input placeholder="Company" name="company" readonly>'));
+    company.addEventListener("click", () => openCompanyDrawer(company));
+    const contact = body.appendChild(h(`
+      <div class="ant-select">
+        <div class="ant-select-selector"><span class="ant-select-selection-placeholder">Contact name</span></div>
+      </div>`));
+    contact.dataset.value = "";
+    contact.addEventListener("click", () => openContactDrawer(contact));
+    const opened = body.appendChild(makePicker("date_opened", "Date opened"));
+    const closed = body.appendChild(makePicker("date_closed", "Date closed"));
+
+    const drawer = openDrawer("Add opportunity", body, async () => {
+      const result = await api("POST", CONFIG.api.opportunities, {
+        external_id: externalId.value,
+        name: name.value,
+        company: company.value,
+        contact: contact.dataset.value,
+        date_opened: opened.querySelector("input").value,
+        date_closed: closed.querySelector("input").value,
+      });
+      if (result.ok) {
+        closeDrawer(drawer);
+        toast("Created opportunity successfully");
+        renderRecordList("opportunities", list);
+      } else {
+        toast("Create opportunity failed");
+      }
+    });
+  }
+
+  // ---------- Boot ----------
+
+  api("GET", CONFIG.api.me).then((result) => (result.ok ? renderApp() : renderLogin()));
+})();
@@ -0,0 +1,317 @@
+import argparse
+import asyncio
+import csv
+import importlib
+import json
+import random
+import sys
+import time
+from dataclasses import asdict, fields
+from datetime import date, timedelta
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional, Union
+from credentials import MOGA_STG_URL
+from journal import ResultJournal
+from moga_standin import STANDIN_CITIES, STANDIN_OPTIONS
+from records import CATALOG_FILE, LEAD_DROPDOWNS, LEAD_SEARCH_DROPDOWNS, LeadRecord, OpportunityRecord, Record
+from waits import DROPDOWN_SELECTOR
+
+DEFAULT_BATCH_SIZE = 10000
+# Modulo của hoán vị dùng cho số điện thoại: mỗi tag có 10^9 số khác nhau
+PHONE_SPACE = 10 ** 9
+# Ngày của record rải trong một năm trở lại đây; opportunity đóng sau khi mở tối đa MAX_DEAL_DAYS ngày
+DATE_SPAN_DAYS = 365
+MAX_DEAL_DAYS = 90
+
+FIRST_NAMES = ["An", "Bình", "Chi", "Dũng", "Giang", "Hà", "Hùng", "Lan", "Linh", "Minh", "Nam", "Phương", "Quân", "Thảo", "Trang", "Tuấn", "Vy", "Yến"]
+LAST_NAMES = ["Nguyễn", "Trần", "Lê", "Phạm", "Hoàng", "Huỳnh", "Phan", "Vũ", "Võ", "Đặng", "Bùi", "Đỗ", "Lý"]
+COMPANY_WORDS = ["Sao Mai", "Hoa Sen", "Thiên Long", "Phú Gia", "Minh Phát", "An Khang", "Việt Tiến", "Hưng Thịnh", "Nam Á", "Đại Dương"]
+JOB_TITLES = ["Sales Manager", "CEO", "CTO", "Marketing Lead", "Purchasing Officer", "Accountant", "Engineer", "Consultant"]
+STREETS = ["Lê Lợi", "Nguyễn Huệ", "Trần Hưng Đạo", "Hai Bà Trưng", "Điện Biên Phủ", "Pasteur", "Cách Mạng Tháng 8"]
+
+# Quét hết option của dropdown đang mở, kể cả danh sách ảo (rc-virtual-list) chỉ render một phần
+_HARVEST_OPTIONS_JS = """
+async (dropdownSelector) => {
+    const dropdowns = Array.from(document.querySelectorAll(dropdownSelector)).filter(el => el.getClientRects().length > 0);
+    if (!dropdowns.length) return [];
+    const dropdown = dropdowns[dropdowns.length - 1];
+    const titles = new Set();
+    const collect = () => dropdown.querySelectorAll('.ant-select-item-option').forEach(option => {
+        titles.add(option.getAttribute('title') || option.textContent.trim());
+    });
+    collect();
+    const holder = dropdown.querySelector('.rc-virtual-list-holder');
+    if (holder) {
+        for (let top = holder.clientHeight; top < holder.scrollHeight; top += holder.clientHeight) {
+            holder.scrollTop = top;
+            await new Promise(resolve => requestAnimationFrame(() => requestAnimationFrame(resolve)));
+            collect();
+        }
+        holder.scrollTop = 0;
+    }
+    return Array.from(titles).filter(Boolean);
+}
+"""
+
+lead_module = importlib.import_module("01_login_success_test_optimized")
+opti_module = importlib.import_module("02_opti")
+
+# placeholder -> option; riêng City là country -> các thành phố của country đó
+Catalog = Dict[str, Any]
+COUNTRY_PLACEHOLDER = LEAD_SEARCH_DROPDOWNS["country"]
+CITY_PLACEHOLDER = LEAD_SEARCH_DROPDOWNS["city"]
+
+
+def key_prefix(kind: str, tag: str) -> str:
+    """Phần đầu chung của key (email lead / external_id opportunity) mọi record sinh với `tag`"""
+    return f"lead.{tag}." if kind == "lead" else f"SYN-{tag}-"
+
+
+def required_placeholders() -> List[str]:
+    return list(LEAD_DROPDOWNS.values()) + list(LEAD_SEARCH_DROPDOWNS.values())
+
+
+def standin_catalog() -> Catalog:
+    return {**STANDIN_OPTIONS, CITY_PLACEHOLDER: STANDIN_CITIES}
+
+
+def load_catalog(path: Optional[Path] = None, standin: bool = False) -> Catalog:
+    """Giá trị dropdown hợp lệ theo placeholder, thu thập từ DOM thật (`harvest`).
+    Danh sách của stand-in chỉ dùng khi standin=True: option bịa không được gửi lên CRM thật"""
+    if standin and path is None:
+        return standin_catalog()
+    path = Path(path) if path else CATALOG_FILE
+    if not path.exists():
+        raise FileNotFoundError(
+            f"Dropdown catalog {path} not found; run `python synthetic.py harvest` or pass --catalog"
+        )
+    catalog = json.loads(path.read_text(encoding="utf-8"))
+    missing = [p for p in required_placeholders() if not catalog.get(p)]
+    if missing:
+        raise ValueError(f"Dropdown catalog {path} has no values for: {', '.join(missing)}")
+    cities = catalog[CITY_PLACEHOLDER]
+    if not isinstance(cities, dict):
+        raise ValueError(f"Dropdown catalog {path}: {CITY_PLACEHOLDER} must map country -> cities, re-run harvest")
+    if not any(cities.get(country) for country in catalog[COUNTRY_PLACEHOLDER]):
+        raise ValueError(f"Dropdown catalog {path} has no {CITY_PLACEHOLDER} values for any country")
+    return catalog
+
+
+async def harvest_catalog(automation) -> Catalog:
+    """Mở từng dropdown trong drawer add lead đang mở và đọc các option thật.
+    City phụ thuộc Country nên được đọc lại sau khi chọn từng country"""
+    if automation.page is None:
+        raise RuntimeError("Page not initialized")
+    catalog: Catalog = {}
+    for placeholder in required_placeholders():
+        if placeholder == CITY_PLACEHOLDER:
+            continue
+        catalog[placeholder] = await _harvest_options(automation, placeholder)
+        print(f"{placeholder}: {len(catalog[placeholder])} giá trị")
+    cities: Dict[str, List[str]] = {}
+    for country in catalog[COUNTRY_PLACEHOLDER]:
+        await automation.select_dropdown_with_search(COUNTRY_PLACEHOLDER, country)
+        cities[country] = await _harvest_options(automation, CITY_PLACEHOLDER)
+        print(f"{CITY_PLACEHOLDER} ({country}): {len(cities[country])} giá trị")
+    catalog[CITY_PLACEHOLDER] = cities
+    return catalog
+
+
+async def _harvest_options(automation, placeholder: str) -> List[str]:
+    await automation._select_locator(placeholder).click()
+    await automation.waits.dropdown_open()
+    await automation.waits.options_ready()
+    options = await automation.page.evaluate(_HARVEST_OPTIONS_JS, DROPDOWN_SELECTOR)
+    await automation.page.keyboard.press("Escape")
+    return options
+
+
+class RecordGenerator:
+    """Sinh record lead/opportunity hợp lệ, xác định theo seed; key (email / external_id) chứa cả tag nên không trùng.
+    Số điện thoại chỉ không trùng trong cùng một tag: prefix 3 chữ số nên hai tag có thể chung prefix rồi trùng số"""
+
+    def __init__(self, seed: int = 0, tag: Optional[str] = None, catalog: Optional[Catalog] = None):
+        self.seed = seed
+        # Tag nằm trong mọi field unique; chạy lại trên cùng staging thì đổi tag (hoặc seed)
+        self.tag = tag or f"s{seed:x}"
+        self.catalog = catalog if catalog is not None else load_catalog()
+        digest = sum(ord(c) * 31 ** i for i, c in enumerate(self.tag))
+        self._phone_prefix = f"{digest % 1000:03d}"
+        # Hoán vị affine trên [0, PHONE_SPACE): hệ số lẻ, không chia hết cho 5 -> song ánh
+        rng = random.Random(f"{self.tag}:phone")
+        self._phone_mul = rng.randrange(1, PHONE_SPACE // 10) * 10 + rng.choice((1, 3, 7, 9))
+        self._phone_add = rng.randrange(PHONE_SPACE)
+        self._today = date.today()
+
+    def _day(self, days_ago: int) -> str:
+        return (self._today - timedelta(days=days_ago)).isoformat()
+
+    def phone(self, index: int) -> str:
+        """Số điện thoại thứ `index`: song ánh trong một tag, không đảm bảo khác số của tag khác"""
+        return f"+84{self._phone_prefix}{(self._phone_mul * index + self._phone_add) % PHONE_SPACE:09d}"
+
+    def lead_batch(self, start: int, size: int) -> List[LeadRecord]:
+        """Sinh `size` lead bắt đầu từ số thứ tự `start`; mỗi batch có RNG riêng nên sinh được bất kỳ đoạn nào"""
+        rng = random.Random(f"{self.seed}:lead:{start}")
+        choices = {
+            field: rng.choices(self.catalog[placeholder], k=size)
+            for field, placeholder in {**LEAD_DROPDOWNS, **LEAD_SEARCH_DROPDOWNS}.items()
+            if placeholder != CITY_PLACEHOLDER
+        }
+        # City lấy trong danh sách của country đã chọn (country không có city nào thì để trống)
+        cities = self.catalog[CITY_PLACEHOLDER]
+        choices["city"] = [
+            rng.choice(cities[country]) if cities.get(country) else ""
+            for country in choices["country"]
+        ]
+        first = rng.choices(FIRST_NAMES, k=size)
+        last = rng.choices(LAST_NAMES, k=size)
+        company = rng.choices(COMPANY_WORDS, k=size)
+        titles = rng.choices(JOB_TITLES, k=size)
+        streets = rng.choices(STREETS, k=size)
+        numbers = rng.choices(range(1, 1000), k=size)
+        days = rng.choices(range(DATE_SPAN_DAYS), k=size)
+        tag = self.tag
+        lead_prefix = key_prefix("lead", tag)
+        batch = []
+        for j in range(size):
+            i = start + j
+            batch.append(LeadRecord(
+                account_name=f"{company[j]} {tag}-{i}",
+                contact_name=f"{last[j]} {first[j]}",
+                phone=self.phone(i),
+                email=f"{lead_prefix}{i}@example.com",
+                job_title=titles[j],
+                gender=choices["gender"][j],
+                industry=choices["industry"][j],
+                source=choices["source"][j],
+                status=choices["status"][j],
+                segmentation=choices["segmentation"][j],
+                lead_label=choices["lead_label"][j],
+                pick_list=choices["pick_list"][j],
+                country=choices["country"][j],
+                city=choices["city"][j],
+                tax_id=f"TAX-{tag}-{i}",
+                address=f"{numbers[j]} {streets[j]}",
+                text=f"synthetic {tag}",
+                link=f"https://example.com/{tag}/{i}",
+                number=str(numbers[j]),
+                date=self._day(days[j]),
+            ))
+        return batch
+
+    def opportunity_batch(self, start: int, size: int) -> List[OpportunityRecord]:
+        rng = random.Random(f"{self.seed}:opportunity:{start}")
+        company = rng.choices(COMPANY_WORDS, k=size)
+        opened = rng.choices(range(DATE_SPAN_DAYS), k=size)
+        spans = rng.choices(range(MAX_DEAL_DAYS + 1), k=size)
+        tag = self.tag
+        opportunity_prefix = key_prefix("opportunity", tag)
+        batch = []
+        for j in range(size):
+            i = start + j
+            batch.append(OpportunityRecord(
+                external_id=f"{opportunity_prefix}{i:08d}",
+                name=f"{company[j]} deal {tag}-{i}",
+                date_opened=self._day(opened[j]),
+                date_closed=self._day(opened[j] - spans[j]),
+            ))
+        return batch
+
+    def iter_records(self, kind: str, count: int, start: int = 0, batch_size: int = DEFAULT_BATCH_SIZE) -> Iterator[Record]:
+        """Stream `count` record; bộ nhớ chỉ giữ một batch"""
+        make_batch = {"lead": self.lead_batch, "opportunity": self.opportunity_batch}[kind]
+        end = start + count
+        for batch_start in range(start, end, batch_size):
+            yield from make_batch(batch_start, min(batch_size, end - batch_start))
+
+
+def write_records(records: Iterator[Record], path: Union[str, Path]) -> int:
+    """Ghi record ra CSV/JSONL theo kiểu streaming (đọc lại được bằng records.iter_records)"""
+    path = Path(path)
+    count = 0
+    with path.open("w", encoding="utf-8", newline="") as f:
+        if path.suffix.lower() == ".csv":
+            writer = None
+            for count, record in enumerate(records, 1):
+                row = asdict(record)
+                if writer is None:
+                    writer = csv.DictWriter(f, fieldnames=[field.name for field in fields(record)])
+                    writer.writeheader()
+                writer.writerow(row)
+        else:
+            for count, record in enumerate(records, 1):
+                f.write(json.dumps(asdict(record), ensure_ascii=False) + "\n")
+    return count
+
+
+async def run_synthetic(kind: str, generator: RecordGenerator, count: int, start: int, url: str):
+    """Đăng nhập rồi tạo record sinh ra trực tiếp, không qua file; chạy lại cùng seed/tag sẽ bỏ qua record đã tạo"""
+    module = lead_module if kind == "lead" else opti_module
+    with ResultJournal(target=url) as journal:
+        await _create_synthetic(module, kind, generator, count, start, url, journal)
+
+
+async def _create_synthetic(module, kind: str, generator: RecordGenerator, count: int, start: int, url: str, journal: ResultJournal):
+    async with module.MOGAWebAutomation(headless=False, memory_limits=module.MemoryLimits(), journal=journal) as automation:
+        await automation.navigate_to_url(url)
+        await automation.login_success()
+        records = generator.iter_records(kind, count, start)
+        if kind == "lead":
+            await automation.access_lead_section()
+            await automation.change_list_view()
+            await automation.create_leads(records, count)
+        else:
+            await automation.access_opti_section()
+            await automation.create_opportunities(records, count)
+
+
+async def run_harvest(url: str, output: Path):
+    async with lead_module.MOGAWebAutomation(headless=True) as automation:
+        await automation.navigate_to_url(url)
+        await automation.login_success()
+        await automation.access_lead_section()
+        await automation.change_list_view()
+        await automation.add_new_lead()
+        catalog = await harvest_catalog(automation)
+    output.write_text(json.dumps(catalog, ensure_ascii=False, indent=2), encoding="utf-8")
+    print(f"Đã ghi catalog dropdown vào {output}")
+
+
+def main():
+    """Sinh record lead/opportunity giả lập theo seed"""
+    parser = argparse.ArgumentParser(description="Sinh dữ liệu lead/opportunity giả lập, không trùng key")
+    sub = parser.add_subparsers(dest="command", required=True)
+    for name in ("generate", "run"):
+        cmd = sub.add_parser(name, help="Ghi ra file" if name == "generate" else "Tạo trực tiếp trên CRM")
+        cmd.add_argument("kind", choices=("lead", "opportunity"))
+        cmd.add_argument("--count", type=int, default=100)
+        cmd.add_argument("--start", type=int, default=0, help="Số thứ tự bắt đầu (để chia nhiều đoạn)")
+        cmd.add_argument("--seed", type=int, default=0)
+        cmd.add_argument("--tag", help="Tiền tố cho field unique (mặc định dựng từ seed)")
+        cmd.add_argument("--catalog", type=Path, help=f"File catalog dropdown (mặc định {CATALOG_FILE.name})")
+        cmd.add_argument("--standin", action="store_true", help="Dùng giá trị dropdown của stand-in (chỉ để chạy trên stand-in)")
+        if name == "generate":
+            cmd.add_argument("--out", type=Path, required=True, help="File .jsonl hoặc .csv")
+        else:
+            cmd.add_argument("--url", default=MOGA_STG_URL)
+    harvest = sub.add_parser("harvest", help="Thu thập giá trị dropdown thật từ form Lead")
+    harvest.add_argument("--url", default=MOGA_STG_URL)
+    harvest.add_argument("--out", type=Path, default=CATALOG_FILE)
+    args = parser.parse_args()
+
+    if args.command == "harvest":
+        asyncio.run(run_harvest(args.url, args.out))
+        return
+    generator = RecordGenerator(args.seed, args.tag, load_catalog(args.catalog, standin=args.standin))
+    if args.command == "generate":
+        started = time.perf_counter()
+        count = write_records(generator.iter_records(args.kind, args.count, args.start), args.out)
+        elapsed = time.perf_counter() - started
+        print(f"Đã sinh {count} {args.kind} vào {args.out} trong {elapsed:.1f}s ({count / elapsed:.0f} record/s)", file=sys.stderr)
+    else:
+        asyncio.run(run_synthetic(args.kind, generator, args.count, args.start, args.url))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,270 @@
+import argparse
+import asyncio
+import signal
+import time
+from dataclasses import dataclass
+from itertools import islice
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Set
+from playwright.async_api import APIRequestContext, async_playwright
+from credentials import MOGA_STG_URL
+from endpoints import StepResponseError
+from fast_path import CREATE_PATHS, RETRY_STATUSES, SessionExpiredError, new_api_context
+from journal import ResultJournal
+from records import KEY_FIELDS
+from session import SessionCache
+from synthetic import key_prefix
+
+
+@dataclass(frozen=True)
+class TeardownTarget:
+    kind: str
+    key: str
+    record_id: str
+
+
+@dataclass
+class TeardownStats:
+    deleted: int = 0
+    missing: int = 0
+    failed: int = 0
+    elapsed: float = 0.0
+
+    def report(self) -> str:
+        done = self.deleted + self.missing
+        rate = done / self.elapsed if self.elapsed else 0.0
+        return (
+            f"Teardown: xoá {self.deleted}, đã mất sẵn {self.missing}, lỗi {self.failed} "
+            f"trong {self.elapsed:.1f}s ({rate:.1f} record/s)"
+        )
+
+
+class RateLimiter:
+    """Token bucket: trung bình tối đa `rate` request/giây, dồn được `burst` request"""
+
+    def __init__(self, rate: float, burst: Optional[int] = None):
+        self.rate = rate
+        self.capacity = burst or max(1, int(rate))
+        self.tokens = float(self.capacity)
+        self.updated = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    async def acquire(self):
+        if self.rate <= 0:
+            return
+        async with self._lock:
+            while True:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                await asyncio.sleep((1 - self.tokens) / self.rate)
+
+    def pause(self, seconds: float):
+        """Backend báo quá tải (429): không cấp token nào trong `seconds` giây"""
+        if self.rate > 0:
+            self.tokens = min(self.tokens, 0.0) - seconds * self.rate
+
+
+def _batched(items: Iterable[TeardownTarget], size: int) -> Iterator[List[TeardownTarget]]:
+    iterator = iter(items)
+    while batch := list(islice(iterator, size)):
+        yield batch
+
+
+def _list_items(payload: Any) -> List[Dict[str, Any]]:
+    """Danh sách record trong body của API list: [...], {"data": [...]} hoặc {"data": {"items": [...]}}"""
+    if isinstance(payload, list):
+        return payload
+    if isinstance(payload, dict):
+        for key in ("data", "items", "results", "records"):
+            if key in payload:
+                return _list_items(payload[key])
+    return []
+
+
+def journal_targets(journal: ResultJournal, kind: str, run_id: str) -> List[TeardownTarget]:
+    """Record một lần chạy đã tạo (theo run_id trong journal) và chưa bị xoá"""
+    return [TeardownTarget(kind, key, record_id) for _, key, record_id in journal.created_ids(kind, run_id) if record_id]
+
+
+async def tagged_targets(api: APIRequestContext, kind: str, tag: str, page_size: int = 200) -> List[TeardownTarget]:
+    """Tìm record sinh bởi synthetic.py với `tag` qua API list (lọc lại theo tiền tố key ở phía client)"""
+    prefix = key_prefix(kind, tag)
+    field = KEY_FIELDS[kind]
+    targets: Dict[str, TeardownTarget] = {}
+    seen_ids: Set[str] = set()
+    page = 1
+    while True:
+        response = await api.get(CREATE_PATHS[kind], params={"search": prefix, "page": page, "limit": page_size})
+        try:
+            if response.status == 401:
+                raise SessionExpiredError(f"GET {CREATE_PATHS[kind]} returned 401")
+            if not response.ok:
+                raise StepResponseError(f"GET {CREATE_PATHS[kind]} returned {response.status}")
+            items = _list_items(await response.json())
+        finally:
+            await response.dispose()
+        page_ids = {str(item.get("id", item.get("_id"))) for item in items}
+        repeated = bool(page_ids) and page_ids <= seen_ids
+        seen_ids |= page_ids
+        for item in items:
+            key = str(item.get(field) or "")
+            record_id = item.get("id", item.get("_id"))
+            if key.startswith(prefix) and record_id is not None:
+                targets.setdefault(str(record_id), TeardownTarget(kind, key, str(record_id)))
+        # Hết trang, hoặc API bỏ qua tham số phân trang và trả lại đúng những record đã thấy.
+        # Trang không có record nào khớp tiền tố vẫn đọc tiếp: API có thể không lọc theo search
+        if len(items) < page_size or repeated:
+            break
+        page += 1
+    return list(targets.values())
+
+
+class Teardown:
+    """Xoá record qua API: song song trong từng batch, giới hạn tốc độ, dừng được giữa chừng.
+    404 coi như đã xoá nên chạy lại bao nhiêu lần cũng an toàn"""
+
+    def __init__(
+        self,
+        api: APIRequestContext,
+        concurrency: int = 8,
+        rate: float = 20.0,
+        batch_size: int = 100,
+        journal: Optional[ResultJournal] = None,
+        max_retries: int = 3,
+    ):
+        self.api = api
+        self.concurrency = concurrency
+        self.limiter = RateLimiter(rate)
+        self.batch_size = batch_size
+        self.journal = journal
+        self.max_retries = max_retries
+        self.stats = TeardownStats()
+        self.stopping = False
+
+    def stop(self):
+        """Dừng sau batch đang chạy"""
+        if not self.stopping:
+            print("Đang dừng teardown sau batch hiện tại...")
+        self.stopping = True
+
+    async def delete(self, target: TeardownTarget) -> str:
+        """Xoá một record; trả về "deleted" hoặc "missing" (404/410, đã xoá từ trước)"""
+        path = f"{CREATE_PATHS[target.kind]}/{target.record_id}"
+        for attempt in range(self.max_retries + 1):
+            await self.limiter.acquire()
+            response = await self.api.delete(path)
+            try:
+                if response.status == 401:
+                    raise SessionExpiredError(f"DELETE {path} returned 401")
+                if response.ok:
+                    return "deleted"
+                if response.status in (404, 410):
+                    return "missing"
+                if response.status not in RETRY_STATUSES or attempt >= self.max_retries:
+                    raise StepResponseError(f"DELETE {path} returned {response.status}")
+                retry_after = response.headers.get("retry-after", "")
+                self.limiter.pause(float(retry_after) if retry_after.isdigit() else 2 ** attempt)
+            finally:
+                await response.dispose()
+        raise StepResponseError(f"DELETE {path} failed")
+
+    async def _delete_one(self, target: TeardownTarget, semaphore: asyncio.Semaphore):
+        async with semaphore:
+            started = time.perf_counter()
+            try:
+                outcome = await self.delete(target)
+            except SessionExpiredError:
+                raise
+            except Exception as e:
+                self.stats.failed += 1
+                print(f"Lỗi xoá {target.kind} {target.key} ({target.record_id}): {e}")
+                return
+            if outcome == "deleted":
+                self.stats.deleted += 1
+            else:
+                self.stats.missing += 1
+            if self.journal:
+                self.journal.record(target.kind, target.key, target.record_id, "deleted", (time.perf_counter() - started) * 1000)
+
+    async def run(self, targets: Iterable[TeardownTarget], total: Optional[int] = None) -> TeardownStats:
+        semaphore = asyncio.Semaphore(self.concurrency)
+        started = time.perf_counter()
+        try:
+            for batch in _batched(targets, self.batch_size):
+                if self.stopping:
+                    break
+                # Chờ hết các lần xoá trong batch rồi mới ném lỗi (vd: SessionExpiredError), không bỏ dở task nào
+                results = await asyncio.gather(
+                    *(self._delete_one(target, semaphore) for target in batch), return_exceptions=True,
+                )
+                errors = [r for r in results if isinstance(r, BaseException)]
+                if errors:
+                    raise errors[0]
+                if self.journal:
+                    self.journal.flush()
+                done = self.stats.deleted + self.stats.missing + self.stats.failed
+                print(f"Đã xử lý {done}/{total or '?'} ({self.stats.deleted} xoá, {self.stats.failed} lỗi)")
+        finally:
+            self.stats.elapsed = time.perf_counter() - started
+        return self.stats
+
+
+async def run_teardown(args: argparse.Namespace) -> TeardownStats:
+    kinds = ("lead", "opportunity") if args.kind == "all" else (args.kind,)
+    session = SessionCache(base_url=args.url)
+    stats = TeardownStats()
+    async with async_playwright() as playwright:
+        browser = None
+        if not session.is_fresh():
+            browser = await playwright.chromium.launch(headless=True, channel="chrome")
+        try:
+            state = await session.get_state(browser)
+        finally:
+            if browser:
+                await browser.close()
+        api = await new_api_context(playwright, args.url, state)
+        try:
+            with ResultJournal(target=args.url) as journal:
+                targets: List[TeardownTarget] = []
+                for kind in kinds:
+                    if args.run_id:
+                        targets += journal_targets(journal, kind, args.run_id)
+                    else:
+                        targets += await tagged_targets(api, kind, args.tag)
+                print(f"Tìm thấy {len(targets)} record cần xoá")
+                if args.dry_run or not targets:
+                    return stats
+                teardown = Teardown(api, args.concurrency, args.rate, args.batch_size, journal)
+                loop = asyncio.get_running_loop()
+                loop.add_signal_handler(signal.SIGINT, teardown.stop)
+                try:
+                    stats = await teardown.run(targets, len(targets))
+                finally:
+                    loop.remove_signal_handler(signal.SIGINT)
+        finally:
+            await api.dispose()
+    print(stats.report())
+    return stats
+
+
+def main():
+    """Xoá các record do automation tạo (theo run_id trong journal hoặc theo tag của synthetic.py)"""
+    parser = argparse.ArgumentParser(description="Dọn lead/opportunity do các lần chạy automation tạo ra")
+    parser.add_argument("kind", choices=("lead", "opportunity", "all"))
+    source = parser.add_mutually_exclusive_group(required=True)
+    source.add_argument("--run-id", help="Xoá record mà run này đã ghi vào journal")
+    source.add_argument("--tag", help="Xoá record sinh bởi synthetic.py với tag này")
+    parser.add_argument("--url", default=MOGA_STG_URL)
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--rate", type=float, default=20.0, help="Số request xoá tối đa mỗi giây (0 = không giới hạn)")
+    parser.add_argument("--batch-size", type=int, default=100)
+    parser.add_argument("--dry-run", action="store_true", help="Chỉ đếm record sẽ bị xoá")
+    args = parser.parse_args()
+    asyncio.run(run_teardown(args))
+
+
+if __name__ == "__main__":
+    main()
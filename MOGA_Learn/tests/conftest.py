@@ -0,0 +1,28 @@
+import sys
+from pathlib import Path
+
+import pytest
+
+# Module của project nằm phẳng trong thư mục cha (chạy script trực tiếp, không phải package)
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from credentials import PASSWORD, USERNAME  # noqa: E402
+from endpoints import AUTH_PATH  # noqa: E402
+from moga_standin import StandinServer  # noqa: E402
+
+
+@pytest.fixture
+def standin():
+    server = StandinServer()
+    server.start_in_background()
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+async def login_api(playwright, base_url: str):
+    """APIRequestContext đã đăng nhập stand-in (cookie session giữ trong context)"""
+    api = await playwright.request.new_context(base_url=base_url)
+    response = await api.post(AUTH_PATH, data={"email": USERNAME, "password": PASSWORD})
+    assert response.ok
+    return api
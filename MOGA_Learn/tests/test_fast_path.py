@@ -0,0 +1,65 @@
+import asyncio
+from dataclasses import asdict
+
+import pytest
+from playwright.async_api import async_playwright
+
+from conftest import login_api
+from fast_path import FastPathCreator, PayloadMismatchError, PayloadTemplate, SessionExpiredError
+from synthetic import RecordGenerator, load_catalog
+
+
+@pytest.fixture
+def leads():
+    return RecordGenerator(seed=1, tag="fp", catalog=load_catalog(standin=True)).lead_batch(0, 3)
+
+
+def test_template_maps_renamed_keys_and_keeps_constants(leads):
+    first, second = leads[0], leads[1]
+    sent = {("accountName" if k == "account_name" else k): v for k, v in asdict(first).items()}
+    sent["owner_id"] = 7
+    template = PayloadTemplate.from_form(first, sent)
+    payload = template.build(second)
+    assert payload["accountName"] == second.account_name
+    assert payload["email"] == second.email
+    assert payload["owner_id"] == 7
+
+
+def test_template_rejects_transformed_values(leads):
+    sent = asdict(leads[0])
+    sent["date"] = sent["date"].replace("-", "/")
+    with pytest.raises(PayloadMismatchError):
+        PayloadTemplate.from_form(leads[0], sent)
+
+
+def test_create_via_api_against_standin(standin, leads):
+    async def scenario():
+        async with async_playwright() as playwright:
+            api = await login_api(playwright, standin.url)
+            creator = FastPathCreator(None, "lead", "", standin.url)
+            creator.api = api
+            creator.template = PayloadTemplate.from_form(leads[0], asdict(leads[0]))
+            try:
+                return [await creator.create_via_api(record) for record in leads]
+            finally:
+                await creator.close()
+
+    ids = asyncio.run(scenario())
+    stored = {record["id"]: record for record in standin.list_records("lead")}
+    assert set(ids) == set(stored)
+    assert sorted(record["email"] for record in stored.values()) == sorted(lead.email for lead in leads)
+
+
+def test_expired_session_aborts(standin, leads):
+    async def scenario():
+        async with async_playwright() as playwright:
+            creator = FastPathCreator(None, "lead", "", standin.url)
+            creator.api = await playwright.request.new_context(base_url=standin.url)
+            creator.template = PayloadTemplate.from_form(leads[0], asdict(leads[0]))
+            try:
+                await creator.create_via_api(leads[0])
+            finally:
+                await creator.close()
+
+    with pytest.raises(SessionExpiredError):
+        asyncio.run(scenario())
@@ -0,0 +1,24 @@
+from journal import ResultJournal
+
+
+def test_is_done_only_counts_earlier_runs_and_respects_teardown(tmp_path):
+    path = tmp_path / "journal.sqlite"
+    with ResultJournal(path, target="http://standin/", run_id="r1") as journal:
+        journal.record("lead", "a@x.com", "1")
+        # Dòng của run hiện tại không làm record bị bỏ qua
+        assert not journal.is_done("lead", "a@x.com")
+    with ResultJournal(path, target="http://standin", run_id="r2") as journal:
+        assert journal.is_done("lead", "a@x.com")
+        assert not journal.is_done("opportunity", "a@x.com")
+        journal.record("lead", "a@x.com", "1", "deleted")
+        journal.flush()
+        assert not journal.is_done("lead", "a@x.com")
+
+
+def test_journal_is_scoped_by_target(tmp_path):
+    path = tmp_path / "journal.sqlite"
+    with ResultJournal(path, target="http://standin", run_id="r1") as journal:
+        journal.record("lead", "a@x.com", "1")
+    with ResultJournal(path, target="https://staging", run_id="r2") as journal:
+        assert not journal.is_done("lead", "a@x.com")
+        assert journal.created_ids() == []
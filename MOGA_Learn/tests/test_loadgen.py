@@ -0,0 +1,24 @@
+from loadgen import LoadProfile, endpoint_key
+
+
+def test_profile_ramps_up_holds_and_ramps_down():
+    profile = LoadProfile(users=10, ramp_up=10, hold=20, ramp_down=5)
+    assert profile.duration == 35
+    assert profile.target(-1) == 0
+    assert profile.target(0) == 1
+    assert profile.target(5) == 5
+    assert profile.target(10) == 10
+    assert profile.target(29.9) == 10
+    assert profile.target(32.5) == 5
+    assert profile.target(35) == 0
+
+
+def test_profile_without_ramp_down_stops_after_hold():
+    profile = LoadProfile(users=4, ramp_up=2, hold=3, ramp_down=0)
+    assert profile.target(4.9) == 4
+    assert profile.target(5) == 0
+
+
+def test_endpoint_key_groups_ids():
+    assert endpoint_key("DELETE", "http://x/api/leads/123") == "DELETE /api/leads/:id"
+    assert endpoint_key("GET", "http://x/api/leads?page=2") == "GET /api/leads"
@@ -0,0 +1,77 @@
+import pytest
+
+from records import RecordValidationError, iter_records, validate_file
+
+HEADER = "account_name,contact_name,email\n"
+
+
+def write(tmp_path, text, name="leads.csv"):
+    path = tmp_path / name
+    path.write_text(text, encoding="utf-8")
+    return path
+
+
+def test_valid_file_counts_records(tmp_path):
+    path = write(tmp_path, HEADER + "A,B,a@x.com\nC,D,c@x.com\n")
+    assert validate_file(path, "lead") == 2
+    assert [r.key for r in iter_records(path, "lead")] == ["a@x.com", "c@x.com"]
+
+
+def test_missing_and_duplicate_keys_are_reported(tmp_path):
+    path = write(tmp_path, HEADER + "A,B,a@x.com\nA,B,\nA,B,a@x.com\n")
+    with pytest.raises(RecordValidationError) as info:
+        validate_file(path, "lead")
+    assert info.value.errors == [
+        (3, "email is required (record key)"),
+        (4, "duplicate email 'a@x.com'"),
+    ]
+
+
+def test_extra_cells_and_unknown_columns(tmp_path):
+    path = write(tmp_path, HEADER + "A,B,a@x.com,extra\n")
+    with pytest.raises(RecordValidationError) as info:
+        validate_file(path, "lead")
+    assert "too many columns" in info.value.errors[0][1]
+
+    path = write(tmp_path, HEADER.rstrip("\n") + ",nickname\nA,B,a@x.com,n\n", "unknown.csv")
+    with pytest.raises(RecordValidationError) as info:
+        validate_file(path, "lead")
+    assert info.value.errors == [(2, "unknown columns: nickname")]
+
+
+def test_opportunity_dates_are_checked(tmp_path):
+    path = write(
+        tmp_path,
+        '{"external_id": "X-1", "name": "Deal", "date_opened": "2024-05-02", "date_closed": "2024-05-01"}\n',
+        "opps.jsonl",
+    )
+    with pytest.raises(RecordValidationError) as info:
+        validate_file(path, "opportunity")
+    assert info.value.errors == [(1, "date_closed is before date_opened")]
+
+
+def test_missing_required_column_is_a_file_error(tmp_path):
+    path = write(tmp_path, "account_name,email\nA,a@x.com\n")
+    with pytest.raises(RecordValidationError) as info:
+        validate_file(path, "lead")
+    assert info.value.errors == [(1, "missing required column(s): contact_name")]
+
+
+def test_missing_optional_columns_stay_empty(tmp_path):
+    path = write(tmp_path, HEADER + "A,B,a@x.com\n")
+    record = next(iter_records(path, "lead"))
+    assert record.phone == "" and record.gender == ""
+
+
+def test_dropdown_values_are_checked_against_catalog(tmp_path):
+    catalog = {"Gender": ["Male", "Female"], "Country": ["Vietnam"], "City": {"Vietnam": ["Hanoi"]}}
+    path = write(
+        tmp_path,
+        HEADER.rstrip("\n") + ",gender,country,city\nA,B,a@x.com,Male,Vietnam,Hanoi\nC,D,c@x.com,Robot,Vietnam,Paris\n",
+    )
+    with pytest.raises(RecordValidationError) as info:
+        validate_file(path, "lead", catalog=catalog)
+    assert info.value.errors == [
+        (3, "gender 'Robot' is not an option of Gender"),
+        (3, "city 'Paris' is not an option of City for 'Vietnam'"),
+    ]
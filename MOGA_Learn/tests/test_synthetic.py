@@ -0,0 +1,31 @@
+import pytest
+
+from moga_standin import STANDIN_CITIES
+from records import validate_record
+from synthetic import RecordGenerator, key_prefix, load_catalog
+
+
+def test_catalog_requires_harvest_outside_standin(tmp_path):
+    with pytest.raises(FileNotFoundError):
+        load_catalog(tmp_path / "missing.json")
+    assert load_catalog(standin=True)["City"] == STANDIN_CITIES
+
+
+def test_leads_are_valid_unique_and_cities_match_country():
+    generator = RecordGenerator(seed=3, tag="t1", catalog=load_catalog(standin=True))
+    leads = list(generator.iter_records("lead", 500, batch_size=128))
+    assert len({lead.key for lead in leads}) == 500
+    assert len({lead.phone for lead in leads}) == 500
+    assert all(lead.key.startswith(key_prefix("lead", "t1")) for lead in leads)
+    assert all(lead.city in STANDIN_CITIES[lead.country] for lead in leads)
+    assert not [validate_record("lead", lead) for lead in leads if validate_record("lead", lead)]
+
+
+def test_batches_are_reproducible_and_keys_do_not_depend_on_batching():
+    catalog = load_catalog(standin=True)
+    first = RecordGenerator(seed=5, catalog=catalog)
+    second = RecordGenerator(seed=5, catalog=catalog)
+    assert first.opportunity_batch(10, 5) == second.opportunity_batch(10, 5)
+    whole = [record.key for record in first.iter_records("opportunity", 30)]
+    chunked = [record.key for record in first.iter_records("opportunity", 30, batch_size=7)]
+    assert whole == chunked
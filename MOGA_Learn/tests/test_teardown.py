@@ -0,0 +1,116 @@
+import asyncio
+import time
+
+from playwright.async_api import async_playwright
+
+from conftest import login_api
+from synthetic import key_prefix
+from teardown import RateLimiter, Teardown, TeardownTarget, tagged_targets
+
+
+def test_rate_limiter_spaces_requests_after_burst():
+    async def scenario():
+        limiter = RateLimiter(rate=20, burst=2)
+        started = time.monotonic()
+        for _ in range(6):
+            await limiter.acquire()
+        return time.monotonic() - started
+
+    # 2 token có sẵn, 4 token còn lại cách nhau 1/20 giây
+    assert 0.18 <= asyncio.run(scenario()) < 0.6
+
+
+def test_rate_limiter_pause_blocks_new_tokens():
+    async def scenario():
+        limiter = RateLimiter(rate=50)
+        limiter.pause(0.2)
+        started = time.monotonic()
+        await limiter.acquire()
+        return time.monotonic() - started
+
+    assert asyncio.run(scenario()) >= 0.2
+
+
+def test_unlimited_rate_never_waits():
+    async def scenario():
+        limiter = RateLimiter(rate=0)
+        started = time.monotonic()
+        for _ in range(1000):
+            await limiter.acquire()
+        return time.monotonic() - started
+
+    assert asyncio.run(scenario()) < 0.1
+
+
+def test_tagged_targets_reads_past_pages_without_matches(standin):
+    prefix = key_prefix("lead", "t1")
+    # Hai trang đầu (page_size 3) không có record nào của tag
+    for i in range(6):
+        standin.create_record("lead", {"email": f"other{i}@x.com"})
+    mine = {standin.create_record("lead", {"email": f"{prefix}{i}@x.com"}) for i in range(4)}
+    standin.create_record("lead", {"email": "lead.t10.0@x.com"})
+
+    async def scenario():
+        async with async_playwright() as playwright:
+            api = await login_api(playwright, standin.url)
+            try:
+                return await tagged_targets(api, "lead", "t1", page_size=3)
+            finally:
+                await api.dispose()
+
+    targets = asyncio.run(scenario())
+    assert {t.record_id for t in targets} == mine
+
+
+class _UnpagedResponse:
+    status = 200
+    ok = True
+
+    def __init__(self, items):
+        self.items = items
+
+    async def json(self):
+        return {"data": self.items}
+
+    async def dispose(self):
+        pass
+
+
+class _UnpagedApi:
+    """API bỏ qua tham số phân trang: trang nào cũng trả cùng một danh sách"""
+
+    def __init__(self, items):
+        self.items = items
+        self.calls = 0
+
+    async def get(self, path, params):
+        self.calls += 1
+        return _UnpagedResponse(self.items)
+
+
+def test_tagged_targets_stops_when_api_ignores_paging():
+    prefix = key_prefix("lead", "t1")
+    api = _UnpagedApi([{"id": 1, "email": f"{prefix}1@x.com"}, {"id": 2, "email": "other@x.com"}])
+    targets = asyncio.run(tagged_targets(api, "lead", "t1", page_size=2))
+    assert [t.record_id for t in targets] == ["1"]
+    assert api.calls == 2
+
+
+def test_teardown_deletes_and_is_idempotent(standin):
+    ids = [standin.create_record("lead", {"email": f"{i}@x.com"}) for i in range(5)]
+    targets = [TeardownTarget("lead", f"{i}@x.com", record_id) for i, record_id in enumerate(ids)]
+
+    async def scenario():
+        async with async_playwright() as playwright:
+            api = await login_api(playwright, standin.url)
+            try:
+                first = await Teardown(api, concurrency=2, rate=0, batch_size=2).run(targets)
+                second = await Teardown(api, concurrency=2, rate=0, batch_size=2).run(targets)
+                return first, second
+            finally:
+                await api.dispose()
+
+    first, second = asyncio.run(scenario())
+    assert (first.deleted, first.missing, first.failed) == (5, 0, 0)
+    assert (second.deleted, second.missing, second.failed) == (0, 5, 0)
+    assert standin.list_records("lead") == []
@@ -0,0 +1,21 @@
+import json
+
+from tracing import Tracer
+
+
+def test_chrome_trace_includes_flushed_spans(tmp_path):
+    tracer = Tracer(flush_path=tmp_path / "spans.jsonl", flush_threshold=3)
+    for index in range(7):
+        with tracer.span(f"step{index}"):
+            pass
+    assert len(tracer.spans) == 1
+    tracer.export_chrome_trace(tmp_path / "trace.json")
+    events = json.loads((tmp_path / "trace.json").read_text(encoding="utf-8"))["traceEvents"]
+    assert [event["name"] for event in events] == [f"step{index}" for index in range(7)]
+    assert events[0]["ts"] == 0
+
+    # Phần còn lại đã ghi ra file flush trước khi export: không bị lặp
+    tracer.export_jsonl(tracer.flush_path)
+    tracer.export_chrome_trace(tmp_path / "trace.json")
+    events = json.loads((tmp_path / "trace.json").read_text(encoding="utf-8"))["traceEvents"]
+    assert len(events) == 7
@@ -0,0 +1,258 @@
+import argparse
+import asyncio
+import functools
+import itertools
+import json
+import math
+import os
+import time
+import uuid
+import weakref
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import asdict, dataclass, field
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Sequence, Union
+
+TRACE_DIR = Path(__file__).parent / "traces"
+TRACE_FILE = TRACE_DIR / "spans.jsonl"
+
+
+@dataclass
+class Span:
+    """Một khoảng thời gian đo được (step / helper)"""
+    name: str
+    span_id: int
+    parent_id: Optional[int]
+    start_ns: int
+    end_ns: int = 0
+    outcome: str = "ok"
+    error: Optional[str] = None
+    task: int = 0
+    attrs: Dict[str, Any] = field(default_factory=dict)
+
+    @property
+    def duration_ms(self) -> float:
+        return (self.end_ns - self.start_ns) / 1e6
+
+
+_current_span: ContextVar[Optional[Span]] = ContextVar("current_span", default=None)
+
+
+class Tracer:
+    """Thu thập span lồng nhau trong bộ nhớ; ghi ra file khi export, hoặc ra `flush_path` mỗi khi đủ `flush_threshold` span.
+    Chrome trace đọc lại phần đã flush nên vẫn phủ toàn bộ lần chạy"""
+
+    def __init__(self, enabled: bool = True, flush_path: Optional[Path] = None, flush_threshold: int = 10000):
+        self.enabled = enabled
+        self.flush_path = flush_path
+        self.flush_threshold = flush_threshold
+        self.run_id = uuid.uuid4().hex[:12]
+        self.spans: List[Span] = []
+        self._flushed = 0
+        self._ids = itertools.count(1)
+        self._tasks: "weakref.WeakKeyDictionary[asyncio.Task, int]" = weakref.WeakKeyDictionary()
+        self._task_ids = itertools.count(1)
+
+    def _task_number(self) -> int:
+        try:
+            task = asyncio.current_task()
+        except RuntimeError:
+            task = None
+        if task is None:
+            return 0
+        if task not in self._tasks:
+            self._tasks[task] = next(self._task_ids)
+        return self._tasks[task]
+
+    @contextmanager
+    def span(self, name: str, **attrs: Any) -> Iterator[Optional[Span]]:
+        """Đo thời gian một khối code; span con tự gắn với span cha trong cùng task"""
+        if not self.enabled:
+            yield None
+            return
+        parent = _current_span.get()
+        span = Span(
+            name=name,
+            span_id=next(self._ids),
+            parent_id=parent.span_id if parent else None,
+            start_ns=time.perf_counter_ns(),
+            task=self._task_number(),
+            attrs=attrs,
+        )
+        token = _current_span.set(span)
+        try:
+            yield span
+        except BaseException as e:
+            span.outcome = "cancelled" if isinstance(e, asyncio.CancelledError) else "error"
+            span.error = repr(e)
+            raise
+        finally:
+            span.end_ns = time.perf_counter_ns()
+            _current_span.reset(token)
+            self._append(span)
+
+    def add_span(self, name: str, start_ns: int, end_ns: int, **attrs: Any):
+        """Ghi một span đã đo sẵn (vd: thời gian chờ của WaitEngine) dưới span hiện tại"""
+        if not self.enabled:
+            return
+        parent = _current_span.get()
+        self._append(Span(
+            name=name,
+            span_id=next(self._ids),
+            parent_id=parent.span_id if parent else None,
+            start_ns=start_ns,
+            end_ns=end_ns,
+            task=self._task_number(),
+            attrs=attrs,
+        ))
+
+    def _append(self, span: Span):
+        self.spans.append(span)
+        if self.flush_path and len(self.spans) >= self.flush_threshold:
+            # Run dài: ghi bớt ra đĩa để bộ nhớ không tăng mãi
+            self.export_jsonl(self.flush_path)
+            self._flushed += len(self.spans)
+            self.spans.clear()
+
+    def clear(self):
+        self.spans.clear()
+
+    def export_jsonl(self, path: Union[str, Path] = TRACE_FILE):
+        """Ghi thêm các span của lần chạy này vào file JSON lines"""
+        path = Path(path)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        with path.open("a", encoding="utf-8") as f:
+            for span in self.spans:
+                row = asdict(span)
+                row["run_id"] = self.run_id
+                row["duration_ms"] = span.duration_ms
+                f.write(json.dumps(row, ensure_ascii=False) + "\n")
+
+    def _run_spans(self) -> Iterator[Dict[str, Any]]:
+        """Mọi span của lần chạy này: phần đã flush ra flush_path (lọc theo run_id) rồi phần còn trong bộ nhớ"""
+        in_memory = {span.span_id for span in self.spans}
+        if self._flushed and self.flush_path and Path(self.flush_path).exists():
+            for row in load_spans([self.flush_path]):
+                # Span còn trong bộ nhớ có thể đã được export_jsonl ghi ra trước đó: không lặp lại
+                if row.get("run_id") == self.run_id and row["span_id"] not in in_memory:
+                    yield row
+        for span in self.spans:
+            yield asdict(span)
+
+    def export_chrome_trace(self, path: Union[str, Path]):
+        """Ghi file Chrome trace-event (mở bằng chrome://tracing hoặc Perfetto).
+        Gồm cả span đã flush ra đĩa; file flush được đọc lại từng dòng nên bộ nhớ không tăng theo độ dài run"""
+        path = Path(path)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        origin = min((row["start_ns"] for row in self._run_spans()), default=0)
+        pid = os.getpid()
+        with path.open("w", encoding="utf-8") as f:
+            f.write('{"traceEvents": [')
+            for index, row in enumerate(self._run_spans()):
+                event = {
+                    "name": row["name"],
+                    "cat": row["outcome"],
+                    "ph": "X",
+                    "ts": (row["start_ns"] - origin) / 1000,
+                    "dur": (row["end_ns"] - row["start_ns"]) / 1000,
+                    "pid": pid,
+                    "tid": row["task"],
+                    "args": {**row["attrs"], **({"error": row["error"]} if row["error"] else {})},
+                }
+                f.write((", " if index else "") + json.dumps(event, ensure_ascii=False))
+            f.write("]}")
+
+
+TRACER = Tracer(flush_path=TRACE_FILE)
+
+
+def traced(name: Optional[str] = None, arg_detail: bool = False, arg_attr: Optional[str] = None) -> Callable:
+    """Decorator bọc method async trong một span.
+    arg_detail=True thêm tham số đầu vào tên span: chỉ dùng khi tham số thuộc một tập cố định (placeholder, tên field).
+    Giá trị theo từng record (ngày, text tìm kiếm) dùng arg_attr để ghi vào attrs, tên span giữ nguyên.
+    Nếu object có thuộc tính `diagnostics` (DiagnosticsRecorder) thì step cũng được ghi vào ring buffer của nó"""
+    def decorator(fn: Callable) -> Callable:
+        span_name = name or fn.__name__
+
+        @functools.wraps(fn)
+        async def wrapper(*args, **kwargs):
+            full_name = f"{span_name}[{args[1]}]" if arg_detail and len(args) > 1 else span_name
+            attrs = {arg_attr: args[1]} if arg_attr and len(args) > 1 else {}
+            recorder = getattr(args[0], "diagnostics", None) if args else None
+            if recorder is None:
+                with TRACER.span(full_name, **attrs):
+                    return await fn(*args, **kwargs)
+            started = time.perf_counter()
+            await recorder.before_step(full_name)
+            with TRACER.span(full_name, **attrs):
+                try:
+                    result = await fn(*args, **kwargs)
+                except Exception as e:
+                    await recorder.on_failure(full_name, e)
+                    raise
+            recorder.after_step(full_name, (time.perf_counter() - started) * 1000)
+            return result
+        return wrapper
+    return decorator
+
+
+def percentile(sorted_values: Sequence[float], q: float) -> float:
+    """Percentile nội suy tuyến tính trên danh sách đã sắp xếp"""
+    if not sorted_values:
+        return math.nan
+    position = (len(sorted_values) - 1) * q / 100
+    lower = math.floor(position)
+    upper = math.ceil(position)
+    if lower == upper:
+        return sorted_values[lower]
+    return sorted_values[lower] + (sorted_values[upper] - sorted_values[lower]) * (position - lower)
+
+
+def load_spans(paths: Iterable[Union[str, Path]]) -> Iterator[Dict[str, Any]]:
+    """Đọc span từ các file JSON lines"""
+    for path in paths:
+        with Path(path).open(encoding="utf-8") as f:
+            for line in f:
+                if line.strip():
+                    yield json.loads(line)
+
+
+def step_stats(spans: Iterable[Dict[str, Any]]) -> Dict[str, Dict[str, float]]:
+    """Thống kê p50/p95/p99 theo tên step qua nhiều lần chạy"""
+    durations: Dict[str, List[float]] = {}
+    errors: Dict[str, int] = {}
+    for span in spans:
+        durations.setdefault(span["name"], []).append(span["duration_ms"])
+        if span.get("outcome") != "ok":
+            errors[span["name"]] = errors.get(span["name"], 0) + 1
+    stats = {}
+    for name, values in durations.items():
+        values.sort()
+        stats[name] = {
+            "count": len(values),
+            "errors": errors.get(name, 0),
+            "p50": percentile(values, 50),
+            "p95": percentile(values, 95),
+            "p99": percentile(values, 99),
+        }
+    return stats
+
+
+def print_stats(stats: Dict[str, Dict[str, float]]):
+    """In bảng thống kê, step chậm nhất (theo p95) lên đầu"""
+    print(f"{'step':<50} {'count':>7} {'err':>5} {'p50 ms':>10} {'p95 ms':>10} {'p99 ms':>10}")
+    for name, s in sorted(stats.items(), key=lambda item: item[1]["p95"], reverse=True):
+        print(f"{name[:50]:<50} {s['count']:>7} {s['errors']:>5} {s['p50']:>10.1f} {s['p95']:>10.1f} {s['p99']:>10.1f}")
+
+
+def main():
+    """Báo cáo percentile theo step từ các file span"""
+    parser = argparse.ArgumentParser(description="Thống kê thời gian từng step từ file span JSON lines")
+    parser.add_argument("files", nargs="*", default=[str(TRACE_FILE)])
+    args = parser.parse_args()
+    print_stats(step_stats(load_spans(args.files)))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,142 @@
+import asyncio
+import re
+import time
+from typing import Any, Iterable, Optional
+from playwright.async_api import Page, Request
+from tracing import TRACER
+
+
+DROPDOWN_SELECTOR = "div.ant-select-dropdown:not(.ant-select-dropdown-hidden)"
+OPTION_SELECTOR = "div.ant-select-item-option"
+DRAWER_SELECTOR = "div.ant-drawer-content-wrapper"
+PICKER_DROPDOWN_SELECTOR = "div.ant-picker-dropdown:not(.ant-picker-dropdown-hidden)"
+
+# Các loại request được tính là "network đang bận"
+TRACKED_RESOURCE_TYPES = {"document", "xhr", "fetch"}
+# Request chạy nền liên tục (polling, long-poll, analytics) không tính vào network idle
+DEFAULT_IDLE_IGNORE = (r"/socket\.io/", r"/sockjs", r"/poll", r"heartbeat", r"/collect\b", r"analytics")
+
+# Element cuối cùng khớp selector đang hiển thị và đã chạy xong animation của antd
+_SETTLED_JS = """
+(selector) => {
+    const els = Array.from(document.querySelectorAll(selector))
+        .filter(el => el.getClientRects().length > 0);
+    if (!els.length) return false;
+    const el = els[els.length - 1];
+    if (/-(enter|appear|leave)(-active)?(\\s|$)/.test(el.className)) return false;
+    return el.getAnimations({subtree: true}).every(a => a.playState !== 'running');
+}
+"""
+
+# Danh sách option trong dropdown đang mở đã có dữ liệu (và đã lọc nếu có text)
+_OPTIONS_READY_JS = """
+([dropdownSelector, optionSelector, text]) => {
+    const dropdowns = Array.from(document.querySelectorAll(dropdownSelector))
+        .filter(el => el.getClientRects().length > 0);
+    if (!dropdowns.length) return false;
+    const options = Array.from(dropdowns[dropdowns.length - 1].querySelectorAll(optionSelector));
+    if (!text) return options.length > 0;
+    return options.some(o => o.getAttribute('title') === text || (o.textContent || '').includes(text));
+}
+"""
+
+
+class WaitEngine:
+    """Chờ theo điều kiện sẵn sàng thay cho sleep cố định"""
+
+    def __init__(
+        self,
+        page: Page,
+        idle_window: int = 250,
+        verbose: bool = True,
+        idle_ignore: Iterable[str] = DEFAULT_IDLE_IGNORE,
+    ):
+        self.page = page
+        self.idle_window = idle_window
+        self.verbose = verbose
+        self.idle_ignore = [re.compile(pattern) for pattern in idle_ignore]
+        self._inflight = 0
+        self._activity = asyncio.Event()
+        page.on("request", self._on_request)
+        page.on("requestfinished", self._on_request_done)
+        page.on("requestfailed", self._on_request_done)
+
+    def _tracks(self, request: Request) -> bool:
+        return request.resource_type in TRACKED_RESOURCE_TYPES and not any(
+            pattern.search(request.url) for pattern in self.idle_ignore
+        )
+
+    def _on_request(self, request: Request):
+        if self._tracks(request):
+            self._inflight += 1
+            self._activity.set()
+
+    def _on_request_done(self, request: Request):
+        if self._tracks(request):
+            self._inflight = max(0, self._inflight - 1)
+            self._activity.set()
+
+    def _record(self, name: str, started: float, **attrs: Any) -> float:
+        elapsed = (time.perf_counter() - started) * 1000
+        end_ns = time.perf_counter_ns()
+        TRACER.add_span(f"wait:{name}", end_ns - int(elapsed * 1e6), end_ns, **attrs)
+        if self.verbose:
+            print(f"Wait {name}: {elapsed:.0f} ms")
+        return elapsed
+
+    async def _wait_settled(self, name: str, selector: str, timeout: int) -> float:
+        started = time.perf_counter()
+        await self.page.wait_for_function(_SETTLED_JS, arg=selector, timeout=timeout)
+        return self._record(name, started)
+
+    async def dropdown_open(self, timeout: int = 5000) -> float:
+        """Chờ popup antd Select mở và chạy xong animation"""
+        return await self._wait_settled("dropdown_open", DROPDOWN_SELECTOR, timeout)
+
+    async def options_ready(self, text: Optional[str] = None, timeout: int = 5000) -> float:
+        """Chờ danh sách option có dữ liệu, hoặc đã lọc ra option chứa text"""
+        started = time.perf_counter()
+        await self.page.wait_for_function(
+            _OPTIONS_READY_JS,
+            arg=[DROPDOWN_SELECTOR, OPTION_SELECTOR, text],
+            timeout=timeout,
+        )
+        return self._record("options_ready", started, **({"text": text} if text else {}))
+
+    async def drawer_mounted(self, timeout: int = 5000) -> float:
+        """Chờ drawer được mount và chạy xong animation"""
+        return await self._wait_settled("drawer_mounted", DRAWER_SELECTOR, timeout)
+
+    async def picker_open(self, timeout: int = 5000) -> float:
+        """Chờ popup DatePicker mở và chạy xong animation"""
+        return await self._wait_settled("picker_open", PICKER_DROPDOWN_SELECTOR, timeout)
+
+    async def element_ready(self, selector: str, timeout: int = 5000) -> float:
+        """Chờ element hiển thị và chạy xong animation"""
+        return await self._wait_settled(f"element_ready({selector})", selector, timeout)
+
+    async def network_idle(self, timeout: int = 10000, strict: bool = False) -> float:
+        """Chờ không còn request document/xhr/fetch nào (ngoài idle_ignore) trong idle_window ms.
+        Hết timeout thì ghi log và đi tiếp; strict=True thì raise TimeoutError"""
+        started = time.perf_counter()
+        deadline = started + timeout / 1000
+        while True:
+            self._activity.clear()
+            remaining = deadline - time.perf_counter()
+            if remaining <= 0:
+                message = f"Network not idle after {timeout} ms ({self._inflight} in flight)"
+                if strict:
+                    raise TimeoutError(message)
+                print(f"Cảnh báo: {message}, tiếp tục")
+                return self._record("network_idle", started, timed_out=True, inflight=self._inflight)
+            if self._inflight == 0:
+                try:
+                    await asyncio.wait_for(self._activity.wait(), min(self.idle_window / 1000, remaining))
+                except asyncio.TimeoutError:
+                    if self._inflight == 0:
+                        return self._record("network_idle", started)
+            else:
+                try:
+                    await asyncio.wait_for(self._activity.wait(), remaining)
+                except asyncio.TimeoutError:
+                    pass
@@ -0,0 +1,111 @@
+from datetime import date
+from typing import Optional, Sequence
+from playwright.async_api import ElementHandle, Locator, Page
+from tracing import TRACER
+from waits import DROPDOWN_SELECTOR, OPTION_SELECTOR, PICKER_DROPDOWN_SELECTOR
+
+CASCADER_DROPDOWN_SELECTOR = "div.ant-cascader-dropdown:not(.ant-cascader-dropdown-hidden)"
+CASCADER_MENU_SELECTOR = "ul.ant-cascader-menu"
+CASCADER_ITEM_SELECTOR = "li.ant-cascader-menu-item"
+SEARCH_INPUT_SELECTOR = "input.ant-select-selection-search-input, input.ant-cascader-input"
+# Định dạng hiển thị mặc định của antd DatePicker (YYYY-MM-DD)
+DATE_INPUT_FORMAT = "%Y-%m-%d"
+
+# Tìm item theo title/text trong popup đang mở (menu thứ menuIndex nếu là cascader).
+# rc-virtual-list chỉ render các option đang nhìn thấy: chưa có thì cuộn thêm một trang, poll mỗi frame
+_FIND_ITEM_JS = """
+([dropdownSelector, menuSelector, menuIndex, itemSelector, text, exact]) => {
+    const dropdowns = Array.from(document.querySelectorAll(dropdownSelector))
+        .filter(el => el.getClientRects().length > 0);
+    if (!dropdowns.length) return null;
+    let scope = dropdowns[dropdowns.length - 1];
+    if (menuSelector) {
+        scope = scope.querySelectorAll(menuSelector)[menuIndex];
+        if (!scope) return null;
+    }
+    const items = Array.from(scope.querySelectorAll(itemSelector));
+    const label = el => el.getAttribute('title') || (el.textContent || '').trim();
+    const match = items.find(el => label(el) === text) || (!exact && items.find(el => label(el).includes(text)));
+    if (match) {
+        match.scrollIntoView({block: 'nearest'});
+        return match;
+    }
+    const holder = scope.querySelector('.rc-virtual-list-holder');
+    if (holder && items.length) {
+        const max = holder.scrollHeight - holder.clientHeight;
+        holder.scrollTop = holder.scrollTop >= max ? 0 : Math.min(max, holder.scrollTop + holder.clientHeight);
+    }
+    return null;
+}
+"""
+
+# Input đã nhận giá trị và popup DatePicker đã đóng
+_DATE_COMMITTED_JS = """
+([input, text, pickerSelector]) => input.value === text
+    && !Array.from(document.querySelectorAll(pickerSelector)).some(el => el.getClientRects().length > 0)
+"""
+
+
+async def find_item(
+    page: Page,
+    text: str,
+    exact: bool = True,
+    timeout: int = 5000,
+    dropdown_selector: str = DROPDOWN_SELECTOR,
+    item_selector: str = OPTION_SELECTOR,
+    menu_selector: Optional[str] = None,
+    menu_index: int = 0,
+) -> ElementHandle:
+    """Chờ tới khi item cần chọn được render trong popup (cuộn danh sách ảo tới nó), không chờ animation"""
+    with TRACER.span("wait:item", text=text):
+        handle = await page.wait_for_function(
+            _FIND_ITEM_JS,
+            arg=[dropdown_selector, menu_selector, menu_index, item_selector, text, exact],
+            polling="raf",
+            timeout=timeout,
+        )
+    element = handle.as_element()
+    if element is None:
+        raise RuntimeError(f"Option {text!r} not found")
+    return element
+
+
+async def select_option(page: Page, select: Locator, title: str, timeout: int = 5000):
+    """Chọn option của antd Select theo title"""
+    await select.click()
+    option = await find_item(page, title, timeout=timeout)
+    await option.click()
+
+
+async def search_select(page: Page, select: Locator, text: str, title: Optional[str] = None, timeout: int = 5000):
+    """antd Select có search: điền cả chuỗi tìm kiếm một lần rồi chọn option ngay khi danh sách lọc có nó.
+    Không có `title` thì lấy option trùng `text`, không có thì option đầu tiên chứa `text`"""
+    await select.click()
+    await select.locator(SEARCH_INPUT_SELECTOR).first.fill(text)
+    option = await find_item(page, title or text, exact=title is not None, timeout=timeout)
+    await option.click()
+
+
+async def cascader_select(page: Page, cascader: Locator, path: Sequence[str], timeout: int = 5000):
+    """antd Cascader: chọn lần lượt từng cấp theo title (vd: ["Vietnam", "Bến Tre"])"""
+    await cascader.click()
+    for level, label in enumerate(path):
+        item = await find_item(
+            page, label, timeout=timeout,
+            dropdown_selector=CASCADER_DROPDOWN_SELECTOR,
+            item_selector=CASCADER_ITEM_SELECTOR,
+            menu_selector=CASCADER_MENU_SELECTOR,
+            menu_index=level,
+        )
+        await item.click()
+
+
+async def set_date(page: Page, picker: Locator, value: str, display_format: str = DATE_INPUT_FORMAT, timeout: int = 5000):
+    """antd DatePicker: gõ thẳng ngày (YYYY-MM-DD, tháng/năm bất kỳ) vào input rồi Enter, không click lịch"""
+    text = date.fromisoformat(value).strftime(display_format)
+    input_locator = picker.locator("input").first
+    await input_locator.click()
+    await input_locator.fill(text)
+    await input_locator.press("Enter")
+    element = await input_locator.element_handle(timeout=timeout)
+    await page.wait_for_function(_DATE_COMMITTED_JS, arg=[element, text, PICKER_DROPDOWN_SELECTOR], timeout=timeout)